@@ -4,6 +4,7 @@ from circuits.models import Provider, Circuit, CircuitTermination, CircuitType
 from dcim.api.serializers import SiteNestedSerializer, InterfaceNestedSerializer
 from extras.api.serializers import CustomFieldSerializer
 from tenancy.api.serializers import TenantNestedSerializer
+from utilities.api import MemoizedNestedSerializerMixin
 
 
 #
@@ -18,7 +19,7 @@ class ProviderSerializer(CustomFieldSerializer, serializers.ModelSerializer):
                   'custom_fields']
 
 
-class ProviderNestedSerializer(ProviderSerializer):
+class ProviderNestedSerializer(MemoizedNestedSerializerMixin, ProviderSerializer):
 
     class Meta(ProviderSerializer.Meta):
         fields = ['id', 'name', 'slug']
@@ -35,7 +36,7 @@ class CircuitTypeSerializer(serializers.ModelSerializer):
         fields = ['id', 'name', 'slug']
 
 
-class CircuitTypeNestedSerializer(CircuitTypeSerializer):
+class CircuitTypeNestedSerializer(MemoizedNestedSerializerMixin, CircuitTypeSerializer):
 
     class Meta(CircuitTypeSerializer.Meta):
         pass
@@ -21,5 +21,6 @@ urlpatterns = [
     # Circuits
     url(r'^circuits/$', CircuitListView.as_view(), name='circuit_list'),
     url(r'^circuits/(?P<pk>\d+)/$', CircuitDetailView.as_view(), name='circuit_detail'),
+    url(r'^circuits/(?P<pk>\d+)/endpoints/$', CircuitEndpointsView.as_view(), name='circuit_endpoints'),
 
 ]
@@ -1,29 +1,35 @@
-from rest_framework import generics
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from django.shortcuts import get_object_or_404
 
 from circuits.models import Provider, CircuitType, Circuit
 from circuits.filters import CircuitFilter
+from dcim.api.views import serialize_path
+from dcim.tracing import connection_graph
 
 from extras.api.views import CustomFieldModelAPIView
+from utilities.api import ListAPIView, RetrieveAPIView
 from . import serializers
 
 
-class ProviderListView(CustomFieldModelAPIView, generics.ListAPIView):
+class ProviderListView(CustomFieldModelAPIView, ListAPIView):
     """
     List all providers
     """
-    queryset = Provider.objects.prefetch_related('custom_field_values__field')
+    queryset = Provider.objects.prefetch_related('custom_field_values')
     serializer_class = serializers.ProviderSerializer
 
 
-class ProviderDetailView(CustomFieldModelAPIView, generics.RetrieveAPIView):
+class ProviderDetailView(CustomFieldModelAPIView, RetrieveAPIView):
     """
     Retrieve a single provider
     """
-    queryset = Provider.objects.prefetch_related('custom_field_values__field')
+    queryset = Provider.objects.prefetch_related('custom_field_values')
     serializer_class = serializers.ProviderSerializer
 
 
-class CircuitTypeListView(generics.ListAPIView):
+class CircuitTypeListView(ListAPIView):
     """
     List all circuit types
     """
@@ -31,7 +37,7 @@ class CircuitTypeListView(generics.ListAPIView):
     serializer_class = serializers.CircuitTypeSerializer
 
 
-class CircuitTypeDetailView(generics.RetrieveAPIView):
+class CircuitTypeDetailView(RetrieveAPIView):
     """
     Retrieve a single circuit type
     """
@@ -39,20 +45,33 @@ class CircuitTypeDetailView(generics.RetrieveAPIView):
     serializer_class = serializers.CircuitTypeSerializer
 
 
-class CircuitListView(CustomFieldModelAPIView, generics.ListAPIView):
+class CircuitListView(CustomFieldModelAPIView, ListAPIView):
     """
     List circuits (filterable)
     """
     queryset = Circuit.objects.select_related('type', 'tenant', 'provider')\
-        .prefetch_related('custom_field_values__field')
+        .prefetch_related('custom_field_values')
     serializer_class = serializers.CircuitSerializer
     filter_class = CircuitFilter
 
 
-class CircuitDetailView(CustomFieldModelAPIView, generics.RetrieveAPIView):
+class CircuitDetailView(CustomFieldModelAPIView, RetrieveAPIView):
     """
     Retrieve a single circuit
     """
     queryset = Circuit.objects.select_related('type', 'tenant', 'provider')\
-        .prefetch_related('custom_field_values__field')
+        .prefetch_related('custom_field_values')
     serializer_class = serializers.CircuitSerializer
+
+
+class CircuitEndpointsView(APIView):
+    """
+    List all endpoints (e.g. interfaces) connected through a circuit
+    """
+
+    def get(self, request, pk):
+
+        circuit = get_object_or_404(Circuit, pk=pk)
+        endpoints = connection_graph.circuit_endpoints(circuit.pk)
+
+        return Response(serialize_path(endpoints))
@@ -4,3 +4,8 @@ from rest_framework.exceptions import APIException
 class MissingFilterException(APIException):
     status_code = 400
     default_detail = "One or more required filters is missing from the request."
+
+
+class RemoteDeviceError(APIException):
+    status_code = 502
+    default_detail = "Error connecting to the remote device."
@@ -1,14 +1,18 @@
 from rest_framework import serializers
 
+from django.db.models import Manager
+
+from circuits.models import Circuit, CircuitTermination
 from ipam.models import IPAddress
 from dcim.models import (
     ConsolePort, ConsolePortTemplate, ConsoleServerPort, ConsoleServerPortTemplate, Device, DeviceBay, DeviceType,
     DeviceRole, Interface, InterfaceConnection, InterfaceTemplate, Manufacturer, Module, Platform, PowerOutlet,
-    PowerOutletTemplate, PowerPort, PowerPortTemplate, Rack, RackGroup, RackRole, RACK_FACE_FRONT, RACK_FACE_REAR, Site,
-    SUBDEVICE_ROLE_CHILD, SUBDEVICE_ROLE_PARENT,
+    PowerOutletTemplate, PowerPort, PowerPortTemplate, prefetch_interface_connections, Rack, RackGroup, RackRole,
+    RACK_FACE_FRONT, RACK_FACE_REAR, Site, SUBDEVICE_ROLE_CHILD, SUBDEVICE_ROLE_PARENT,
 )
 from extras.api.serializers import CustomFieldSerializer
 from tenancy.api.serializers import TenantNestedSerializer
+from utilities.api import BulkWriteSerializer, MemoizedNestedSerializerMixin
 
 
 #
@@ -24,7 +28,7 @@ class SiteSerializer(CustomFieldSerializer, serializers.ModelSerializer):
                   'custom_fields', 'count_prefixes', 'count_vlans', 'count_racks', 'count_devices', 'count_circuits']
 
 
-class SiteNestedSerializer(SiteSerializer):
+class SiteNestedSerializer(MemoizedNestedSerializerMixin, SiteSerializer):
 
     class Meta(SiteSerializer.Meta):
         fields = ['id', 'name', 'slug']
@@ -42,7 +46,7 @@ class RackGroupSerializer(serializers.ModelSerializer):
         fields = ['id', 'name', 'slug', 'site']
 
 
-class RackGroupNestedSerializer(RackGroupSerializer):
+class RackGroupNestedSerializer(MemoizedNestedSerializerMixin, RackGroupSerializer):
 
     class Meta(SiteSerializer.Meta):
         fields = ['id', 'name', 'slug']
@@ -59,7 +63,7 @@ class RackRoleSerializer(serializers.ModelSerializer):
         fields = ['id', 'name', 'slug', 'color']
 
 
-class RackRoleNestedSerializer(RackRoleSerializer):
+class RackRoleNestedSerializer(MemoizedNestedSerializerMixin, RackRoleSerializer):
 
     class Meta(RackRoleSerializer.Meta):
         fields = ['id', 'name', 'slug']
@@ -82,7 +86,7 @@ class RackSerializer(CustomFieldSerializer, serializers.ModelSerializer):
                   'u_height', 'desc_units', 'comments', 'custom_fields']
 
 
-class RackNestedSerializer(RackSerializer):
+class RackNestedSerializer(MemoizedNestedSerializerMixin, RackSerializer):
 
     class Meta(RackSerializer.Meta):
         fields = ['id', 'name', 'facility_id', 'display_name']
@@ -120,7 +124,7 @@ class ManufacturerSerializer(serializers.ModelSerializer):
         fields = ['id', 'name', 'slug']
 
 
-class ManufacturerNestedSerializer(ManufacturerSerializer):
+class ManufacturerNestedSerializer(MemoizedNestedSerializerMixin, ManufacturerSerializer):
 
     class Meta(ManufacturerSerializer.Meta):
         pass
@@ -147,7 +151,7 @@ class DeviceTypeSerializer(CustomFieldSerializer, serializers.ModelSerializer):
         }[obj.subdevice_role]
 
 
-class DeviceTypeNestedSerializer(DeviceTypeSerializer):
+class DeviceTypeNestedSerializer(MemoizedNestedSerializerMixin, DeviceTypeSerializer):
 
     class Meta(DeviceTypeSerializer.Meta):
         fields = ['id', 'manufacturer', 'model', 'slug']
@@ -213,7 +217,7 @@ class DeviceRoleSerializer(serializers.ModelSerializer):
         fields = ['id', 'name', 'slug', 'color']
 
 
-class DeviceRoleNestedSerializer(DeviceRoleSerializer):
+class DeviceRoleNestedSerializer(MemoizedNestedSerializerMixin, DeviceRoleSerializer):
 
     class Meta(DeviceRoleSerializer.Meta):
         fields = ['id', 'name', 'slug']
@@ -230,7 +234,7 @@ class PlatformSerializer(serializers.ModelSerializer):
         fields = ['id', 'name', 'slug', 'rpc_client']
 
 
-class PlatformNestedSerializer(PlatformSerializer):
+class PlatformNestedSerializer(MemoizedNestedSerializerMixin, PlatformSerializer):
 
     class Meta(PlatformSerializer.Meta):
         fields = ['id', 'name', 'slug']
@@ -280,7 +284,7 @@ class DeviceSerializer(CustomFieldSerializer, serializers.ModelSerializer):
         }
 
 
-class DeviceNestedSerializer(serializers.ModelSerializer):
+class DeviceNestedSerializer(MemoizedNestedSerializerMixin, serializers.ModelSerializer):
 
     class Meta:
         model = Device
@@ -365,6 +369,17 @@ class PowerPortNestedSerializer(PowerPortSerializer):
 # Interfaces
 #
 
+class InterfaceListSerializer(serializers.ListSerializer):
+    """
+    Resolve the connections of all Interfaces being serialized in bulk, rather than once per Interface.
+    """
+
+    def to_representation(self, data):
+        if isinstance(data, Manager):
+            data = data.all()
+        return super(InterfaceListSerializer, self).to_representation(prefetch_interface_connections(data))
+
+
 class InterfaceSerializer(serializers.ModelSerializer):
     device = DeviceNestedSerializer()
     form_factor = serializers.ReadOnlyField(source='get_form_factor_display')
@@ -372,6 +387,7 @@ class InterfaceSerializer(serializers.ModelSerializer):
     class Meta:
         model = Interface
         fields = ['id', 'device', 'name', 'form_factor', 'mac_address', 'mgmt_only', 'description', 'is_connected']
+        list_serializer_class = InterfaceListSerializer
 
 
 class InterfaceNestedSerializer(InterfaceSerializer):
@@ -389,6 +405,13 @@ class InterfaceDetailSerializer(InterfaceSerializer):
                   'connected_interface']
 
 
+class WritableInterfaceSerializer(BulkWriteSerializer):
+
+    class Meta:
+        model = Interface
+        fields = ['id', 'device', 'name', 'form_factor', 'mac_address', 'mgmt_only', 'description']
+
+
 #
 # Device bays
 #
@@ -434,6 +457,58 @@ class ModuleNestedSerializer(ModuleSerializer):
         fields = ['id', 'device', 'parent', 'name']
 
 
+class ModuleTreeSerializer(serializers.ModelSerializer):
+    """
+    Represents a Module along with all of its submodules. Expects a tree assembled by get_module_tree().
+    """
+    manufacturer = ManufacturerNestedSerializer()
+    submodules = serializers.SerializerMethodField()
+
+    class Meta:
+        model = Module
+        fields = ['id', 'name', 'manufacturer', 'part_id', 'serial', 'discovered', 'submodules']
+
+    def get_submodules(self, obj):
+        return ModuleTreeSerializer(obj.children, many=True).data
+
+
+#
+# Device components (embedded within Devices)
+#
+
+class DeviceConsolePortSerializer(ConsolePortSerializer):
+
+    class Meta(ConsolePortSerializer.Meta):
+        fields = ['id', 'name', 'cs_port', 'connection_status']
+
+
+class DevicePowerPortSerializer(PowerPortSerializer):
+
+    class Meta(PowerPortSerializer.Meta):
+        fields = ['id', 'name', 'power_outlet', 'connection_status']
+
+
+class DeviceInterfaceSerializer(serializers.ModelSerializer):
+    form_factor = serializers.ReadOnlyField(source='get_form_factor_display')
+
+    class Meta:
+        model = Interface
+        fields = ['id', 'name', 'form_factor', 'mac_address', 'mgmt_only', 'description', 'is_connected']
+
+
+class DeviceModuleSerializer(ModuleSerializer):
+
+    class Meta(ModuleSerializer.Meta):
+        fields = ['id', 'parent', 'name', 'manufacturer', 'part_id', 'serial', 'discovered']
+
+
+class DeviceIPAddressSerializer(serializers.ModelSerializer):
+
+    class Meta:
+        model = IPAddress
+        fields = ['id', 'family', 'address', 'vrf', 'status', 'interface', 'description']
+
+
 #
 # Interface connections
 #
@@ -443,3 +518,25 @@ class InterfaceConnectionSerializer(serializers.ModelSerializer):
     class Meta:
         model = InterfaceConnection
         fields = ['id', 'interface_a', 'interface_b', 'connection_status']
+
+
+#
+# Connection paths
+#
+
+# Cannot import circuits.api.CircuitTerminationSerializer due to circular dependency
+class PathCircuitSerializer(serializers.ModelSerializer):
+    provider = serializers.ReadOnlyField(source='provider.name')
+
+    class Meta:
+        model = Circuit
+        fields = ['id', 'cid', 'provider']
+
+
+class PathCircuitTerminationSerializer(serializers.ModelSerializer):
+    circuit = PathCircuitSerializer()
+    site = SiteNestedSerializer()
+
+    class Meta:
+        model = CircuitTermination
+        fields = ['id', 'circuit', 'term_side', 'site']
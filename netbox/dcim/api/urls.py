@@ -11,6 +11,7 @@ urlpatterns = [
     # Sites
     url(r'^sites/$', SiteListView.as_view(), name='site_list'),
     url(r'^sites/(?P<pk>\d+)/$', SiteDetailView.as_view(), name='site_detail'),
+    url(r'^sites/(?P<pk>\d+)/lldp-neighbors/$', SiteLLDPNeighborsView.as_view(), name='site_lldp-neighbors'),
     url(r'^sites/(?P<pk>\d+)/graphs/$', GraphListView.as_view(), {'type': GRAPH_TYPE_SITE}, name='site_graphs'),
     url(r'^sites/(?P<site>\d+)/racks/$', RackListView.as_view(), name='site_racks'),
 
@@ -55,20 +56,32 @@ urlpatterns = [
     url(r'^devices/(?P<pk>\d+)/interfaces/$', InterfaceListView.as_view(), name='device_interfaces'),
     url(r'^devices/(?P<pk>\d+)/device-bays/$', DeviceBayListView.as_view(), name='device_devicebays'),
     url(r'^devices/(?P<pk>\d+)/modules/$', ModuleListView.as_view(), name='device_modules'),
+    url(r'^devices/(?P<pk>\d+)/inventory/$', DeviceInventoryView.as_view(), name='device_inventory'),
 
     # Console ports
+    url(r'^console-ports/$', ConsolePortListView.as_view(), name='consoleport_list'),
     url(r'^console-ports/(?P<pk>\d+)/$', ConsolePortView.as_view(), name='consoleport'),
 
+    # Power outlets
+    url(r'^power-outlets/$', PowerOutletListView.as_view(), name='poweroutlet_list'),
+
     # Power ports
+    url(r'^power-ports/$', PowerPortListView.as_view(), name='powerport_list'),
     url(r'^power-ports/(?P<pk>\d+)/$', PowerPortView.as_view(), name='powerport'),
 
     # Interfaces
+    url(r'^interfaces/$', InterfaceListView.as_view(), name='interface_list'),
+    url(r'^interfaces/bulk/$', InterfaceBulkView.as_view(), name='interface_bulk'),
     url(r'^interfaces/(?P<pk>\d+)/$', InterfaceDetailView.as_view(), name='interface_detail'),
+    url(r'^interfaces/(?P<pk>\d+)/trace/$', InterfaceTraceView.as_view(), name='interface_trace'),
     url(r'^interfaces/(?P<pk>\d+)/graphs/$', GraphListView.as_view(), {'type': GRAPH_TYPE_INTERFACE},
         name='interface_graphs'),
     url(r'^interface-connections/$', InterfaceConnectionListView.as_view(), name='interfaceconnection_list'),
     url(r'^interface-connections/(?P<pk>\d+)/$', InterfaceConnectionView.as_view(), name='interfaceconnection_detail'),
 
+    # MAC addresses
+    url(r'^mac-addresses/resolve/$', MACAddressResolveView.as_view(), name='macaddress_resolve'),
+
     # Miscellaneous
     url(r'^related-connections/$', RelatedConnectionsView.as_view(), name='related_connections'),
     url(r'^topology-maps/(?P<slug>[\w-]+)/$', TopologyMapView.as_view(), name='topology_map'),
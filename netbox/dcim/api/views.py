@@ -1,4 +1,8 @@
-from rest_framework import generics
+from collections import defaultdict, OrderedDict
+import time
+
+from rest_framework import generics, status
+from rest_framework.exceptions import ValidationError
 from rest_framework.permissions import DjangoModelPermissionsOrAnonReadOnly
 from rest_framework.response import Response
 from rest_framework.settings import api_settings
@@ -6,18 +10,32 @@ from rest_framework.views import APIView
 
 from django.conf import settings
 from django.contrib.contenttypes.models import ContentType
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.db.models import Prefetch, prefetch_related_objects, Q
 from django.http import Http404
 from django.shortcuts import get_object_or_404
 
+from circuits.models import CircuitTermination
 from dcim.models import (
-    ConsolePort, ConsoleServerPort, Device, DeviceBay, DeviceRole, DeviceType, IFACE_FF_VIRTUAL, Interface,
-    InterfaceConnection, Manufacturer, Module, Platform, PowerOutlet, PowerPort, Rack, RackGroup, RackRole, Site,
+    ConsolePort, ConsoleServerPort, Device, DeviceBay, DeviceRole, DeviceType, get_module_tree, IFACE_FF_VIRTUAL,
+    Interface, InterfaceConnection, Manufacturer, Module, Platform, PowerOutlet, PowerPort,
+    prefetch_interface_connections, Rack, RackGroup, RackRole, Site,
 )
 from dcim import filters
+from dcim.lldp import compare_lldp_neighbors, get_lldp_neighbors, lldp_collector
+from dcim.tracing import (
+    connection_graph, NODE_CIRCUITTERMINATION, NODE_CONSOLEPORT, NODE_CONSOLESERVERPORT, NODE_INTERFACE,
+    NODE_POWEROUTLET, NODE_POWERPORT, resolve_nodes,
+)
 from extras.api.views import CustomFieldModelAPIView
 from extras.api.renderers import BINDZoneRenderer, FlatJSONRenderer
-from utilities.api import ServiceUnavailable
-from .exceptions import MissingFilterException
+from extras.customfields import custom_field_cache
+from ipam.models import IPAddress
+from utilities.api import (
+    BulkWriteView, get_related_sources, Include, IncludeMixin, KeysetPagination, ListAPIView, RetrieveAPIView,
+    ServiceUnavailable,
+)
+from .exceptions import MissingFilterException, RemoteDeviceError
 from . import serializers
 
 
@@ -25,19 +43,19 @@ from . import serializers
 # Sites
 #
 
-class SiteListView(CustomFieldModelAPIView, generics.ListAPIView):
+class SiteListView(CustomFieldModelAPIView, ListAPIView):
     """
     List all sites
     """
-    queryset = Site.objects.select_related('tenant').prefetch_related('custom_field_values__field')
+    queryset = Site.objects.select_related('tenant').prefetch_related('custom_field_values')
     serializer_class = serializers.SiteSerializer
 
 
-class SiteDetailView(CustomFieldModelAPIView, generics.RetrieveAPIView):
+class SiteDetailView(CustomFieldModelAPIView, RetrieveAPIView):
     """
     Retrieve a single site
     """
-    queryset = Site.objects.select_related('tenant').prefetch_related('custom_field_values__field')
+    queryset = Site.objects.select_related('tenant').prefetch_related('custom_field_values')
     serializer_class = serializers.SiteSerializer
 
 
@@ -45,7 +63,7 @@ class SiteDetailView(CustomFieldModelAPIView, generics.RetrieveAPIView):
 # Rack groups
 #
 
-class RackGroupListView(generics.ListAPIView):
+class RackGroupListView(ListAPIView):
     """
     List all rack groups
     """
@@ -54,7 +72,7 @@ class RackGroupListView(generics.ListAPIView):
     filter_class = filters.RackGroupFilter
 
 
-class RackGroupDetailView(generics.RetrieveAPIView):
+class RackGroupDetailView(RetrieveAPIView):
     """
     Retrieve a single rack group
     """
@@ -66,7 +84,7 @@ class RackGroupDetailView(generics.RetrieveAPIView):
 # Rack roles
 #
 
-class RackRoleListView(generics.ListAPIView):
+class RackRoleListView(ListAPIView):
     """
     List all rack roles
     """
@@ -74,7 +92,7 @@ class RackRoleListView(generics.ListAPIView):
     serializer_class = serializers.RackRoleSerializer
 
 
-class RackRoleDetailView(generics.RetrieveAPIView):
+class RackRoleDetailView(RetrieveAPIView):
     """
     Retrieve a single rack role
     """
@@ -86,22 +104,22 @@ class RackRoleDetailView(generics.RetrieveAPIView):
 # Racks
 #
 
-class RackListView(CustomFieldModelAPIView, generics.ListAPIView):
+class RackListView(CustomFieldModelAPIView, ListAPIView):
     """
     List racks (filterable)
     """
     queryset = Rack.objects.select_related('site', 'group__site', 'tenant')\
-        .prefetch_related('custom_field_values__field')
+        .prefetch_related('custom_field_values')
     serializer_class = serializers.RackSerializer
     filter_class = filters.RackFilter
 
 
-class RackDetailView(CustomFieldModelAPIView, generics.RetrieveAPIView):
+class RackDetailView(CustomFieldModelAPIView, RetrieveAPIView):
     """
     Retrieve a single rack
     """
     queryset = Rack.objects.select_related('site', 'group__site', 'tenant')\
-        .prefetch_related('custom_field_values__field')
+        .prefetch_related('custom_field_values')
     serializer_class = serializers.RackDetailSerializer
 
 
@@ -132,7 +150,7 @@ class RackUnitListView(APIView):
 # Manufacturers
 #
 
-class ManufacturerListView(generics.ListAPIView):
+class ManufacturerListView(ListAPIView):
     """
     List all hardware manufacturers
     """
@@ -140,7 +158,7 @@ class ManufacturerListView(generics.ListAPIView):
     serializer_class = serializers.ManufacturerSerializer
 
 
-class ManufacturerDetailView(generics.RetrieveAPIView):
+class ManufacturerDetailView(RetrieveAPIView):
     """
     Retrieve a single hardware manufacturers
     """
@@ -152,20 +170,20 @@ class ManufacturerDetailView(generics.RetrieveAPIView):
 # Device Types
 #
 
-class DeviceTypeListView(CustomFieldModelAPIView, generics.ListAPIView):
+class DeviceTypeListView(CustomFieldModelAPIView, ListAPIView):
     """
     List device types (filterable)
     """
-    queryset = DeviceType.objects.select_related('manufacturer').prefetch_related('custom_field_values__field')
+    queryset = DeviceType.objects.select_related('manufacturer').prefetch_related('custom_field_values')
     serializer_class = serializers.DeviceTypeSerializer
     filter_class = filters.DeviceTypeFilter
 
 
-class DeviceTypeDetailView(CustomFieldModelAPIView, generics.RetrieveAPIView):
+class DeviceTypeDetailView(CustomFieldModelAPIView, RetrieveAPIView):
     """
     Retrieve a single device type
     """
-    queryset = DeviceType.objects.select_related('manufacturer').prefetch_related('custom_field_values__field')
+    queryset = DeviceType.objects.select_related('manufacturer').prefetch_related('custom_field_values')
     serializer_class = serializers.DeviceTypeDetailSerializer
 
 
@@ -173,7 +191,7 @@ class DeviceTypeDetailView(CustomFieldModelAPIView, generics.RetrieveAPIView):
 # Device roles
 #
 
-class DeviceRoleListView(generics.ListAPIView):
+class DeviceRoleListView(ListAPIView):
     """
     List all device roles
     """
@@ -181,7 +199,7 @@ class DeviceRoleListView(generics.ListAPIView):
     serializer_class = serializers.DeviceRoleSerializer
 
 
-class DeviceRoleDetailView(generics.RetrieveAPIView):
+class DeviceRoleDetailView(RetrieveAPIView):
     """
     Retrieve a single device role
     """
@@ -193,7 +211,7 @@ class DeviceRoleDetailView(generics.RetrieveAPIView):
 # Platforms
 #
 
-class PlatformListView(generics.ListAPIView):
+class PlatformListView(ListAPIView):
     """
     List all platforms
     """
@@ -201,7 +219,7 @@ class PlatformListView(generics.ListAPIView):
     serializer_class = serializers.PlatformSerializer
 
 
-class PlatformDetailView(generics.RetrieveAPIView):
+class PlatformDetailView(RetrieveAPIView):
     """
     Retrieve a single platform
     """
@@ -213,42 +231,147 @@ class PlatformDetailView(generics.RetrieveAPIView):
 # Devices
 #
 
-class DeviceListView(CustomFieldModelAPIView, generics.ListAPIView):
+def prefetch_device_interfaces(devices):
+    """
+    Retrieve the Interfaces of many Devices, and resolve their connections, with three queries.
+    """
+    prefetch_related_objects(devices, 'interfaces')
+    prefetch_interface_connections([iface for device in devices for iface in device.interfaces.all()])
+
+
+def prefetch_device_ip_addresses(devices):
+    """
+    Retrieve the IPAddresses assigned to the Interfaces of many Devices with a single query, and store them as each
+    Device's ip_addresses.
+    """
+    ip_addresses = defaultdict(list)
+    for ip in IPAddress.objects.filter(interface__device__in=[device.pk for device in devices])\
+            .select_related('interface'):
+        ip_addresses[ip.interface.device_id].append(ip)
+    for device in devices:
+        device.ip_addresses = ip_addresses[device.pk]
+
+
+def device_interface_sources(devices):
+    """
+    Return QuerySets of the Interfaces of the given Devices, along with their connections and circuit terminations.
+    """
+    interfaces = Interface.objects.filter(device__in=devices.order_by().values('pk'))
+    pks = interfaces.order_by().values('pk')
+    return [
+        interfaces,
+        InterfaceConnection.objects.filter(Q(interface_a__in=pks) | Q(interface_b__in=pks)),
+        CircuitTermination.objects.filter(interface__in=pks),
+    ]
+
+
+def device_ip_address_sources(devices):
+    """
+    Return a QuerySet of the IPAddresses assigned to the Interfaces of the given Devices.
+    """
+    return [IPAddress.objects.filter(interface__device__in=devices.order_by().values('pk'))]
+
+
+def device_component_sources(queryset):
+    """
+    Return a function which, given a QuerySet of Devices, returns the components in the given QuerySet which belong to
+    them along with the related objects which it selects (e.g. the console server ports which console ports connect to).
+    """
+    def get_sources(devices):
+        components = queryset.filter(device__in=devices.order_by().values('pk'))
+        return [components] + get_related_sources(components)
+    return get_sources
+
+
+DEVICE_CONSOLE_PORTS = ConsolePort.objects.select_related('cs_port__device')
+DEVICE_POWER_PORTS = PowerPort.objects.select_related('power_outlet__device')
+DEVICE_MODULES = Module.objects.select_related('manufacturer')
+
+DEVICE_INCLUDES = {
+    'interfaces': Include(serializers.DeviceInterfaceSerializer, prefetch_device_interfaces,
+                          sources=device_interface_sources),
+    'console_ports': Include(serializers.DeviceConsolePortSerializer, Prefetch('console_ports', DEVICE_CONSOLE_PORTS),
+                             sources=device_component_sources(DEVICE_CONSOLE_PORTS)),
+    'power_ports': Include(serializers.DevicePowerPortSerializer, Prefetch('power_ports', DEVICE_POWER_PORTS),
+                           sources=device_component_sources(DEVICE_POWER_PORTS)),
+    'modules': Include(serializers.DeviceModuleSerializer, Prefetch('modules', DEVICE_MODULES),
+                       sources=device_component_sources(DEVICE_MODULES)),
+    'ip_addresses': Include(serializers.DeviceIPAddressSerializer, prefetch_device_ip_addresses,
+                            sources=device_ip_address_sources),
+}
+
+
+class DeviceListView(CustomFieldModelAPIView, IncludeMixin, ListAPIView):
     """
     List devices (filterable)
     """
     queryset = Device.objects.select_related('device_type__manufacturer', 'device_role', 'tenant', 'platform',
                                              'rack__site', 'parent_bay').prefetch_related('primary_ip4__nat_outside',
                                                                                           'primary_ip6__nat_outside',
-                                                                                          'custom_field_values__field')
+                                                                                          'custom_field_values')
     serializer_class = serializers.DeviceSerializer
     filter_class = filters.DeviceFilter
     renderer_classes = api_settings.DEFAULT_RENDERER_CLASSES + [BINDZoneRenderer, FlatJSONRenderer]
+    field_dependencies = {
+        'display_name': ['name', 'position', 'device_type', 'rack'],
+        'parent_device': ['parent_bay'],
+        'primary_ip': ['primary_ip4', 'primary_ip6'],
+        'custom_fields': ['custom_field_values'],
+    }
+    includes = DEVICE_INCLUDES
 
 
-class DeviceDetailView(CustomFieldModelAPIView, generics.RetrieveAPIView):
+class DeviceDetailView(CustomFieldModelAPIView, IncludeMixin, RetrieveAPIView):
     """
     Retrieve a single device
     """
     queryset = Device.objects.select_related('device_type__manufacturer', 'device_role', 'tenant', 'platform',
-                                             'rack__site', 'parent_bay').prefetch_related('custom_field_values__field')
+                                             'rack__site', 'parent_bay').prefetch_related('custom_field_values')
     serializer_class = serializers.DeviceSerializer
+    includes = DEVICE_INCLUDES
 
 
 #
-# Console ports
+# Device components
 #
 
-class ConsolePortListView(generics.ListAPIView):
+class ComponentPagination(KeysetPagination):
     """
-    List console ports (by device)
+    Always paginate lists of the components of all devices, which can be very large. Lists of a single device's
+    components are paginated only on request.
     """
-    serializer_class = serializers.ConsolePortSerializer
+
+    def is_paginated(self, request):
+        return 'pk' not in request.parser_context['kwargs'] or super(ComponentPagination, self).is_paginated(request)
+
+
+class ComponentListView(ListAPIView):
+    """
+    List the components of the device given by pk or, if none is given, of all devices.
+    """
+    pagination_class = ComponentPagination
 
     def get_queryset(self):
 
-        device = get_object_or_404(Device, pk=self.kwargs['pk'])
-        return ConsolePort.objects.filter(device=device).select_related('cs_port')
+        queryset = super(ComponentListView, self).get_queryset()
+        if 'pk' in self.kwargs:
+            device = get_object_or_404(Device, pk=self.kwargs['pk'])
+            queryset = queryset.filter(device=device)
+        return queryset
+
+
+#
+# Console ports
+#
+
+class ConsolePortListView(ComponentListView):
+    """
+    List console ports (optionally by device)
+    """
+    queryset = ConsolePort.objects.select_related('device__device_type__manufacturer', 'device__rack',
+                                                  'cs_port__device__device_type__manufacturer', 'cs_port__device__rack')
+    serializer_class = serializers.ConsolePortSerializer
+    filter_class = filters.ConsolePortFilter
 
 
 class ConsolePortView(generics.RetrieveUpdateDestroyAPIView):
@@ -261,7 +384,7 @@ class ConsolePortView(generics.RetrieveUpdateDestroyAPIView):
 # Console server ports
 #
 
-class ConsoleServerPortListView(generics.ListAPIView):
+class ConsoleServerPortListView(ListAPIView):
     """
     List console server ports (by device)
     """
@@ -277,16 +400,15 @@ class ConsoleServerPortListView(generics.ListAPIView):
 # Power ports
 #
 
-class PowerPortListView(generics.ListAPIView):
+class PowerPortListView(ComponentListView):
     """
-    List power ports (by device)
+    List power ports (optionally by device)
     """
+    queryset = PowerPort.objects.select_related('device__device_type__manufacturer', 'device__rack',
+                                                'power_outlet__device__device_type__manufacturer',
+                                                'power_outlet__device__rack')
     serializer_class = serializers.PowerPortSerializer
-
-    def get_queryset(self):
-
-        device = get_object_or_404(Device, pk=self.kwargs['pk'])
-        return PowerPort.objects.filter(device=device).select_related('power_outlet')
+    filter_class = filters.PowerPortFilter
 
 
 class PowerPortView(generics.RetrieveUpdateDestroyAPIView):
@@ -299,33 +421,32 @@ class PowerPortView(generics.RetrieveUpdateDestroyAPIView):
 # Power outlets
 #
 
-class PowerOutletListView(generics.ListAPIView):
+class PowerOutletListView(ComponentListView):
     """
-    List power outlets (by device)
+    List power outlets (optionally by device)
     """
+    queryset = PowerOutlet.objects.select_related('device__device_type__manufacturer', 'device__rack',
+                                                  'connected_port')
     serializer_class = serializers.PowerOutletSerializer
-
-    def get_queryset(self):
-
-        device = get_object_or_404(Device, pk=self.kwargs['pk'])
-        return PowerOutlet.objects.filter(device=device).select_related('connected_port')
+    filter_class = filters.PowerOutletFilter
 
 
 #
 # Interfaces
 #
 
-class InterfaceListView(generics.ListAPIView):
+class InterfaceListView(ComponentListView):
     """
-    List interfaces (by device)
+    List interfaces (optionally by device). The connections of all listed interfaces are resolved in bulk (see
+    InterfaceListSerializer).
     """
+    queryset = Interface.objects.select_related('device__device_type__manufacturer', 'device__rack')
     serializer_class = serializers.InterfaceSerializer
     filter_class = filters.InterfaceFilter
 
     def get_queryset(self):
 
-        device = get_object_or_404(Device, pk=self.kwargs['pk'])
-        queryset = Interface.objects.filter(device=device).select_related('connected_as_a', 'connected_as_b')
+        queryset = super(InterfaceListView, self).get_queryset()
 
         # Filter by type (physical or virtual)
         iface_type = self.request.query_params.get('type')
@@ -338,8 +459,16 @@ class InterfaceListView(generics.ListAPIView):
 
         return queryset
 
+    def get_validator_sources(self):
+        # Connections are retrieved separately from the queryset (see prefetch_interface_connections())
+        pks = self.get_validator_queryset().order_by().values('pk')
+        return super(InterfaceListView, self).get_validator_sources() + [
+            InterfaceConnection.objects.filter(Q(interface_a__in=pks) | Q(interface_b__in=pks)),
+            CircuitTermination.objects.filter(interface__in=pks),
+        ]
 
-class InterfaceDetailView(generics.RetrieveAPIView):
+
+class InterfaceDetailView(RetrieveAPIView):
     """
     Retrieve a single interface
     """
@@ -347,13 +476,36 @@ class InterfaceDetailView(generics.RetrieveAPIView):
     serializer_class = serializers.InterfaceDetailSerializer
 
 
+class InterfaceBulkView(BulkWriteView):
+    """
+    Create, update, or delete many interfaces
+    """
+    queryset = Interface.objects.all()
+    serializer_class = serializers.WritableInterfaceSerializer
+
+    def clean_objects(self, objs):
+
+        # Virtual interfaces cannot be connected (see Interface.clean())
+        virtual = {obj.pk: i for i, obj in objs if obj.pk is not None and obj.form_factor == IFACE_FF_VIRTUAL}
+        if not virtual:
+            return
+        connected = set(CircuitTermination.objects.filter(interface__in=virtual).values_list('interface', flat=True))
+        for a, b in InterfaceConnection.objects.filter(Q(interface_a__in=virtual) | Q(interface_b__in=virtual))\
+                .values_list('interface_a', 'interface_b'):
+            connected.update([a, b])
+        for pk in connected.intersection(virtual):
+            self.add_error(virtual[pk], 'form_factor', "Virtual interfaces cannot be connected to another interface or "
+                                                       "circuit. Disconnect the interface or choose a physical form "
+                                                       "factor.")
+
+
 class InterfaceConnectionView(generics.RetrieveUpdateDestroyAPIView):
     permission_classes = [DjangoModelPermissionsOrAnonReadOnly]
     serializer_class = serializers.InterfaceConnectionSerializer
     queryset = InterfaceConnection.objects.all()
 
 
-class InterfaceConnectionListView(generics.ListAPIView):
+class InterfaceConnectionListView(ListAPIView):
     """
     Retrieve a list of all interface connections
     """
@@ -361,11 +513,24 @@ class InterfaceConnectionListView(generics.ListAPIView):
     queryset = InterfaceConnection.objects.all()
 
 
+class InterfaceTraceView(APIView):
+    """
+    Trace the complete connection path (across interface connections and circuits) on which an interface lies
+    """
+
+    def get(self, request, pk):
+
+        interface = get_object_or_404(Interface, pk=pk)
+        path = connection_graph.trace((NODE_INTERFACE, interface.pk))
+
+        return Response(serialize_path(path))
+
+
 #
 # Device bays
 #
 
-class DeviceBayListView(generics.ListAPIView):
+class DeviceBayListView(ListAPIView):
     """
     List device bays (by device)
     """
@@ -381,7 +546,7 @@ class DeviceBayListView(generics.ListAPIView):
 # Modules
 #
 
-class ModuleListView(generics.ListAPIView):
+class ModuleListView(ListAPIView):
     """
     List device modules (by device)
     """
@@ -393,33 +558,223 @@ class ModuleListView(generics.ListAPIView):
         return Module.objects.filter(device=device).select_related('device', 'manufacturer')
 
 
+class DeviceInventoryView(APIView):
+    """
+    Retrieve the complete module hierarchy of a device
+    """
+
+    def get(self, request, pk):
+
+        device = get_object_or_404(Device, pk=pk)
+        modules = get_module_tree(device)
+
+        return Response({
+            'device': serializers.DeviceNestedSerializer(device).data,
+            'modules': serializers.ModuleTreeSerializer(modules, many=True).data,
+        })
+
+
 #
 # Live queries
 #
 
+class LiveQueryPermission(DjangoModelPermissionsOrAnonReadOnly):
+    """
+    Reading the last collected data is allowed as for any other object, but requesting a refresh (which opens RPC
+    sessions to the devices) requires permission to change devices. Used alongside the default permission classes,
+    so that LOGIN_REQUIRED is still honored.
+    """
+    perms_map = dict(DjangoModelPermissionsOrAnonReadOnly.perms_map, POST=['%(app_label)s.change_%(model_name)s'])
+
+
 class LLDPNeighborsView(APIView):
     """
-    Retrieve live LLDP neighbors of a device
+    Retrieve the LLDP neighbors of a device (as last collected), or request that they be refreshed (POST)
     """
+    queryset = Device.objects.all()
+    permission_classes = list(api_settings.DEFAULT_PERMISSION_CLASSES) + [LiveQueryPermission]
 
-    def get(self, request, pk):
+    def get_device(self, pk):
 
-        device = get_object_or_404(Device, pk=pk)
+        device = get_object_or_404(Device.objects.select_related('platform', 'primary_ip4', 'primary_ip6'), pk=pk)
         if not device.primary_ip:
             raise ServiceUnavailable(detail="No IP configured for this device.")
-
-        RPC = device.get_rpc_client()
-        if not RPC:
+        if not device.get_rpc_client():
             raise ServiceUnavailable(detail="No RPC client available for this platform ({}).".format(device.platform))
 
-        # Connect to device and retrieve inventory info
-        try:
-            with RPC(device, username=settings.NETBOX_USERNAME, password=settings.NETBOX_PASSWORD) as rpc_client:
-                lldp_neighbors = rpc_client.get_lldp_neighbors()
-        except:
-            raise ServiceUnavailable(detail="Error connecting to the remote device.")
+        return device
+
+    def get(self, request, pk):
+
+        device = self.get_device(pk)
+
+        # If no neighbors have been collected, schedule collection in the background (unless it is already pending)
+        result = get_lldp_neighbors(device.pk)
+        if result is None:
+            lldp_collector.refresh([device])
+            return Response({
+                'detail': "LLDP neighbors are being collected. Please try again shortly.",
+                'pending': True,
+            }, status=status.HTTP_503_SERVICE_UNAVAILABLE, headers={'Retry-After': 3})
+        if result['error'] is not None:
+            raise RemoteDeviceError()
+
+        return Response(result['neighbors'], headers={'Age': int(time.time() - result['collected'])})
+
+    def post(self, request, pk):
+
+        device = self.get_device(pk)
+        lldp_collector.refresh([device])
+
+        return Response({'pending': True}, status=status.HTTP_202_ACCEPTED)
+
+
+class SiteLLDPNeighborsView(APIView):
+    """
+    Compare the last collected LLDP neighbors of all devices within a site to their documented interface connections,
+    or request that they be refreshed (POST)
+    """
+    queryset = Device.objects.all()
+    permission_classes = list(api_settings.DEFAULT_PERMISSION_CLASSES) + [LiveQueryPermission]
+
+    def get(self, request, pk):
+
+        site = get_object_or_404(Site, pk=pk)
+        devices = Device.objects.filter(rack__site=site)
+
+        report = []
+        for row in compare_lldp_neighbors(devices):
+            iface, connected_iface, neighbor = row['interface'], row['connected_interface'], row['neighbor']
+            report.append({
+                'device': serializers.DeviceNestedSerializer(iface.device).data,
+                'interface': iface.name,
+                'connected_device': connected_iface.device.name if connected_iface else None,
+                'connected_interface': connected_iface.name if connected_iface else None,
+                'lldp_device': neighbor['name'] if neighbor else None,
+                'lldp_interface': neighbor['remote-interface'] if neighbor else None,
+                'status': row['status'],
+            })
+
+        return Response(report)
+
+    def post(self, request, pk):
+
+        site = get_object_or_404(Site, pk=pk)
+        devices = [
+            d for d in Device.objects.filter(rack__site=site, status=True)
+            .select_related('platform', 'primary_ip4', 'primary_ip6')
+            if d.primary_ip and d.get_rpc_client()
+        ]
+        queued = lldp_collector.refresh(devices)
+
+        return Response({'pending': len(devices), 'queued': queued}, status=status.HTTP_202_ACCEPTED)
+
+
+#
+# MAC addresses
+#
+
+MAC_RESOLVE_MAX = 50000
+
+
+class MACAddressResolveView(APIView):
+    """
+    Resolve a list of MAC addresses (POST {"mac_addresses": [...]}) to the interfaces which have them, along with each
+    interface's device, site, and IP addresses. All MAC addresses are resolved using two queries.
+    """
 
-        return Response(lldp_neighbors)
+    def post(self, request):
+
+        mac_addresses = request.data.get('mac_addresses') if isinstance(request.data, dict) else None
+        if not isinstance(mac_addresses, list):
+            raise ValidationError({'mac_addresses': "Must provide a list of MAC addresses."})
+        if len(mac_addresses) > MAC_RESOLVE_MAX:
+            raise ValidationError({'mac_addresses': "Cannot resolve more than {} MAC addresses per request.".format(
+                MAC_RESOLVE_MAX
+            )})
+
+        # Normalize MAC addresses, preserving the order given
+        mac_field = Interface._meta.get_field('mac_address')
+        mac_map = OrderedDict()
+        invalid = []
+        for value in mac_addresses:
+            try:
+                mac_address = mac_field.to_python(value)
+            except DjangoValidationError:
+                mac_address = None
+            if mac_address is None:
+                invalid.append(value)
+            else:
+                mac_map[str(mac_address)] = value
+
+        interfaces = Interface.objects.filter(mac_address__in=mac_map.keys()).values(
+            'id', 'name', 'mac_address', 'device_id', 'device__name', 'device__rack__site_id',
+            'device__rack__site__name', 'device__rack__site__slug',
+        )
+        ip_addresses = {}
+        for ip in IPAddress.objects.filter(interface__in=[i['id'] for i in interfaces])\
+                .values('id', 'interface_id', 'family', 'address', 'vrf_id').order_by('family', 'address'):
+            ip_addresses.setdefault(ip['interface_id'], []).append({
+                'id': ip['id'],
+                'family': ip['family'],
+                'address': str(ip['address']),
+                'vrf': ip['vrf_id'],
+            })
+
+        matches = {}
+        for iface in interfaces:
+            matches.setdefault(str(iface['mac_address']), []).append(OrderedDict([
+                ('interface', OrderedDict([('id', iface['id']), ('name', iface['name'])])),
+                ('device', OrderedDict([('id', iface['device_id']), ('name', iface['device__name'])])),
+                ('site', OrderedDict([
+                    ('id', iface['device__rack__site_id']),
+                    ('name', iface['device__rack__site__name']),
+                    ('slug', iface['device__rack__site__slug']),
+                ])),
+                ('ip_addresses', ip_addresses.get(iface['id'], [])),
+            ]))
+
+        results = []
+        unresolved = []
+        for mac_address, value in mac_map.items():
+            if mac_address in matches:
+                results.append({'mac_address': mac_address, 'interfaces': matches[mac_address]})
+            else:
+                unresolved.append(value)
+
+        return Response(OrderedDict([
+            ('results', results),
+            ('unresolved', unresolved),
+            ('invalid', invalid),
+        ]))
+
+
+#
+# Connection paths
+#
+
+PATH_SERIALIZERS = {
+    NODE_INTERFACE: serializers.InterfaceNestedSerializer,
+    NODE_CIRCUITTERMINATION: serializers.PathCircuitTerminationSerializer,
+    NODE_CONSOLEPORT: serializers.ConsolePortNestedSerializer,
+    NODE_CONSOLESERVERPORT: serializers.ConsoleServerPortNestedSerializer,
+    NODE_POWERPORT: serializers.PowerPortNestedSerializer,
+    NODE_POWEROUTLET: serializers.PowerOutletNestedSerializer,
+}
+
+
+def serialize_path(nodes):
+    """
+    Serialize a list of connection graph nodes (see dcim.tracing) in order. Nodes whose objects no longer exist are
+    omitted.
+    """
+    objects = resolve_nodes(nodes)
+    return [
+        {
+            'type': node[0],
+            'object': PATH_SERIALIZERS[node[0]](objects[node]).data,
+        } for node in nodes if node in objects
+    ]
 
 
 #
@@ -436,7 +791,7 @@ class RelatedConnectionsView(APIView):
 
         # Custom fields
         self.content_type = ContentType.objects.get_for_model(Device)
-        self.custom_fields = self.content_type.custom_fields.prefetch_related('choices')
+        self.custom_fields = custom_field_cache.get_fields(self.content_type)
 
     def get(self, request):
 
@@ -483,8 +838,7 @@ class RelatedConnectionsView(APIView):
             response['power-ports'].append(data)
 
         # Interface connections
-        interfaces = Interface.objects.filter(device=device).select_related('connected_as_a', 'connected_as_b',
-                                                                            'circuit_termination')
+        interfaces = prefetch_interface_connections(Interface.objects.filter(device=device))
         for iface in interfaces:
             data = serializers.InterfaceDetailSerializer(instance=iface).data
             del(data['device'])
@@ -1,6 +1,17 @@
 from django.apps import AppConfig
+from django.db.models.signals import post_delete, post_save
 
 
 class DCIMConfig(AppConfig):
     name = "dcim"
     verbose_name = "DCIM"
+
+    def ready(self):
+        from circuits.models import CircuitTermination
+        from .models import ConsolePort, InterfaceConnection, PowerPort
+        from .tracing import remove_from_connection_graph, update_connection_graph
+
+        # Keep the in-memory connection graph up to date
+        for model in (InterfaceConnection, CircuitTermination, ConsolePort, PowerPort):
+            post_save.connect(update_connection_graph, sender=model)
+            post_delete.connect(remove_from_connection_graph, sender=model)
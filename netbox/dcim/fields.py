@@ -1,4 +1,4 @@
-from netaddr import EUI, mac_unix_expanded
+from netaddr import AddrFormatError, EUI, mac_unix_expanded
 
 from django.core.exceptions import ValidationError
 from django.core.validators import MinValueValidator, MaxValueValidator
@@ -31,10 +31,13 @@ class MACAddressField(models.Field):
     def to_python(self, value):
         if value is None:
             return value
+        # netaddr would interpret an integer as a MAC address
+        if not isinstance(value, (EUI, basestring)):
+            raise ValidationError("Invalid MAC address: {!r}".format(value))
         try:
             return EUI(value, version=48, dialect=mac_unix_expanded_uppercase)
-        except ValueError as e:
-            raise ValidationError(e)
+        except (AddrFormatError, ValueError) as e:
+            raise ValidationError(str(e))
 
     def db_type(self, connection):
         return 'macaddr'
@@ -1,14 +1,14 @@
 import django_filters
-from netaddr.core import AddrFormatError
 
+from django.core.exceptions import ValidationError
 from django.db.models import Q
 
 from extras.filters import CustomFieldFilterSet
 from tenancy.models import Tenant
 from utilities.filters import NullableModelMultipleChoiceFilter
 from .models import (
-    ConsolePort, ConsoleServerPort, Device, DeviceRole, DeviceType, Interface, InterfaceConnection, Manufacturer,
-    Platform, PowerOutlet, PowerPort, Rack, RackGroup, RackRole, Site,
+    ConsolePort, ConsoleServerPort, Device, DeviceRole, DeviceType, IFACE_FF_CHOICES, Interface, InterfaceConnection,
+    Manufacturer, Platform, PowerOutlet, PowerPort, Rack, RackGroup, RackRole, Site,
 )
 
 
@@ -277,11 +277,29 @@ class DeviceFilter(CustomFieldFilterSet, django_filters.FilterSet):
             return queryset
         try:
             return queryset.filter(interfaces__mac_address=value).distinct()
-        except AddrFormatError:
+        except ValidationError:
             return queryset.none()
 
 
-class ConsolePortFilter(django_filters.FilterSet):
+class ConnectedFilter(django_filters.BooleanFilter):
+    """
+    Filter device components by whether they are connected, given a Q object which matches the connected components.
+    """
+
+    def __init__(self, connected, *args, **kwargs):
+        self.connected = connected
+        super(ConnectedFilter, self).__init__(*args, **kwargs)
+
+    def filter(self, qs, value):
+        if value is None:
+            return qs
+        return qs.filter(self.connected) if value else qs.exclude(self.connected)
+
+
+class DeviceComponentFilterSet(django_filters.FilterSet):
+    """
+    Filters common to all device components, which select components by the attributes of their devices.
+    """
     device_id = django_filters.ModelMultipleChoiceFilter(
         name='device',
         queryset=Device.objects.all(),
@@ -293,82 +311,104 @@ class ConsolePortFilter(django_filters.FilterSet):
         to_field_name='name',
         label='Device (name)',
     )
+    site_id = django_filters.ModelMultipleChoiceFilter(
+        name='device__rack__site',
+        queryset=Site.objects.all(),
+        label='Site (ID)',
+    )
+    site = django_filters.ModelMultipleChoiceFilter(
+        name='device__rack__site',
+        queryset=Site.objects.all(),
+        to_field_name='slug',
+        label='Site name (slug)',
+    )
+    rack_id = django_filters.ModelMultipleChoiceFilter(
+        name='device__rack',
+        queryset=Rack.objects.all(),
+        label='Rack (ID)',
+    )
+    role_id = django_filters.ModelMultipleChoiceFilter(
+        name='device__device_role',
+        queryset=DeviceRole.objects.all(),
+        label='Role (ID)',
+    )
+    role = django_filters.ModelMultipleChoiceFilter(
+        name='device__device_role',
+        queryset=DeviceRole.objects.all(),
+        to_field_name='slug',
+        label='Role (slug)',
+    )
+
+
+class ConsolePortFilter(DeviceComponentFilterSet):
+    is_connected = ConnectedFilter(
+        Q(cs_port__isnull=False),
+        label='Is connected',
+    )
 
     class Meta:
         model = ConsolePort
-        fields = ['device_id', 'device', 'name']
+        fields = ['device_id', 'device', 'site_id', 'site', 'rack_id', 'role_id', 'role', 'name', 'is_connected',
+                  'connection_status']
 
 
-class ConsoleServerPortFilter(django_filters.FilterSet):
-    device_id = django_filters.ModelMultipleChoiceFilter(
-        name='device',
-        queryset=Device.objects.all(),
-        label='Device (ID)',
-    )
-    device = django_filters.ModelMultipleChoiceFilter(
-        name='device',
-        queryset=Device.objects.all(),
-        to_field_name='name',
-        label='Device (name)',
-    )
+class ConsoleServerPortFilter(DeviceComponentFilterSet):
 
     class Meta:
         model = ConsoleServerPort
-        fields = ['device_id', 'device', 'name']
+        fields = ['device_id', 'device', 'site_id', 'site', 'rack_id', 'role_id', 'role', 'name']
 
 
-class PowerPortFilter(django_filters.FilterSet):
-    device_id = django_filters.ModelMultipleChoiceFilter(
-        name='device',
-        queryset=Device.objects.all(),
-        label='Device (ID)',
-    )
-    device = django_filters.ModelMultipleChoiceFilter(
-        name='device',
-        queryset=Device.objects.all(),
-        to_field_name='name',
-        label='Device (name)',
+class PowerPortFilter(DeviceComponentFilterSet):
+    is_connected = ConnectedFilter(
+        Q(power_outlet__isnull=False),
+        label='Is connected',
     )
 
     class Meta:
         model = PowerPort
-        fields = ['device_id', 'device', 'name']
+        fields = ['device_id', 'device', 'site_id', 'site', 'rack_id', 'role_id', 'role', 'name', 'is_connected',
+                  'connection_status']
 
 
-class PowerOutletFilter(django_filters.FilterSet):
-    device_id = django_filters.ModelMultipleChoiceFilter(
-        name='device',
-        queryset=Device.objects.all(),
-        label='Device (ID)',
-    )
-    device = django_filters.ModelMultipleChoiceFilter(
-        name='device',
-        queryset=Device.objects.all(),
-        to_field_name='name',
-        label='Device (name)',
+class PowerOutletFilter(DeviceComponentFilterSet):
+    is_connected = ConnectedFilter(
+        Q(connected_port__isnull=False),
+        label='Is connected',
     )
 
     class Meta:
         model = PowerOutlet
-        fields = ['device_id', 'device', 'name']
+        fields = ['device_id', 'device', 'site_id', 'site', 'rack_id', 'role_id', 'role', 'name', 'is_connected']
 
 
-class InterfaceFilter(django_filters.FilterSet):
-    device_id = django_filters.ModelMultipleChoiceFilter(
-        name='device',
-        queryset=Device.objects.all(),
-        label='Device (ID)',
+class InterfaceFilter(DeviceComponentFilterSet):
+    form_factor = django_filters.MultipleChoiceFilter(
+        choices=IFACE_FF_CHOICES,
+        label='Form factor',
     )
-    device = django_filters.ModelMultipleChoiceFilter(
-        name='device',
-        queryset=Device.objects.all(),
-        to_field_name='name',
-        label='Device (name)',
+    is_connected = ConnectedFilter(
+        Q(connected_as_a__isnull=False) | Q(connected_as_b__isnull=False) | Q(circuit_termination__isnull=False),
+        label='Is connected',
+    )
+    mac_address = django_filters.MethodFilter(
+        action='_mac_address',
+        label='MAC address',
     )
 
     class Meta:
         model = Interface
-        fields = ['device_id', 'device', 'name']
+        fields = ['device_id', 'device', 'site_id', 'site', 'rack_id', 'role_id', 'role', 'name', 'form_factor',
+                  'mgmt_only', 'is_connected', 'mac_address']
+
+    def _mac_address(self, queryset, value):
+        value = value.strip()
+        if not value:
+            return queryset
+        try:
+            return queryset.filter(mac_address=value)
+        except ValidationError:
+            return queryset.none()
 
 
 class ConsoleConnectionFilter(django_filters.FilterSet):
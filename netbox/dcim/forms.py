@@ -18,7 +18,7 @@ from .models import (
     ConsolePort, ConsolePortTemplate, ConsoleServerPort, ConsoleServerPortTemplate, Device, DeviceRole, DeviceType,
     Interface, IFACE_FF_CHOICES, IFACE_FF_VIRTUAL, InterfaceConnection, InterfaceTemplate, Manufacturer, Module,
     Platform, PowerOutlet, PowerOutletTemplate, PowerPort, PowerPortTemplate, RACK_TYPE_CHOICES, RACK_WIDTH_CHOICES,
-    Rack, RackGroup, RackRole, Site, STATUS_CHOICES, SUBDEVICE_ROLE_CHILD
+    Rack, RackGroup, RackOccupancy, RackRole, Site, STATUS_CHOICES, SUBDEVICE_ROLE_CHILD
 )
 
 
@@ -525,6 +525,9 @@ class DeviceFromCSVForm(BaseDeviceFromCSVForm):
             except Rack.DoesNotExist:
                 self.add_error('rack_name', "Invalid rack ({})".format(rack_name))
 
+        # Rack space is validated for all records at once by DeviceImportForm
+        self.instance.validate_rack_space = False
+
     def clean_face(self):
         face = self.cleaned_data['face']
         if not face:
@@ -570,6 +573,18 @@ class ChildDeviceFromCSVForm(BaseDeviceFromCSVForm):
 class DeviceImportForm(BulkImportForm, BootstrapMixin):
     csv = CSVDataField(csv_form=DeviceFromCSVForm)
 
+    def clean_objects(self, objs):
+
+        # Place each device in turn to detect conflicts both with installed devices and among the imported devices
+        occupancy = RackOccupancy(set(obj.rack for i, obj in objs))
+        for i, obj in objs:
+            try:
+                occupancy.place(obj)
+            except ValidationError as e:
+                for field, errors in e.message_dict.items():
+                    for error in errors:
+                        self.add_error('csv', "Record {} ({}): {}".format(i, field, error))
+
 
 class ChildDeviceImportForm(BulkImportForm, BootstrapMixin):
     csv = CSVDataField(csv_form=ChildDeviceFromCSVForm)
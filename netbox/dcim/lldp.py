@@ -0,0 +1,164 @@
+from Queue import Queue
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+
+from .models import prefetch_interface_connections, Interface
+
+
+LLDP_CACHE_TIMEOUT = 900  # seconds
+LLDP_ERROR_CACHE_TIMEOUT = 60
+LLDP_PENDING_TIMEOUT = 300
+LLDP_WORKERS = 8
+
+# LLDP report statuses
+LLDP_MATCH = 'match'
+LLDP_MISMATCH = 'mismatch'
+LLDP_UNDOCUMENTED = 'undocumented'
+LLDP_MISSING = 'missing'
+LLDP_UNKNOWN = 'unknown'
+
+
+def get_cache_key(device_pk):
+    return 'lldp_neighbors_{}'.format(device_pk)
+
+
+def get_pending_key(device_pk):
+    return 'lldp_pending_{}'.format(device_pk)
+
+
+class LLDPCollector(object):
+    """
+    Collect LLDP neighbors from devices using a pool of background worker threads. Results are cached for
+    LLDP_CACHE_TIMEOUT seconds (or LLDP_ERROR_CACHE_TIMEOUT seconds on error) as a dictionary:
+
+        {
+            'neighbors': <list as returned by RPCClient.get_lldp_neighbors(), or None on error>,
+            'error': <str or None>,
+            'collected': <timestamp>,
+        }
+
+    A device is marked as pending in the cache while it is queued or being collected, so that refreshes requested
+    for it in the meantime (by any process sharing the cache) are coalesced. The mark expires after
+    LLDP_PENDING_TIMEOUT seconds, should its process exit before collection finishes.
+    """
+
+    def __init__(self, workers=LLDP_WORKERS):
+        self.workers = workers
+        self.lock = threading.Lock()
+        self.pending = set()
+        self.queue = Queue()
+        self.threads = []
+
+    def refresh(self, devices):
+        """
+        Schedule collection for the given Devices, which must have their platform and primary IPs prefetched. Returns
+        the number of devices newly queued.
+        """
+        queued = 0
+        with self.lock:
+            for device in devices:
+                if cache.add(get_pending_key(device.pk), time.time(), LLDP_PENDING_TIMEOUT):
+                    self.pending.add(device.pk)
+                    self.queue.put(device)
+                    queued += 1
+            self.threads = [t for t in self.threads if t.is_alive()]
+            while len(self.threads) < min(self.workers, len(self.pending)):
+                thread = threading.Thread(target=self._run, name='lldp-collector')
+                thread.daemon = True
+                thread.start()
+                self.threads.append(thread)
+        return queued
+
+    def is_pending(self, device_pk):
+        return cache.get(get_pending_key(device_pk)) is not None
+
+    def _run(self):
+        while True:
+            device = self.queue.get()
+            result = {'neighbors': None, 'error': None}
+            try:
+                RPC = device.get_rpc_client()
+                with RPC(device, username=settings.NETBOX_USERNAME, password=settings.NETBOX_PASSWORD) as rpc_client:
+                    result['neighbors'] = rpc_client.get_lldp_neighbors()
+            except Exception as e:
+                result['error'] = str(e) or e.__class__.__name__
+            result['collected'] = time.time()
+            timeout = LLDP_CACHE_TIMEOUT if result['error'] is None else LLDP_ERROR_CACHE_TIMEOUT
+            cache.set(get_cache_key(device.pk), result, timeout)
+            cache.delete(get_pending_key(device.pk))
+            with self.lock:
+                self.pending.discard(device.pk)
+
+
+# A single collector is shared by all requests in a process
+lldp_collector = LLDPCollector()
+
+
+def get_lldp_neighbors(device_pk):
+    """
+    Return the cached LLDP result for a device, or None if none is cached.
+    """
+    return cache.get(get_cache_key(device_pk))
+
+
+def compare_lldp_neighbors(devices):
+    """
+    Compare the cached LLDP neighbors of the given Devices against their documented interface connections. Returns a
+    list of dictionaries, one per interface which is either connected or has an LLDP neighbor, each with a status of:
+
+        match: The LLDP neighbor matches the documented connection
+        mismatch: The LLDP neighbor differs from the documented connection
+        undocumented: An LLDP neighbor was seen but no connection is documented
+        missing: A connection is documented but no LLDP neighbor was seen
+        unknown: A connection is documented but no LLDP data is available for the device
+
+    Devices may be given as a QuerySet, which is evaluated as a subquery. Interfaces and connections are retrieved
+    with three queries in total, and cached results with a single cache call.
+    """
+    interfaces = prefetch_interface_connections(
+        Interface.objects.filter(device__in=devices).select_related('device')
+    )
+
+    # Devices without interfaces have nothing to report
+    device_pks = {iface.device_id for iface in interfaces}
+    cached = cache.get_many([get_cache_key(pk) for pk in device_pks])
+
+    # Map (device PK, interface name) to the observed LLDP neighbor
+    lldp_neighbors = {}
+    for pk in device_pks:
+        result = cached.get(get_cache_key(pk))
+        if result and result['neighbors'] is not None:
+            for neighbor in result['neighbors']:
+                lldp_neighbors[(pk, neighbor['local-interface'])] = neighbor
+
+    report = []
+    for iface in interfaces:
+        result = cached.get(get_cache_key(iface.device_id))
+        collected = bool(result and result['neighbors'] is not None)
+        neighbor = lldp_neighbors.get((iface.device_id, iface.name))
+        connected_iface = iface.get_connected_interface() if iface.connection else None
+
+        if connected_iface is None and neighbor is None:
+            continue
+        elif not collected:
+            status = LLDP_UNKNOWN
+        elif connected_iface is None:
+            status = LLDP_UNDOCUMENTED
+        elif neighbor is None:
+            status = LLDP_MISSING
+        elif neighbor['name'] == connected_iface.device.name and neighbor['remote-interface'] == connected_iface.name:
+            status = LLDP_MATCH
+        else:
+            status = LLDP_MISMATCH
+
+        report.append({
+            'interface': iface,
+            'connected_interface': connected_iface,
+            'neighbor': neighbor,
+            'status': status,
+        })
+
+    return report
@@ -0,0 +1,45 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import migrations
+import utilities.fields
+
+
+def naturalize_names(apps, schema_editor):
+    for model_name in ('Site', 'Rack', 'Device'):
+        model = apps.get_model('dcim', model_name)
+        for pk, name in model.objects.values_list('pk', 'name'):
+            model.objects.filter(pk=pk).update(_name=utilities.fields.naturalize(name))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dcim', '0023_devicetype_comments'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='site',
+            name='_name',
+            field=utilities.fields.NaturalOrderingField(blank=True, db_index=True, editable=False, max_length=100,
+                                                        null=True, target_field='name'),
+        ),
+        migrations.AddField(
+            model_name='rack',
+            name='_name',
+            field=utilities.fields.NaturalOrderingField(blank=True, editable=False, max_length=100, null=True,
+                                                        target_field='name'),
+        ),
+        migrations.AddField(
+            model_name='device',
+            name='_name',
+            field=utilities.fields.NaturalOrderingField(blank=True, db_index=True, editable=False, max_length=100,
+                                                        null=True, target_field='name'),
+        ),
+        migrations.AlterIndexTogether(
+            name='rack',
+            index_together=set([('site', '_name')]),
+        ),
+        migrations.RunPython(naturalize_names, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,62 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+import django.contrib.postgres.fields.ranges
+from django.db import migrations
+
+
+def check_overlaps(apps, schema_editor):
+    """
+    The exclusion constraint cannot be created while any Devices overlap, so report them by name.
+    """
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT a.name, b.name, r.name FROM dcim_device a "
+            "JOIN dcim_device b ON a.rack_id = b.rack_id AND a.id < b.id "
+            "AND a.occupied_units && b.occupied_units AND a.occupied_faces && b.occupied_faces "
+            "JOIN dcim_rack r ON r.id = a.rack_id"
+        )
+        overlaps = cursor.fetchall()
+    if overlaps:
+        raise RuntimeError("Cannot add rack unit constraint; the following devices overlap:\n{}".format(
+            '\n'.join("  {} and {} in rack {}".format(*o) for o in overlaps)
+        ))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dcim', '0024_site_rack_device_natural_ordering'),
+    ]
+
+    operations = [
+        migrations.RunSQL(
+            sql="CREATE EXTENSION IF NOT EXISTS btree_gist",
+            reverse_sql=migrations.RunSQL.noop,
+        ),
+        migrations.AddField(
+            model_name='device',
+            name='occupied_units',
+            field=django.contrib.postgres.fields.ranges.IntegerRangeField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='device',
+            name='occupied_faces',
+            field=django.contrib.postgres.fields.ranges.IntegerRangeField(blank=True, editable=False, null=True),
+        ),
+        migrations.RunSQL(
+            sql="UPDATE dcim_device AS d SET "
+                "occupied_units = int4range(d.position, d.position + t.u_height), "
+                "occupied_faces = CASE WHEN t.is_full_depth THEN int4range(0, 2) ELSE int4range(d.face, d.face + 1) END "
+                "FROM dcim_devicetype AS t "
+                "WHERE t.id = d.device_type_id AND d.position IS NOT NULL AND t.u_height > 0 "
+                "AND (t.is_full_depth OR d.face IS NOT NULL)",
+            reverse_sql=migrations.RunSQL.noop,
+        ),
+        migrations.RunPython(check_overlaps, migrations.RunPython.noop),
+        migrations.RunSQL(
+            sql="ALTER TABLE dcim_device ADD CONSTRAINT dcim_device_occupied_units_excl "
+                "EXCLUDE USING gist (rack_id WITH =, occupied_units WITH &&, occupied_faces WITH &&)",
+            reverse_sql="ALTER TABLE dcim_device DROP CONSTRAINT dcim_device_occupied_units_excl",
+        ),
+    ]
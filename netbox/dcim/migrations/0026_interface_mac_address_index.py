@@ -0,0 +1,20 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+import dcim.fields
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dcim', '0025_device_occupied_span'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='interface',
+            name='mac_address',
+            field=dcim.fields.MACAddressField(blank=True, db_index=True, null=True, verbose_name='MAC Address'),
+        ),
+    ]
@@ -1,19 +1,22 @@
 from collections import OrderedDict
+from psycopg2.extras import NumericRange
 
 from django.conf import settings
 from django.contrib.contenttypes.models import ContentType
 from django.contrib.contenttypes.fields import GenericRelation
+from django.contrib.postgres.fields import IntegerRangeField
 from django.core.exceptions import ValidationError
 from django.core.urlresolvers import reverse
 from django.core.validators import MaxValueValidator, MinValueValidator
-from django.db import models
+from django.db import connection, IntegrityError, models, transaction
 from django.db.models import Count, Q, ObjectDoesNotExist
 
-from circuits.models import Circuit
+from circuits.models import Circuit, CircuitTermination
+from extras.changelog import log_create, log_queryset_update
 from extras.models import CustomFieldModel, CustomField, CustomFieldValue
 from extras.rpc import RPC_CLIENTS
 from tenancy.models import Tenant
-from utilities.fields import ColorField, NullableCharField
+from utilities.fields import ColorField, NaturalOrderingField, NullableCharField
 from utilities.managers import NaturalOrderByManager
 from utilities.models import CreatedUpdatedModel
 
@@ -239,6 +242,7 @@ class Site(CreatedUpdatedModel, CustomFieldModel):
     field can be used to include an external designation, such as a data center name (e.g. Equinix SV6).
     """
     name = models.CharField(max_length=50, unique=True)
+    _name = NaturalOrderingField(target_field='name', db_index=True)
     slug = models.SlugField(unique=True)
     tenant = models.ForeignKey(Tenant, blank=True, null=True, related_name='sites', on_delete=models.PROTECT)
     facility = models.CharField(max_length=50, blank=True)
@@ -347,6 +351,7 @@ class Rack(CreatedUpdatedModel, CustomFieldModel):
     Each Rack is assigned to a Site and (optionally) a RackGroup.
     """
     name = models.CharField(max_length=50)
+    _name = NaturalOrderingField(target_field='name')
     facility_id = NullableCharField(max_length=30, blank=True, null=True, verbose_name='Facility ID')
     site = models.ForeignKey('Site', related_name='racks', on_delete=models.PROTECT)
     group = models.ForeignKey('RackGroup', related_name='racks', blank=True, null=True, on_delete=models.SET_NULL)
@@ -370,6 +375,9 @@ class Rack(CreatedUpdatedModel, CustomFieldModel):
             ['site', 'name'],
             ['site', 'facility_id'],
         ]
+        index_together = [
+            ['site', '_name'],
+        ]
 
     def __unicode__(self):
         return self.display_name
@@ -569,8 +577,9 @@ class DeviceType(models.Model, CustomFieldModel):
     def __init__(self, *args, **kwargs):
         super(DeviceType, self).__init__(*args, **kwargs)
 
-        # Save a copy of u_height for validation in clean()
+        # Save a copy of u_height and is_full_depth for validation in clean() and to detect changes in save()
         self._original_u_height = self.u_height
+        self._original_is_full_depth = self.is_full_depth
 
     def get_absolute_url(self):
         return reverse('dcim:devicetype', args=[self.pk])
@@ -580,7 +589,9 @@ class DeviceType(models.Model, CustomFieldModel):
         # If editing an existing DeviceType to have a larger u_height, first validate that *all* instances of it have
         # room to expand within their racks. This validation will impose a very high performance penalty when there are
         # many instances to check, but increasing the u_height of a DeviceType should be a very rare occurrence.
-        if self.pk is not None and self.u_height > self._original_u_height:
+        if self.pk is not None and (
+            self.u_height > self._original_u_height or (self.is_full_depth and not self._original_is_full_depth)
+        ):
             for d in Device.objects.filter(device_type=self, position__isnull=False):
                 face_required = None if self.is_full_depth else d.face
                 u_available = d.rack.get_available_units(u_height=self.u_height, rack_face=face_required,
@@ -620,6 +631,17 @@ class DeviceType(models.Model, CustomFieldModel):
                 'u_height': "Child device types must be 0U."
             })
 
+    def save(self, *args, **kwargs):
+
+        with transaction.atomic():
+            super(DeviceType, self).save(*args, **kwargs)
+
+            # Changing the height or depth of a DeviceType changes the rack units occupied by all of its instances
+            if (self.u_height, self.is_full_depth) != (self._original_u_height, self._original_is_full_depth):
+                update_rack_spans(Device.objects.filter(device_type=self))
+                self._original_u_height = self.u_height
+                self._original_is_full_depth = self.is_full_depth
+
     @property
     def full_name(self):
         return u'{} {}'.format(self.manufacturer.name, self.model)
@@ -800,6 +822,7 @@ class Device(CreatedUpdatedModel, CustomFieldModel):
     tenant = models.ForeignKey(Tenant, blank=True, null=True, related_name='devices', on_delete=models.PROTECT)
     platform = models.ForeignKey('Platform', related_name='devices', blank=True, null=True, on_delete=models.SET_NULL)
     name = NullableCharField(max_length=50, blank=True, null=True, unique=True)
+    _name = NaturalOrderingField(target_field='name', db_index=True)
     serial = models.CharField(max_length=50, blank=True, verbose_name='Serial number')
     asset_tag = NullableCharField(max_length=50, blank=True, null=True, unique=True, verbose_name='Asset tag',
                                   help_text='A unique tag used to identify this device')
@@ -808,6 +831,8 @@ class Device(CreatedUpdatedModel, CustomFieldModel):
                                                 verbose_name='Position (U)',
                                                 help_text='The lowest-numbered unit occupied by the device')
     face = models.PositiveSmallIntegerField(blank=True, null=True, choices=RACK_FACE_CHOICES, verbose_name='Rack face')
+    occupied_units = IntegerRangeField(blank=True, null=True, editable=False)
+    occupied_faces = IntegerRangeField(blank=True, null=True, editable=False)
     status = models.BooleanField(choices=STATUS_CHOICES, default=STATUS_ACTIVE, verbose_name='Status')
     primary_ip4 = models.OneToOneField('ipam.IPAddress', related_name='primary_ip4_for', on_delete=models.SET_NULL,
                                        blank=True, null=True, verbose_name='Primary IPv4')
@@ -818,6 +843,8 @@ class Device(CreatedUpdatedModel, CustomFieldModel):
 
     objects = DeviceManager()
 
+    validate_rack_space = True
+
     class Meta:
         ordering = ['name']
         unique_together = ['rack', 'position', 'face']
@@ -849,13 +876,16 @@ class Device(CreatedUpdatedModel, CustomFieldModel):
                                 "parent device."
                 })
 
-            # Validate rack space
-            rack_face = self.face if not self.device_type.is_full_depth else None
-            exclude_list = [self.pk] if self.pk else []
+            # Validate rack space (unless the caller validates many Devices at once using RackOccupancy)
+            if not self.validate_rack_space:
+                return
+            occupied_units, occupied_faces = self.get_rack_span()
             try:
-                available_units = self.rack.get_available_units(u_height=self.device_type.u_height, rack_face=rack_face,
-                                                                exclude=exclude_list)
-                if self.position and self.position not in available_units:
+                if occupied_units and (
+                    occupied_units.upper - 1 > self.rack.u_height or
+                    Device.objects.filter(rack=self.rack, occupied_units__overlap=occupied_units,
+                                          occupied_faces__overlap=occupied_faces).exclude(pk=self.pk).exists()
+                ):
                     raise ValidationError({
                         'position': "U{} is already occupied or does not have sufficient space to accommodate a(n) {} "
                                     "({}U).".format(self.position, self.device_type, self.device_type.u_height)
@@ -870,37 +900,45 @@ class Device(CreatedUpdatedModel, CustomFieldModel):
 
         is_new = not bool(self.pk)
 
+        # Record the rack units occupied by the Device. Overlaps are prevented by an exclusion constraint.
+        self.occupied_units, self.occupied_faces = self.get_rack_span()
+
         super(Device, self).save(*args, **kwargs)
 
         # If this is a new Device, instantiate all of the related components per the DeviceType definition
         if is_new:
-            ConsolePort.objects.bulk_create(
+            log_create(ConsolePort.objects.bulk_create(
                 [ConsolePort(device=self, name=template.name) for template in
                  self.device_type.console_port_templates.all()]
-            )
-            ConsoleServerPort.objects.bulk_create(
+            ))
+            log_create(ConsoleServerPort.objects.bulk_create(
                 [ConsoleServerPort(device=self, name=template.name) for template in
                  self.device_type.cs_port_templates.all()]
-            )
-            PowerPort.objects.bulk_create(
+            ))
+            log_create(PowerPort.objects.bulk_create(
                 [PowerPort(device=self, name=template.name) for template in
                  self.device_type.power_port_templates.all()]
-            )
-            PowerOutlet.objects.bulk_create(
+            ))
+            log_create(PowerOutlet.objects.bulk_create(
                 [PowerOutlet(device=self, name=template.name) for template in
                  self.device_type.power_outlet_templates.all()]
-            )
-            Interface.objects.bulk_create(
+            ))
+            log_create(Interface.objects.bulk_create(
                 [Interface(device=self, name=template.name, form_factor=template.form_factor,
                            mgmt_only=template.mgmt_only) for template in self.device_type.interface_templates.all()]
-            )
-            DeviceBay.objects.bulk_create(
+            ))
+            log_create(DeviceBay.objects.bulk_create(
                 [DeviceBay(device=self, name=template.name) for template in
                  self.device_type.device_bay_templates.all()]
-            )
+            ))
 
         # Update Rack assignment for any child Devices
-        Device.objects.filter(parent_bay__device=self).update(rack=self.rack)
+        child_pks = list(
+            Device.objects.filter(parent_bay__device=self).exclude(rack=self.rack).values_list('pk', flat=True)
+        )
+        if child_pks:
+            Device.objects.filter(pk__in=child_pks).update(rack=self.rack)
+            log_queryset_update(Device.objects.filter(pk__in=child_pks), ['rack'])
 
     def to_csv(self):
         return ','.join([
@@ -936,6 +974,21 @@ class Device(CreatedUpdatedModel, CustomFieldModel):
             return self.name
         return '{{{}}}'.format(self.pk)
 
+    def get_rack_span(self):
+        """
+        Return the range of rack units and the range of rack faces (0 for front, 1 for rear, or both for a full-depth
+        device) occupied by the Device, or (None, None) if it does not occupy rack units.
+        """
+        if not self.position or not self.device_type.u_height:
+            return None, None
+        if self.device_type.is_full_depth:
+            faces = NumericRange(RACK_FACE_FRONT, RACK_FACE_REAR + 1)
+        elif self.face is not None:
+            faces = NumericRange(self.face, self.face + 1)
+        else:
+            return None, None
+        return NumericRange(self.position, self.position + self.device_type.u_height), faces
+
     @property
     def primary_ip(self):
         if settings.PREFER_IPV4 and self.primary_ip4:
@@ -962,6 +1015,104 @@ class Device(CreatedUpdatedModel, CustomFieldModel):
         return RPC_CLIENTS.get(self.platform.rpc_client)
 
 
+def update_rack_spans(devices):
+    """
+    Recompute the rack units and faces occupied by the given Devices with a single query. This is needed whenever the
+    position, face, or DeviceType of Devices is changed without calling save() (e.g. by QuerySet.update()), or when the
+    height or depth of a DeviceType is changed. Raises IntegrityError if any Devices would then overlap or extend beyond
+    the top of their Racks.
+
+    :param devices: A QuerySet of Devices
+    """
+    subquery, params = devices.values('pk').query.sql_with_params()
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "UPDATE {device} AS d SET "
+            "occupied_units = CASE WHEN d.position IS NULL OR t.u_height = 0 THEN NULL "
+            "ELSE int4range(d.position, d.position + t.u_height) END, "
+            "occupied_faces = CASE WHEN d.position IS NULL OR t.u_height = 0 THEN NULL "
+            "WHEN t.is_full_depth THEN int4range({front}, {rear} + 1) "
+            "WHEN d.face IS NULL THEN NULL "
+            "ELSE int4range(d.face, d.face + 1) END "
+            "FROM {devicetype} AS t WHERE t.id = d.device_type_id AND d.id IN ({subquery})".format(
+                device=Device._meta.db_table, devicetype=DeviceType._meta.db_table, front=RACK_FACE_FRONT,
+                rear=RACK_FACE_REAR, subquery=subquery
+            ), params
+        )
+        cursor.execute(
+            "SELECT 1 FROM {device} AS d JOIN {rack} AS r ON r.id = d.rack_id "
+            "WHERE upper(d.occupied_units) - 1 > r.u_height AND d.id IN ({subquery}) LIMIT 1".format(
+                device=Device._meta.db_table, rack=Rack._meta.db_table, subquery=subquery
+            ), params
+        )
+        if cursor.fetchone():
+            raise IntegrityError("Devices cannot extend beyond the top of their racks.")
+
+
+class RackOccupancy(object):
+    """
+    An in-memory map of the units occupied within a set of Racks, used to validate the placement of many Devices
+    without recomputing each Rack's available units for every Device. The Devices already installed in the Racks are
+    loaded with a single query. Devices are then placed one at a time, so that conflicts among the new Devices are
+    detected as well as conflicts with existing ones.
+
+    :param racks: An iterable of Racks
+    :param exclude: PKs of Devices to ignore (e.g. Devices which are being moved)
+    """
+
+    def __init__(self, racks, exclude=None):
+        self.racks = {rack.pk: rack for rack in racks}
+        self.occupied = {}  # (rack PK, face, unit) -> Device
+
+        devices = Device.objects.filter(rack__in=self.racks.keys(), position__gte=1)\
+            .select_related('device_type__manufacturer', 'rack')
+        if exclude:
+            devices = devices.exclude(pk__in=exclude)
+        for device in devices:
+            for key in self._get_units(device):
+                self.occupied[key] = device
+
+    def _get_units(self, device):
+        faces = [RACK_FACE_FRONT, RACK_FACE_REAR] if device.device_type.is_full_depth else [device.face]
+        return [
+            (device.rack_id, face, u) for face in faces
+            for u in range(device.position, device.position + device.device_type.u_height)
+        ]
+
+    def place(self, device):
+        """
+        Mark the units required by a Device as occupied. Raises a ValidationError (and occupies nothing) if the Device
+        extends beyond the top of its Rack or overlaps a Device already placed. Devices without a position (or without
+        a face, which Device.clean() reports separately) occupy no units.
+        """
+        if not device.position or (device.face is None and not device.device_type.is_full_depth):
+            return
+
+        rack = self.racks[device.rack_id]
+        top = device.position + device.device_type.u_height - 1
+        if top > rack.u_height:
+            raise ValidationError({
+                'position': "U{} does not have sufficient space to accommodate a(n) {} ({}U).".format(
+                    device.position, device.device_type, device.device_type.u_height
+                )
+            })
+
+        units = self._get_units(device)
+        conflicts = []
+        for key in units:
+            if key in self.occupied and self.occupied[key] not in conflicts:
+                conflicts.append(self.occupied[key])
+        if conflicts:
+            raise ValidationError({
+                'position': u"U{} is already occupied by {}.".format(
+                    device.position, ', '.join(unicode(d) for d in conflicts)
+                )
+            })
+
+        for key in units:
+            self.occupied[key] = device
+
+
 class ConsolePort(models.Model):
     """
     A physical console port within a Device. ConsolePorts connect to ConsoleServerPorts.
@@ -1107,7 +1258,7 @@ class Interface(models.Model):
     device = models.ForeignKey('Device', related_name='interfaces', on_delete=models.CASCADE)
     name = models.CharField(max_length=30)
     form_factor = models.PositiveSmallIntegerField(choices=IFACE_FF_CHOICES, default=IFACE_FF_10GE_SFP_PLUS)
-    mac_address = MACAddressField(null=True, blank=True, verbose_name='MAC Address')
+    mac_address = MACAddressField(null=True, blank=True, db_index=True, verbose_name='MAC Address')
     mgmt_only = models.BooleanField(default=False, verbose_name='OOB Management',
                                     help_text="This interface is used only for out-of-band management")
     description = models.CharField(max_length=100, blank=True)
@@ -1138,11 +1289,12 @@ class Interface(models.Model):
 
     @property
     def is_connected(self):
+        if self.connection:
+            return True
         try:
             return bool(self.circuit_termination)
         except ObjectDoesNotExist:
-            pass
-        return bool(self.connection)
+            return False
 
     @property
     def connection(self):
@@ -1157,9 +1309,8 @@ class Interface(models.Model):
         return None
 
     def get_connected_interface(self):
-        connection = InterfaceConnection.objects.select_related().filter(Q(interface_a=self) | Q(interface_b=self))\
-            .first()
-        if connection and connection.interface_a == self:
+        connection = self.connection
+        if connection and connection.interface_a_id == self.pk:
             return connection.interface_b
         elif connection:
             return connection.interface_a
@@ -1193,6 +1344,50 @@ class InterfaceConnection(models.Model):
         ])
 
 
+def prefetch_interface_connections(interfaces):
+    """
+    Resolve the InterfaceConnection (along with the peer Interface and its Device) and the CircuitTermination for each
+    of the given Interfaces using two queries. The results are stored in each Interface's related object cache, so that
+    is_connected, connection, circuit_termination, and get_connected_interface() can be evaluated without hitting the
+    database. Returns the Interfaces as a list.
+
+    :param interfaces: An iterable of Interfaces (e.g. a QuerySet)
+    """
+    interfaces = list(interfaces)
+    if not interfaces:
+        return interfaces
+    interface_map = {iface.pk: iface for iface in interfaces}
+
+    # Initialize the cache for each related object. A cached value of None indicates that no related object exists.
+    cache_names = [
+        Interface.connected_as_a.cache_name,
+        Interface.connected_as_b.cache_name,
+        Interface.circuit_termination.cache_name,
+    ]
+    for iface in interfaces:
+        for cache_name in cache_names:
+            setattr(iface, cache_name, None)
+
+    connections = InterfaceConnection.objects.filter(
+        Q(interface_a__in=interface_map.keys()) | Q(interface_b__in=interface_map.keys())
+    ).select_related('interface_a__device', 'interface_b__device')
+    for connection in connections:
+        # Populate the caches on both ends so that the peer Interface knows its own connection as well
+        setattr(connection.interface_a, Interface.connected_as_a.cache_name, connection)
+        setattr(connection.interface_b, Interface.connected_as_b.cache_name, connection)
+        if connection.interface_a_id in interface_map:
+            setattr(interface_map[connection.interface_a_id], Interface.connected_as_a.cache_name, connection)
+        if connection.interface_b_id in interface_map:
+            setattr(interface_map[connection.interface_b_id], Interface.connected_as_b.cache_name, connection)
+
+    terminations = CircuitTermination.objects.filter(interface__in=interface_map.keys())\
+        .select_related('circuit__provider')
+    for termination in terminations:
+        setattr(interface_map[termination.interface_id], Interface.circuit_termination.cache_name, termination)
+
+    return interfaces
+
+
 class DeviceBay(models.Model):
     """
     An empty space within a Device which can house a child device
@@ -1248,3 +1443,35 @@ class Module(models.Model):
 
     def get_parent_url(self):
         return reverse('dcim:device_inventory', args=[self.device.pk])
+
+
+def get_module_tree(device):
+    """
+    Retrieve all Modules within a Device using a single query and assemble them into a tree. Returns the list of
+    top-level Modules; each Module has its submodules attached as a `children` list and its nesting level as `depth`.
+    """
+    modules = list(Module.objects.filter(device=device).select_related('manufacturer'))
+    children = {}
+    for module in modules:
+        module.children = []
+        children.setdefault(module.parent_id, []).append(module)
+
+    def attach(parent, depth):
+        for module in children.get(parent.pk if parent else None, []):
+            module.depth = depth
+            if parent is not None:
+                parent.children.append(module)
+            attach(module, depth + 1)
+
+    attach(None, 0)
+    return children.get(None, [])
+
+
+def walk_module_tree(modules):
+    """
+    Yield each Module in a tree returned by get_module_tree() in depth-first order, for rendering as a flat table.
+    """
+    for module in modules:
+        yield module
+        for submodule in walk_module_tree(module.children):
+            yield submodule
@@ -1,8 +1,19 @@
+import csv
 import json
 from rest_framework import status
 from rest_framework.test import APITestCase
 
 from django.conf import settings
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from dcim.api.serializers import DeviceNestedSerializer, DeviceSerializer
+from dcim.api.views import DeviceListView
+from dcim.models import Device, DeviceRole, Interface, Rack
+from ipam.models import IPAddress
+from tenancy.models import Tenant
+from utilities.api import prune_queryset
 
 
 class SiteTest(APITestCase):
@@ -661,3 +672,378 @@ class RelatedConnectionsTest(APITestCase):
             sorted(content.keys()),
             sorted(self.standard_fields),
         )
+
+
+class MACAddressResolveTest(APITestCase):
+
+    fixtures = ['dcim', 'ipam']
+
+    def test_resolve(self, endpoint='/{}api/dcim/mac-addresses/resolve/'.format(settings.BASE_PATH)):
+        response = self.client.post(endpoint, {
+            'mac_addresses': [
+                '00:00:00:aa:bb:cc', '44-55-66-77-88-99', '00:00:00:00:00:01', 'bogus', '00:00:00:aa:bb:zz', 5, None,
+            ],
+        }, format='json')
+        content = json.loads(response.content)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [(r['mac_address'], r['interfaces'][0]['device']['name']) for r in content['results']],
+            [('00:00:00:AA:BB:CC', 'test1-spine1'), ('44:55:66:77:88:99', 'test1-oob1')]
+        )
+        self.assertEqual(content['results'][0]['interfaces'][0]['interface']['name'], 'em0')
+        self.assertEqual(content['results'][0]['interfaces'][0]['site']['slug'], 'test1')
+        self.assertEqual(content['unresolved'], ['00:00:00:00:00:01'])
+        self.assertEqual(content['invalid'], ['bogus', '00:00:00:aa:bb:zz', 5, None])
+
+    def test_resolve_invalid(self, endpoint='/{}api/dcim/mac-addresses/resolve/'.format(settings.BASE_PATH)):
+        response = self.client.post(endpoint, {'mac_addresses': '00:00:00:aa:bb:cc'}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_filter_invalid(self, endpoint='/{}api/dcim/interfaces/?mac_address=bogus'.format(settings.BASE_PATH)):
+        response = self.client.get(endpoint)
+        content = json.loads(response.content)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(content['results'], [])
+
+
+class PaginationTest(APITestCase):
+
+    fixtures = ['dcim', 'ipam']
+
+    def test_unpaginated(self, endpoint='/{}api/dcim/devices/'.format(settings.BASE_PATH)):
+        response = self.client.get(endpoint)
+        content = json.loads(response.content)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIsInstance(content, list)
+
+    def test_cursor(self, endpoint='/{}api/dcim/devices/?limit=3'.format(settings.BASE_PATH)):
+        pks = []
+        while endpoint:
+            response = self.client.get(endpoint)
+            content = json.loads(response.content)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertLessEqual(len(content['results']), 3)
+            pks += [d['id'] for d in content['results']]
+            endpoint = content['next']
+        self.assertEqual(pks, sorted(Device.objects.values_list('pk', flat=True)))
+
+
+class StreamingTest(APITestCase):
+
+    fixtures = ['dcim', 'ipam']
+
+    def test_ndjson(self, endpoint='/{}api/dcim/devices/?format=ndjson'.format(settings.BASE_PATH)):
+        response = self.client.get(endpoint)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response.streaming)
+        records = [json.loads(line) for line in ''.join(response.streaming_content).splitlines()]
+        self.assertEqual([r['id'] for r in records], sorted(Device.objects.values_list('pk', flat=True)))
+
+    def test_csv(self, endpoint='/{}api/dcim/devices/?format=csv'.format(settings.BASE_PATH)):
+        response = self.client.get(endpoint)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        lines = ''.join(response.streaming_content).splitlines()
+        self.assertTrue(lines[0].startswith('id,name,display_name,device_type_id,'))
+        self.assertEqual(len(lines), Device.objects.count() + 1)
+
+    def test_csv_null_relation(self, endpoint='/{}api/dcim/devices/?format=csv'.format(settings.BASE_PATH)):
+        # The first device has no tenant, but its columns are present for the devices which do
+        Device.objects.filter(pk=2).update(tenant=Tenant.objects.create(name='Tenant 1', slug='tenant-1'))
+        response = self.client.get(endpoint)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        rows = list(csv.DictReader(''.join(response.streaming_content).splitlines()))
+        self.assertEqual(rows[0]['id'], '1')
+        self.assertEqual(rows[0]['tenant_name'], '')
+        self.assertEqual(rows[1]['tenant_name'], 'Tenant 1')
+
+    def test_json_stream(self, endpoint='/{}api/dcim/devices/?format=json-stream'.format(settings.BASE_PATH)):
+        response = self.client.get(endpoint)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(json.loads(''.join(response.streaming_content))), Device.objects.count())
+
+
+class SparseFieldsTest(APITestCase):
+
+    fixtures = ['dcim', 'ipam']
+
+    def test_fields(self, endpoint='/{}api/dcim/devices/?fields=id,name'.format(settings.BASE_PATH)):
+        response = self.client.get(endpoint)
+        content = json.loads(response.content)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(content), Device.objects.count())
+        for device in content:
+            self.assertEqual(sorted(device.keys()), ['id', 'name'])
+
+    def test_brief(self, endpoint='/{}api/dcim/devices/?brief=1'.format(settings.BASE_PATH)):
+        response = self.client.get(endpoint)
+        content = json.loads(response.content)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        for device in content:
+            self.assertEqual(sorted(device.keys()), ['display_name', 'id', 'name'])
+
+    def test_fields_get_queryset(self):
+        # Views which define get_queryset() rather than a queryset
+        for endpoint in ('devices/9/console-server-ports/', 'devices/1/device-bays/', 'devices/1/modules/'):
+            response = self.client.get('/{}api/dcim/{}?fields=id,name'.format(settings.BASE_PATH, endpoint))
+            content = json.loads(response.content)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            for obj in content:
+                self.assertEqual(sorted(obj.keys()), ['id', 'name'])
+
+    def test_unknown_field(self, endpoint='/{}api/dcim/devices/?fields=id,foo'.format(settings.BASE_PATH)):
+        response = self.client.get(endpoint)
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_prune_queryset(self):
+        queryset = prune_queryset(DeviceListView.queryset, {'name', 'rack'})
+        self.assertEqual(queryset.query.select_related, {'rack': {'site': {}}})
+        self.assertEqual(list(queryset._prefetch_related_lookups), [])
+        self.assertEqual(queryset.query.deferred_loading, ({'id', 'name', 'rack'}, False))
+
+        # Following the reverse one-to-one parent_bay relation requires all fields to be loaded
+        queryset = prune_queryset(DeviceListView.queryset, {'name', 'parent_bay'})
+        self.assertEqual(queryset.query.select_related, {'parent_bay': {}})
+        self.assertEqual(queryset.query.deferred_loading, (set(), True))
+
+
+class ConditionalGetTest(APITestCase):
+
+    fixtures = ['dcim', 'ipam']
+
+    def test_list(self, endpoint='/{}api/dcim/devices/'.format(settings.BASE_PATH)):
+        response = self.client.get(endpoint)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        etag = response['ETag']
+        self.assertIn('Last-Modified', response)
+
+        response = self.client.get(endpoint, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(response['ETag'], etag)
+
+        # Changes to objects which are only nested within the response (and have no timestamps) are detected
+        DeviceRole.objects.filter(pk=Device.objects.get(pk=3).device_role_id).update(name='Renamed')
+        response = self.client.get(endpoint, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_paginated(self, endpoint='/{}api/dcim/devices/?limit=3'.format(settings.BASE_PATH)):
+        response = self.client.get(endpoint)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotIn('ETag', response)
+
+    def test_related_rows(self, endpoint='/{}api/dcim/devices/?rack_id=1'.format(settings.BASE_PATH)):
+        etag = self.client.get(endpoint)['ETag']
+
+        # Only the related objects of the devices listed are taken into account
+        Rack.objects.filter(pk=2).update(name='Renamed')
+        response = self.client.get(endpoint, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+        Rack.objects.filter(pk=1).update(name='Renamed')
+        response = self.client.get(endpoint, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_includes(self, endpoint='/{}api/dcim/devices/?rack_id=1&include=ip_addresses'.format(settings.BASE_PATH)):
+        etag = self.client.get(endpoint)['ETag']
+
+        # Only the included objects of the devices listed are taken into account
+        IPAddress.objects.filter(pk=3).update(description='Other device')
+        response = self.client.get(endpoint, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+        IPAddress.objects.filter(pk=1).update(description='Listed device')
+        response = self.client.get(endpoint, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_if_modified_since(self, endpoint='/{}api/dcim/devices/'.format(settings.BASE_PATH)):
+        last_modified = self.client.get(endpoint)['Last-Modified']
+
+        # Deletions do not change Last-Modified, so If-Modified-Since is not honored
+        Device.objects.filter(pk=12).delete()
+        response = self.client.get(endpoint, HTTP_IF_MODIFIED_SINCE=last_modified)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data), Device.objects.count())
+
+    def test_detail(self, endpoint='/{}api/dcim/devices/3/'.format(settings.BASE_PATH)):
+        etag = self.client.get(endpoint)['ETag']
+        self.assertNotEqual(self.client.get('/{}api/dcim/devices/4/'.format(settings.BASE_PATH))['ETag'], etag)
+
+        Device.objects.filter(pk=3).update(serial='ABC123')
+        response = self.client.get(endpoint, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['serial'], 'ABC123')
+
+
+class InterfaceBulkTest(APITestCase):
+
+    fixtures = ['dcim', 'ipam']
+
+    def setUp(self):
+        self.client.force_authenticate(User.objects.create_superuser('admin', 'admin@example.com', 'admin'))
+
+    def test_create_update_delete(self, endpoint='/{}api/dcim/interfaces/bulk/'.format(settings.BASE_PATH)):
+        data = [{'device': 3, 'name': 'bulk{}'.format(i), 'form_factor': 1000} for i in range(50)]
+        response = self.client.post(endpoint, data, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        pks = [i['id'] for i in response.data]
+        self.assertEqual(Interface.objects.filter(pk__in=pks, device=3).count(), 50)
+
+        response = self.client.patch(endpoint, [{'id': pk, 'description': 'Bulk'} for pk in pks], format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(Interface.objects.filter(pk__in=pks, description='Bulk').count(), 50)
+
+        response = self.client.delete(endpoint, pks, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertFalse(Interface.objects.filter(pk__in=pks).exists())
+
+    def test_update_no_fields(self, endpoint='/{}api/dcim/interfaces/bulk/'.format(settings.BASE_PATH)):
+        name = Interface.objects.get(pk=1).name
+        response = self.client.patch(endpoint, [{'id': 1}, {'id': 2, 'bogus': 'x'}], format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([i['id'] for i in response.data], [1, 2])
+        self.assertEqual(Interface.objects.get(pk=1).name, name)
+
+    def test_invalid(self, endpoint='/{}api/dcim/interfaces/bulk/'.format(settings.BASE_PATH)):
+        count = Interface.objects.count()
+        data = [
+            {'device': 3, 'name': 'bulk1', 'form_factor': 1000},
+            {'device': 3, 'name': 'bulk1', 'form_factor': 1000},
+            {'device': 99999, 'name': 'bulk2', 'form_factor': 1000},
+            {'device': 3, 'name': 'em0', 'form_factor': 1000},
+        ]
+        response = self.client.post(endpoint, data, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.data[0], {})
+        self.assertIn('non_field_errors', response.data[1])
+        self.assertIn('device', response.data[2])
+        self.assertIn('non_field_errors', response.data[3])
+        self.assertEqual(Interface.objects.count(), count)
+
+
+class DeviceIncludeTest(APITestCase):
+
+    fixtures = ['dcim', 'ipam']
+
+    def test_list(self, endpoint='/{}api/dcim/devices/?include=interfaces,console_ports,power_ports,modules,'
+                                 'ip_addresses'.format(settings.BASE_PATH)):
+        response = self.client.get(endpoint)
+        content = json.loads(response.content)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        for device in content:
+            for name in ('interfaces', 'console_ports', 'power_ports', 'modules', 'ip_addresses'):
+                self.assertIn(name, device)
+        devices = {device['id']: device for device in content}
+        self.assertEqual(
+            [iface['name'] for iface in devices[3]['interfaces']],
+            list(Interface.objects.filter(device=3).values_list('name', flat=True))
+        )
+
+    def test_query_count(self, endpoint='/{}api/dcim/devices/'.format(settings.BASE_PATH)):
+        self.client.get(endpoint)
+        with CaptureQueriesContext(connection) as without_includes:
+            self.client.get(endpoint)
+        with CaptureQueriesContext(connection) as with_includes:
+            self.client.get(endpoint, {'include': 'console_ports,power_ports,modules,ip_addresses'})
+
+        # Each set of components is retrieved with one query for all devices, rather than one per device
+        self.assertEqual(len(with_includes), len(without_includes) + 4)
+
+    def test_detail(self, endpoint='/{}api/dcim/devices/3/?include=interfaces'.format(settings.BASE_PATH)):
+        response = self.client.get(endpoint)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data['interfaces']), Interface.objects.filter(device=3).count())
+
+    def test_unknown_include(self, endpoint='/{}api/dcim/devices/?include=foo'.format(settings.BASE_PATH)):
+        response = self.client.get(endpoint)
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class ComponentListTest(APITestCase):
+
+    fixtures = ['dcim', 'ipam']
+
+    def get_all(self, endpoint, **params):
+        results = []
+        response = self.client.get(endpoint, dict(params, limit=50))
+        while True:
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            results += response.data['results']
+            if not response.data['next']:
+                return results
+            response = self.client.get(response.data['next'])
+
+    def test_interfaces(self, endpoint='/{}api/dcim/interfaces/'.format(settings.BASE_PATH)):
+
+        # Lists of all components are always paginated
+        response = self.client.get(endpoint)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIn('results', response.data)
+
+        interfaces = self.get_all(endpoint)
+        self.assertEqual([i['id'] for i in interfaces], sorted(Interface.objects.values_list('pk', flat=True)))
+
+        interfaces = self.get_all(endpoint, mac_address='00:00:00:aa:bb:cc')
+        self.assertEqual([(i['device']['name'], i['name']) for i in interfaces], [('test1-spine1', 'em0')])
+
+        interfaces = self.get_all(endpoint, role='spine-switch', is_connected='true')
+        self.assertTrue(interfaces)
+        self.assertTrue(all(i['is_connected'] and i['device']['name'] in ('test1-spine1', 'test1-spine2')
+                            for i in interfaces))
+
+        interfaces = self.get_all(endpoint, rack_id=1, form_factor=[800, 1000])
+        self.assertEqual(
+            len(interfaces),
+            Interface.objects.filter(device__rack=1, form_factor__in=[800, 1000]).count()
+        )
+
+    def test_interface_query_count(self, endpoint='/{}api/dcim/interfaces/'.format(settings.BASE_PATH)):
+        self.client.get(endpoint, {'limit': 10})
+        with CaptureQueriesContext(connection) as ten:
+            self.client.get(endpoint, {'limit': 10})
+        with CaptureQueriesContext(connection) as hundred:
+            self.client.get(endpoint, {'limit': 100})
+
+        # Devices and connections are retrieved in bulk, so the number of queries does not depend on the page size
+        self.assertEqual(len(ten), len(hundred))
+
+    def test_console_ports(self, endpoint='/{}api/dcim/console-ports/'.format(settings.BASE_PATH)):
+        console_ports = self.get_all(endpoint, site='test1', is_connected='true')
+        self.assertEqual([cp['id'] for cp in console_ports], [1, 2, 3, 4, 5, 6])
+        self.assertEqual(console_ports[0]['cs_port']['device']['name'], 'test1-oob1')
+
+    def test_power_ports(self, endpoint='/{}api/dcim/power-ports/'.format(settings.BASE_PATH)):
+        power_ports = self.get_all(endpoint, is_connected='false')
+        self.assertTrue(all(pp['power_outlet'] is None for pp in power_ports))
+
+    def test_power_outlets(self, endpoint='/{}api/dcim/power-outlets/'.format(settings.BASE_PATH)):
+        power_outlets = self.get_all(endpoint, role='pdu', is_connected='true')
+        self.assertTrue(power_outlets)
+        self.assertTrue(all(po['connected_port'] is not None for po in power_outlets))
+
+    def test_device_unpaginated(self, endpoint='/{}api/dcim/devices/1/interfaces/'.format(settings.BASE_PATH)):
+        response = self.client.get(endpoint)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIsInstance(response.data, list)
+
+
+class MemoizedNestedSerializerTest(APITestCase):
+
+    fixtures = ['dcim', 'ipam']
+
+    def test_nested(self):
+        devices = Device.objects.filter(rack=1).select_related('rack', 'device_role').order_by('pk')
+        data = DeviceSerializer(devices, many=True, context={}).data
+
+        # Each rack and role is serialized once, and its representation reused for every device which references it
+        self.assertGreater(len(data), 1)
+        self.assertTrue(all(d['rack'] is data[0]['rack'] for d in data))
+        self.assertEqual(data[0]['rack']['name'], 'A1R1')
+        self.assertEqual(
+            [d['device_role']['slug'] for d in data],
+            [device.device_role.slug for device in devices]
+        )
+
+    def test_not_nested(self):
+        context = {}
+        DeviceNestedSerializer(Device.objects.all(), many=True, context=context).data
+        self.assertNotIn('nested_representations', context)
@@ -77,3 +77,24 @@ class DeviceTestCase(TestCase):
         })
         self.assertTrue(test.is_valid())
         self.assertTrue(test.save())
+
+
+class DeviceImportTestCase(TestCase):
+
+    fixtures = ['dcim', 'ipam']
+
+    def test_rack_space(self):
+
+        csv_data = '\n'.join([
+            'test1,Leaf Switch,,Juniper,QFX5100-48S,,,,TEST1,A1R2,35,front',
+            'test2,Leaf Switch,,Juniper,QFX5100-48S,,,,TEST1,A1R2,34,front',  # Occupied by test1-leaf2
+            'test3,Leaf Switch,,Juniper,QFX5100-48S,,,,TEST1,A1R2,35,rear',  # Occupied by test1 (full depth)
+            'test4,Leaf Switch,,Juniper,QFX5100-48S,,,,TEST1,A1R2,36,front',
+        ])
+        form = DeviceImportForm(data={'csv': csv_data})
+
+        self.assertFalse(form.is_valid())
+        self.assertEqual(len(form.errors['csv']), 2)
+        self.assertIn('Record 2 (position)', form.errors['csv'][0])
+        self.assertIn('test1-leaf2', form.errors['csv'][0])
+        self.assertIn('Record 3 (position)', form.errors['csv'][1])
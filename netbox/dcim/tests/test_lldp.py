@@ -0,0 +1,154 @@
+import time
+
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from django.conf import settings
+from django.contrib.auth.models import Permission, User
+from django.core.cache import cache
+from django.test import TestCase
+
+from dcim.lldp import (
+    compare_lldp_neighbors, get_cache_key, get_pending_key, LLDP_MATCH, LLDP_MISMATCH, LLDP_MISSING,
+    LLDP_UNDOCUMENTED, LLDP_UNKNOWN, LLDPCollector,
+)
+from dcim.models import (
+    Device, DeviceRole, DeviceType, Interface, InterfaceConnection, Manufacturer, Rack, Site,
+)
+
+
+class LLDPReportTestCase(TestCase):
+
+    def setUp(self):
+
+        site = Site.objects.create(name='Test Site 1', slug='test-site-1')
+        rack = Rack.objects.create(name='Test Rack 1', site=site)
+        manufacturer = Manufacturer.objects.create(name='Test Manufacturer 1', slug='test-manufacturer-1')
+        device_type = DeviceType.objects.create(manufacturer=manufacturer, model='Test Device Type 1',
+                                                slug='test-device-type-1')
+        device_role = DeviceRole.objects.create(name='Test Device Role 1', slug='test-device-role-1', color='ff0000')
+
+        self.devices = []
+        for name in ('switch1', 'switch2', 'switch3'):
+            device = Device.objects.create(device_type=device_type, device_role=device_role, name=name, rack=rack)
+            for i in range(1, 5):
+                Interface.objects.create(device=device, name='ge-0/0/{}'.format(i))
+            self.devices.append(device)
+
+        def iface(device, name):
+            return Interface.objects.get(device__name=device, name=name)
+
+        InterfaceConnection.objects.create(interface_a=iface('switch1', 'ge-0/0/1'),
+                                           interface_b=iface('switch2', 'ge-0/0/1'))
+        InterfaceConnection.objects.create(interface_a=iface('switch1', 'ge-0/0/2'),
+                                           interface_b=iface('switch2', 'ge-0/0/2'))
+        InterfaceConnection.objects.create(interface_a=iface('switch1', 'ge-0/0/3'),
+                                           interface_b=iface('switch3', 'ge-0/0/1'))
+
+        # No data is cached for switch3
+        cache.clear()
+        cache.set(get_cache_key(self.devices[0].pk), {
+            'neighbors': [
+                {'local-interface': 'ge-0/0/1', 'name': 'switch2', 'remote-interface': 'ge-0/0/1'},
+                {'local-interface': 'ge-0/0/2', 'name': 'switch2', 'remote-interface': 'ge-0/0/3'},
+                {'local-interface': 'ge-0/0/4', 'name': 'router1', 'remote-interface': 'xe-0/0/0'},
+            ],
+            'error': None,
+            'collected': time.time(),
+        })
+        cache.set(get_cache_key(self.devices[1].pk), {
+            'neighbors': [
+                {'local-interface': 'ge-0/0/1', 'name': 'switch1', 'remote-interface': 'ge-0/0/1'},
+            ],
+            'error': None,
+            'collected': time.time(),
+        })
+
+    def test_compare_lldp_neighbors(self):
+
+        report = {
+            (row['interface'].device.name, row['interface'].name): row['status']
+            for row in compare_lldp_neighbors(self.devices)
+        }
+
+        self.assertEqual(report, {
+            ('switch1', 'ge-0/0/1'): LLDP_MATCH,
+            ('switch1', 'ge-0/0/2'): LLDP_MISMATCH,
+            ('switch1', 'ge-0/0/3'): LLDP_MISSING,
+            ('switch1', 'ge-0/0/4'): LLDP_UNDOCUMENTED,
+            ('switch2', 'ge-0/0/1'): LLDP_MATCH,
+            ('switch2', 'ge-0/0/2'): LLDP_MISSING,
+            ('switch3', 'ge-0/0/1'): LLDP_UNKNOWN,
+        })
+
+
+class UnreachableDevice(object):
+
+    def __init__(self, pk):
+        self.pk = pk
+
+    def get_rpc_client(self):
+        raise Exception("Connection refused")
+
+
+class LLDPCollectorTestCase(TestCase):
+
+    def setUp(self):
+
+        cache.clear()
+        self.collector = LLDPCollector(workers=2)
+
+    def wait(self, device_pk):
+        deadline = time.time() + 5
+        while self.collector.is_pending(device_pk) and time.time() < deadline:
+            time.sleep(0.01)
+
+    def test_error(self):
+
+        self.assertEqual(self.collector.refresh([UnreachableDevice(1)]), 1)
+        self.wait(1)
+
+        self.assertFalse(self.collector.is_pending(1))
+        result = cache.get(get_cache_key(1))
+        self.assertIsNone(result['neighbors'])
+        self.assertEqual(result['error'], "Connection refused")
+
+    def test_coalesce(self):
+
+        # A device marked as pending (e.g. by another process) is not queued again
+        cache.set(get_pending_key(1), time.time())
+        self.assertEqual(self.collector.refresh([UnreachableDevice(1), UnreachableDevice(2)]), 1)
+        self.wait(2)
+
+        self.assertTrue(self.collector.is_pending(1))
+        self.assertIsNone(cache.get(get_cache_key(1)))
+        self.assertIsNotNone(cache.get(get_cache_key(2)))
+
+
+class LLDPPermissionTest(APITestCase):
+
+    def setUp(self):
+
+        self.site = Site.objects.create(name='Test Site 1', slug='test-site-1')
+        self.user = User.objects.create_user('user', 'user@example.com', 'user')
+
+    def test_refresh(self):
+
+        endpoint = '/{}api/dcim/sites/{}/lldp-neighbors/'.format(settings.BASE_PATH, self.site.pk)
+
+        response = self.client.get(endpoint)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        # Requesting a refresh requires authentication and permission to change devices
+        response = self.client.post(endpoint)
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+        self.client.force_authenticate(self.user)
+        response = self.client.post(endpoint)
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+        self.user.user_permissions.add(Permission.objects.get(codename='change_device'))
+        self.user = User.objects.get(pk=self.user.pk)
+        self.client.force_authenticate(self.user)
+        response = self.client.post(endpoint)
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
@@ -1,3 +1,7 @@
+from psycopg2.extras import NumericRange
+
+from django.core.exceptions import ValidationError
+from django.db import IntegrityError, transaction
 from django.test import TestCase
 from dcim.models import *
 
@@ -94,3 +98,72 @@ class RackTestCase(TestCase):
             face=None,
         )
         self.assertTrue(pdu)
+
+    def test_natural_ordering(self):
+
+        for name in ['TestSwitch10', 'TestSwitch2', '1TestSwitch', 'TestSwitch1']:
+            Device.objects.create(
+                name=name,
+                device_role=self.role.get('Switch'),
+                device_type=self.device_type.get('ff2048'),
+                rack=self.rack,
+            )
+        Device.objects.create(
+            device_role=self.role.get('Switch'),
+            device_type=self.device_type.get('ff2048'),
+            rack=self.rack,
+        )
+
+        self.assertEqual(
+            [d.name for d in Device.objects.all()],
+            ['1TestSwitch', 'TestSwitch1', 'TestSwitch2', 'TestSwitch10', None]
+        )
+
+    def test_module_tree(self):
+
+        device = Device.objects.create(
+            name='TestSwitch1',
+            device_role=self.role.get('Switch'),
+            device_type=self.device_type.get('ff2048'),
+            rack=self.rack,
+        )
+        fpc = Module.objects.create(device=device, name='FPC 0')
+        pic = Module.objects.create(device=device, parent=fpc, name='PIC 0')
+        Module.objects.create(device=device, parent=pic, name='Xcvr 0')
+        Module.objects.create(device=device, name='PEM 0')
+
+        with self.assertNumQueries(1):
+            modules = [(m.name, m.depth) for m in walk_module_tree(get_module_tree(device))]
+
+        self.assertEqual(modules, [('FPC 0', 0), ('PIC 0', 1), ('Xcvr 0', 2), ('PEM 0', 0)])
+
+    def test_rack_unit_overlap(self):
+
+        device1 = Device.objects.create(
+            name='TestSwitch1',
+            device_role=self.role.get('Switch'),
+            device_type=self.device_type.get('ff2048'),
+            rack=self.rack,
+            position=10,
+            face=RACK_FACE_REAR,
+        )
+        device2 = Device(
+            name='TestSwitch2',
+            device_role=self.role.get('Switch'),
+            device_type=self.device_type.get('ff2048'),
+            rack=self.rack,
+            position=10,
+            face=RACK_FACE_FRONT,
+        )
+
+        # A full-depth device occupies both faces
+        with self.assertRaises(ValidationError):
+            device2.clean()
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            device2.save()
+
+        # Increasing the height of a DeviceType updates the units occupied by its instances
+        device_type = self.device_type.get('ff2048')
+        device_type.u_height = 2
+        device_type.save()
+        self.assertEqual(Device.objects.get(pk=device1.pk).occupied_units, NumericRange(10, 12))
@@ -0,0 +1,75 @@
+import time
+
+from django.core.cache import cache
+from django.test import SimpleTestCase
+
+from dcim.tracing import ConnectionGraph, GRAPH_VERSION_CACHE_KEY, NODE_CIRCUITTERMINATION, NODE_INTERFACE
+
+
+class TestConnectionGraph(ConnectionGraph):
+
+    def rebuild_async(self):
+        self.rebuilding = True
+
+
+class ConnectionGraphTestCase(SimpleTestCase):
+
+    def setUp(self):
+
+        # Interface 1 <-> Interface 2 -- Circuit 1 (terminations 1 and 2) -- Interface 3 <-> Interface 4
+        cache.set(GRAPH_VERSION_CACHE_KEY, 5, None)
+        self.graph = TestConnectionGraph()
+        self.graph.built = time.time()
+        self.graph.version = 5
+        self.graph._add_edge(('interfaceconnection', 1), (NODE_INTERFACE, 1), (NODE_INTERFACE, 2))
+        self.graph._set_termination(1, 1, 'A', 2)
+        self.graph._set_termination(2, 1, 'Z', 3)
+        self.graph._add_edge(('interfaceconnection', 2), (NODE_INTERFACE, 3), (NODE_INTERFACE, 4))
+
+    def test_trace(self):
+
+        path = self.graph.trace((NODE_INTERFACE, 2))
+        if path[0] != (NODE_INTERFACE, 1):
+            path.reverse()
+
+        self.assertEqual(path, [
+            (NODE_INTERFACE, 1),
+            (NODE_INTERFACE, 2),
+            (NODE_CIRCUITTERMINATION, 1),
+            (NODE_CIRCUITTERMINATION, 2),
+            (NODE_INTERFACE, 3),
+            (NODE_INTERFACE, 4),
+        ])
+
+    def test_circuit_endpoints(self):
+
+        self.assertEqual(len(self.graph.circuit_endpoints(1)), 4)
+
+    def test_remove_termination(self):
+
+        self.graph._remove_termination(2)
+
+        self.assertEqual(len(self.graph.trace((NODE_INTERFACE, 1))), 3)
+        self.assertEqual(
+            set(self.graph.trace((NODE_INTERFACE, 4))),
+            {(NODE_INTERFACE, 3), (NODE_INTERFACE, 4)}
+        )
+
+    def test_unconnected(self):
+
+        self.assertEqual(self.graph.trace((NODE_INTERFACE, 5)), [(NODE_INTERFACE, 5)])
+
+    def test_version(self):
+
+        # A change applied by this process leaves its graph current
+        self.graph.increment_version()
+        self.assertEqual(self.graph.version, 6)
+        self.graph.ensure_built()
+        self.assertFalse(self.graph.rebuilding)
+
+        # A change made by another process causes the graph to be rebuilt, while the current graph remains in use
+        cache.incr(GRAPH_VERSION_CACHE_KEY)
+        self.graph.increment_version()
+        self.assertEqual(self.graph.version, 6)
+        self.assertEqual(len(self.graph.trace((NODE_INTERFACE, 1))), 6)
+        self.assertTrue(self.graph.rebuilding)
@@ -0,0 +1,173 @@
+from django.contrib.auth.models import User
+from django.contrib.messages import get_messages
+from django.core.urlresolvers import reverse
+from django.test import TestCase
+
+from dcim.models import (
+    ConsolePort, ConsoleServerPort, Device, DeviceBay, DeviceRole, DeviceType, IFACE_FF_1GE_FIXED, Interface,
+    InterfaceConnection, Manufacturer, PowerOutlet, PowerPort, Rack, RACK_FACE_FRONT, Site,
+)
+from dcim.views import DEVICE_COMPONENTS_PER_PAGE, DeviceBulkAddDeviceBayView, DeviceBulkAddInterfaceView
+
+
+class DeviceBulkAddComponentTestCase(TestCase):
+
+    def setUp(self):
+
+        site = Site.objects.create(name='Test Site 1', slug='test-site-1')
+        rack = Rack.objects.create(name='Test Rack 1', site=site)
+        manufacturer = Manufacturer.objects.create(name='Test Manufacturer 1', slug='test-manufacturer-1')
+        device_type = DeviceType.objects.create(manufacturer=manufacturer, model='Test Device Type 1',
+                                                slug='test-device-type-1')
+        device_role = DeviceRole.objects.create(name='Test Device Role 1', slug='test-device-role-1', color='ff0000')
+
+        for name in ('switch1', 'switch2', 'switch3'):
+            Device.objects.create(device_type=device_type, device_role=device_role, name=name, rack=rack)
+        Interface.objects.create(device=Device.objects.get(name='switch2'), name='ge-0/0/1')
+        self.devices = list(Device.objects.select_related('device_type').order_by('name'))
+
+    def test_build_components(self):
+
+        names = ['ge-0/0/{}'.format(i) for i in range(4)]
+        data = {'form_factor': IFACE_FF_1GE_FIXED, 'mgmt_only': False, 'description': 'Access port'}
+
+        with self.assertNumQueries(1):
+            components, errors = DeviceBulkAddInterfaceView().build_components(self.devices, names, data)
+
+        self.assertEqual(errors, [u'switch2: ge-0/0/1 already exists'])
+        self.assertEqual(
+            sorted((c.device.name, c.name) for c in components),
+            [(d, n) for d in ('switch1', 'switch3') for n in names]
+        )
+        self.assertTrue(all(c.description == 'Access port' for c in components))
+
+    def test_build_components_invalid(self):
+
+        # Names are validated once, not once per device
+        components, errors = DeviceBulkAddInterfaceView().build_components(
+            self.devices, ['x' * 31, 'ge-0/0/2', 'ge-0/0/2'], {}
+        )
+        self.assertEqual(components, [])
+        self.assertEqual(len(errors), 2)
+
+        # Device types which cannot have device bays are reported once per device
+        components, errors = DeviceBulkAddDeviceBayView().build_components(self.devices, ['Bay 1'], {})
+        self.assertEqual(components, [])
+        self.assertEqual(len(errors), 3)
+        self.assertFalse(DeviceBay.objects.exists())
+
+
+class DeviceComponentsTestCase(TestCase):
+
+    def setUp(self):
+
+        site = Site.objects.create(name='Test Site 1', slug='test-site-1')
+        rack = Rack.objects.create(name='Test Rack 1', site=site)
+        manufacturer = Manufacturer.objects.create(name='Test Manufacturer 1', slug='test-manufacturer-1')
+        device_type = DeviceType.objects.create(manufacturer=manufacturer, model='Test Device Type 1',
+                                                slug='test-device-type-1')
+        device_role = DeviceRole.objects.create(name='Test Device Role 1', slug='test-device-role-1', color='ff0000')
+        self.device = Device.objects.create(device_type=device_type, device_role=device_role, name='switch1',
+                                            rack=rack)
+        peer = Device.objects.create(device_type=device_type, device_role=device_role, name='switch2', rack=rack)
+
+        # More than a page of each component, half of them connected to the peer device
+        self.count = DEVICE_COMPONENTS_PER_PAGE + 50
+        names = ['port{}'.format(i) for i in range(self.count)]
+        Interface.objects.bulk_create([Interface(device=d, name=name) for d in (self.device, peer) for name in names])
+        ConsoleServerPort.objects.bulk_create([ConsoleServerPort(device=self.device, name=name) for name in names])
+        PowerOutlet.objects.bulk_create([PowerOutlet(device=self.device, name=name) for name in names])
+        interfaces = Interface.objects.filter(device=peer).in_bulk()
+        InterfaceConnection.objects.bulk_create([
+            InterfaceConnection(interface_a=iface, interface_b=interfaces[peer_pk])
+            for iface, peer_pk in zip(Interface.objects.filter(device=self.device)[::2], sorted(interfaces))
+        ])
+        ConsolePort.objects.bulk_create([
+            ConsolePort(device=peer, name=csp.name, cs_port=csp)
+            for csp in ConsoleServerPort.objects.filter(device=self.device)[::2]
+        ])
+        PowerPort.objects.bulk_create([
+            PowerPort(device=peer, name=po.name, power_outlet=po)
+            for po in PowerOutlet.objects.filter(device=self.device)[::2]
+        ])
+
+        # Log in as a superuser, so that every row is rendered with its checkbox and buttons
+        self.client.force_login(User.objects.create_superuser('admin', 'admin@example.com', 'admin'))
+
+    def get_pages(self, component, num_queries):
+
+        url = reverse('dcim:device_components', kwargs={'pk': self.device.pk, 'component': component})
+        rows = 0
+        for page in (1, 2):
+            # Two queries retrieve the session and user
+            with self.assertNumQueries(num_queries + 2):
+                response = self.client.get(url, {'page': page})
+            self.assertEqual(response.status_code, 200)
+            rows += response.content.count(b'name="pk"')
+        self.assertEqual(rows, self.count)
+        self.assertEqual(self.client.get(url, {'page': 3}).status_code, 404)
+
+        return response
+
+    def test_interfaces(self):
+
+        # Device, count, page, connections, circuit terminations, and graphs
+        response = self.get_pages('interfaces', 6)
+        self.assertContains(response, 'switch2')
+
+    def test_cs_ports(self):
+
+        # Device, names, and page
+        response = self.get_pages('cs-ports', 3)
+        self.assertContains(response, 'switch2')
+
+    def test_power_outlets(self):
+
+        # Device, names, and page
+        response = self.get_pages('power-outlets', 3)
+        self.assertContains(response, 'switch2')
+
+
+class DeviceTypeBulkEditTestCase(TestCase):
+
+    def setUp(self):
+
+        site = Site.objects.create(name='Test Site 1', slug='test-site-1')
+        rack = Rack.objects.create(name='Test Rack 1', site=site, u_height=42)
+        manufacturer = Manufacturer.objects.create(name='Test Manufacturer 1', slug='test-manufacturer-1')
+        self.device_types = [
+            DeviceType.objects.create(manufacturer=manufacturer, model='Test Device Type {}'.format(i),
+                                      slug='test-device-type-{}'.format(i))
+            for i in (1, 2)
+        ]
+        device_role = DeviceRole.objects.create(name='Test Device Role 1', slug='test-device-role-1', color='ff0000')
+        for name, device_type, position in (('switch1', 0, 10), ('switch2', 1, 11), ('switch3', 1, 42)):
+            Device.objects.create(device_type=self.device_types[device_type], device_role=device_role, name=name,
+                                  rack=rack, position=position, face=RACK_FACE_FRONT)
+
+        self.client.force_login(User.objects.create_superuser('admin', 'admin@example.com', 'admin'))
+
+    def bulk_edit(self, device_type, u_height):
+        return self.client.post(reverse('dcim:devicetype_bulk_edit'), {
+            'pk': [device_type.pk], '_apply': True, 'u_height': u_height,
+        })
+
+    def test_u_height(self):
+
+        # Growing into another device's units is rejected, and nothing is changed
+        response = self.bulk_edit(self.device_types[0], 2)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([m.level_tag for m in get_messages(response.wsgi_request)], ['error'])
+        self.assertEqual(DeviceType.objects.get(pk=self.device_types[0].pk).u_height, 1)
+        self.assertEqual(Device.objects.get(name='switch1').occupied_units.upper, 11)
+
+        # So is growing beyond the top of the rack
+        response = self.bulk_edit(self.device_types[1], 2)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(DeviceType.objects.get(pk=self.device_types[1].pk).u_height, 1)
+
+        # Otherwise, the units occupied by all devices of the type are updated
+        Device.objects.filter(name='switch2').delete()
+        response = self.bulk_edit(self.device_types[0], 3)
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(Device.objects.get(name='switch1').occupied_units.upper, 13)
@@ -0,0 +1,324 @@
+from collections import defaultdict
+from copy import copy
+import threading
+import time
+
+from django.core.cache import cache
+from django.db import connection, transaction
+
+from circuits.models import CircuitTermination
+
+from .models import ConsolePort, ConsoleServerPort, Interface, InterfaceConnection, PowerOutlet, PowerPort
+
+
+# Node types
+NODE_INTERFACE = 'interface'
+NODE_CIRCUITTERMINATION = 'circuittermination'
+NODE_CONSOLEPORT = 'consoleport'
+NODE_CONSOLESERVERPORT = 'consoleserverport'
+NODE_POWERPORT = 'powerport'
+NODE_POWEROUTLET = 'poweroutlet'
+
+# The cache key under which the current version of the graph is stored. Each committed change increments it, so that
+# every other process rebuilds its graph. Changes made in this process are applied to its own graph incrementally.
+GRAPH_VERSION_CACHE_KEY = 'connection_graph_version'
+
+# The number of seconds after which the graph is rebuilt regardless of its version. This picks up changes made by
+# queryset updates (which emit no signals), and by other processes when the Django cache is not shared between them.
+MAX_GRAPH_AGE = 300
+
+
+class ConnectionGraph(object):
+    """
+    An in-memory adjacency graph of all physical connections. Each node is a (type, pk) tuple identifying an Interface,
+    CircuitTermination, console port, console server port, power port, or power outlet. Edges are created by:
+
+      * InterfaceConnections (Interface to Interface)
+      * CircuitTerminations attached to an Interface (Interface to CircuitTermination)
+      * Circuits (A-side CircuitTermination to Z-side CircuitTermination)
+      * Console connections (ConsolePort to ConsoleServerPort)
+      * Power connections (PowerPort to PowerOutlet)
+
+    Each edge is keyed by the object responsible for it, so that it can be replaced when that object changes.
+
+    Once built, an outdated graph is rebuilt in a background thread while the current graph continues to answer
+    queries, so that only the first query in a process waits for the graph to be built.
+    """
+
+    def __init__(self):
+        self.lock = threading.RLock()
+        self.build_lock = threading.Lock()
+        self.built = None
+        self.version = None
+        self.rebuilding = False
+        self.adjacency = defaultdict(dict)
+        self.edges = {}
+        self.circuits = defaultdict(dict)
+        self.terminations = {}
+
+    #
+    # Graph construction
+    #
+
+    def build(self, version=None):
+        """
+        (Re)build the entire graph from the database using one query per connection type. The new graph replaces the
+        current one once it is complete. version is the shared version read before building.
+        """
+        graph = ConnectionGraph()
+
+        for pk, interface_a, interface_b in InterfaceConnection.objects.order_by()\
+                .values_list('pk', 'interface_a_id', 'interface_b_id'):
+            graph._add_edge(('interfaceconnection', pk), (NODE_INTERFACE, interface_a), (NODE_INTERFACE, interface_b))
+
+        for pk, circuit, term_side, interface in CircuitTermination.objects.order_by()\
+                .values_list('pk', 'circuit_id', 'term_side', 'interface_id'):
+            graph._set_termination(pk, circuit, term_side, interface)
+
+        for pk, cs_port in ConsolePort.objects.filter(cs_port__isnull=False).order_by()\
+                .values_list('pk', 'cs_port_id'):
+            graph._add_edge(('consoleport', pk), (NODE_CONSOLEPORT, pk), (NODE_CONSOLESERVERPORT, cs_port))
+
+        for pk, power_outlet in PowerPort.objects.filter(power_outlet__isnull=False).order_by()\
+                .values_list('pk', 'power_outlet_id'):
+            graph._add_edge(('powerport', pk), (NODE_POWERPORT, pk), (NODE_POWEROUTLET, power_outlet))
+
+        with self.lock:
+            self.adjacency = graph.adjacency
+            self.edges = graph.edges
+            self.circuits = graph.circuits
+            self.terminations = graph.terminations
+            self.version = version
+            self.built = time.time()
+
+    def rebuild_async(self):
+        """
+        Rebuild the graph in a background thread, unless a rebuild is already in progress.
+        """
+        with self.lock:
+            if self.rebuilding:
+                return
+            self.rebuilding = True
+        thread = threading.Thread(target=self._rebuild)
+        thread.daemon = True
+        thread.start()
+
+    def _rebuild(self):
+        try:
+            with self.build_lock:
+                self.build(cache.get(GRAPH_VERSION_CACHE_KEY))
+        finally:
+            self.rebuilding = False
+            connection.close()
+
+    def ensure_built(self):
+        """
+        Build the graph if it has not yet been built (waiting for any build already in progress), or start rebuilding
+        it if it has been changed by another process or has reached MAX_GRAPH_AGE.
+        """
+        version = cache.get(GRAPH_VERSION_CACHE_KEY)
+        if self.built is None:
+            with self.build_lock:
+                if self.built is None:
+                    self.build(version)
+        elif self.version != version or time.time() - self.built > MAX_GRAPH_AGE:
+            self.rebuild_async()
+
+    def increment_version(self):
+        """
+        Increment the shared version following a committed change which has been applied to this graph, so that other
+        processes rebuild theirs. This graph remains current unless another process has changed the version meanwhile.
+        """
+        try:
+            version = cache.incr(GRAPH_VERSION_CACHE_KEY)
+        except ValueError:
+            version = 1
+            cache.set(GRAPH_VERSION_CACHE_KEY, version, None)
+        with self.lock:
+            if self.built is not None and version == (self.version or 0) + 1:
+                self.version = version
+
+    def _add_edge(self, key, node_a, node_b):
+        self._remove_edge(key)
+        self.edges[key] = (node_a, node_b)
+        self.adjacency[node_a][node_b] = key
+        self.adjacency[node_b][node_a] = key
+
+    def _remove_edge(self, key):
+        nodes = self.edges.pop(key, None)
+        if nodes is None:
+            return
+        node_a, node_b = nodes
+        for node, peer in ((node_a, node_b), (node_b, node_a)):
+            if node in self.adjacency and self.adjacency[node].get(peer) == key:
+                del self.adjacency[node][peer]
+                if not self.adjacency[node]:
+                    del self.adjacency[node]
+
+    def _update_circuit(self, circuit):
+        key = ('circuit', circuit)
+        sides = self.circuits.get(circuit, {})
+        if 'A' in sides and 'Z' in sides:
+            self._add_edge(key, (NODE_CIRCUITTERMINATION, sides['A']), (NODE_CIRCUITTERMINATION, sides['Z']))
+        else:
+            self._remove_edge(key)
+            if circuit in self.circuits and not sides:
+                del self.circuits[circuit]
+
+    def _set_termination(self, pk, circuit, term_side, interface):
+        self._remove_termination(pk)
+        self.terminations[pk] = (circuit, term_side)
+        self.circuits[circuit][term_side] = pk
+        self._update_circuit(circuit)
+        if interface is not None:
+            self._add_edge(('circuittermination', pk), (NODE_CIRCUITTERMINATION, pk), (NODE_INTERFACE, interface))
+
+    def _remove_termination(self, pk):
+        self._remove_edge(('circuittermination', pk))
+        previous = self.terminations.pop(pk, None)
+        if previous is not None:
+            circuit, term_side = previous
+            if self.circuits[circuit].get(term_side) == pk:
+                del self.circuits[circuit][term_side]
+            self._update_circuit(circuit)
+
+    #
+    # Incremental updates (called by signal handlers)
+    #
+
+    def update_object(self, instance):
+        with self.lock:
+            if self.built is None:
+                return
+            if isinstance(instance, InterfaceConnection):
+                self._add_edge(('interfaceconnection', instance.pk), (NODE_INTERFACE, instance.interface_a_id),
+                               (NODE_INTERFACE, instance.interface_b_id))
+            elif isinstance(instance, CircuitTermination):
+                self._set_termination(instance.pk, instance.circuit_id, instance.term_side, instance.interface_id)
+            elif isinstance(instance, ConsolePort):
+                if instance.cs_port_id:
+                    self._add_edge(('consoleport', instance.pk), (NODE_CONSOLEPORT, instance.pk),
+                                   (NODE_CONSOLESERVERPORT, instance.cs_port_id))
+                else:
+                    self._remove_edge(('consoleport', instance.pk))
+            elif isinstance(instance, PowerPort):
+                if instance.power_outlet_id:
+                    self._add_edge(('powerport', instance.pk), (NODE_POWERPORT, instance.pk),
+                                   (NODE_POWEROUTLET, instance.power_outlet_id))
+                else:
+                    self._remove_edge(('powerport', instance.pk))
+
+    def remove_object(self, instance):
+        with self.lock:
+            if self.built is None:
+                return
+            if isinstance(instance, InterfaceConnection):
+                self._remove_edge(('interfaceconnection', instance.pk))
+            elif isinstance(instance, CircuitTermination):
+                self._remove_termination(instance.pk)
+            elif isinstance(instance, ConsolePort):
+                self._remove_edge(('consoleport', instance.pk))
+            elif isinstance(instance, PowerPort):
+                self._remove_edge(('powerport', instance.pk))
+
+    #
+    # Queries
+    #
+
+    def trace(self, node):
+        """
+        Return the ordered list of nodes forming the path on which the given node lies, from one end to the other. A
+        node which has no connections is returned as a path of length one.
+        """
+        self.ensure_built()
+        with self.lock:
+
+            # Find one end of the path by walking away from the given node
+            visited = {node}
+            current = node
+            while True:
+                neighbors = [n for n in self.adjacency.get(current, {}) if n not in visited]
+                if not neighbors:
+                    break
+                current = neighbors[0]
+                visited.add(current)
+
+            # Walk the path from that end
+            path = [current]
+            while True:
+                neighbors = [n for n in self.adjacency.get(path[-1], {}) if n not in path]
+                if not neighbors:
+                    break
+                path.append(neighbors[0])
+
+            return path
+
+    def endpoints(self, node):
+        """
+        Return the nodes at the ends of the path on which the given node lies, excluding CircuitTerminations.
+        """
+        return [n for n in self.trace(node) if n[0] != NODE_CIRCUITTERMINATION]
+
+    def circuit_endpoints(self, circuit):
+        """
+        Return all endpoints (e.g. Interfaces) reachable through the terminations of the given Circuit (by PK).
+        """
+        self.ensure_built()
+        with self.lock:
+            terminations = list(self.circuits.get(circuit, {}).values())
+        endpoints = []
+        for pk in terminations:
+            for n in self.endpoints((NODE_CIRCUITTERMINATION, pk)):
+                if n not in endpoints:
+                    endpoints.append(n)
+        return endpoints
+
+
+# A single graph is maintained for each process
+connection_graph = ConnectionGraph()
+
+
+def resolve_nodes(nodes):
+    """
+    Return a dictionary mapping each of the given nodes to its object, using one query per node type.
+    """
+    querysets = {
+        NODE_INTERFACE: Interface.objects.select_related('device'),
+        NODE_CIRCUITTERMINATION: CircuitTermination.objects.select_related('circuit__provider', 'site'),
+        NODE_CONSOLEPORT: ConsolePort.objects.select_related('device'),
+        NODE_CONSOLESERVERPORT: ConsoleServerPort.objects.select_related('device'),
+        NODE_POWERPORT: PowerPort.objects.select_related('device'),
+        NODE_POWEROUTLET: PowerOutlet.objects.select_related('device'),
+    }
+    pks = defaultdict(list)
+    for node_type, pk in nodes:
+        pks[node_type].append(pk)
+    objects = {}
+    for node_type, pk_list in pks.items():
+        for obj in querysets[node_type].filter(pk__in=pk_list):
+            objects[(node_type, obj.pk)] = obj
+    return objects
+
+
+#
+# Signal handlers
+#
+
+def _apply_on_commit(apply_change, instance):
+    # Apply the change only once it has been committed, and then notify other processes. A copy of the instance is used
+    # so that its state is preserved (the PK of a deleted instance is cleared after post_delete is sent).
+    snapshot = copy(instance)
+
+    def apply_committed_change():
+        apply_change(snapshot)
+        connection_graph.increment_version()
+
+    transaction.on_commit(apply_committed_change)
+
+
+def update_connection_graph(sender, instance, **kwargs):
+    _apply_on_commit(connection_graph.update_object, instance)
+
+
+def remove_from_connection_graph(sender, instance, **kwargs):
+    _apply_on_commit(connection_graph.remove_object, instance)
@@ -1,38 +1,49 @@
-from copy import deepcopy
+from collections import Counter, defaultdict
 import re
 from natsort import natsorted
-from operator import attrgetter
+from operator import attrgetter, itemgetter
 
 from django.contrib import messages
 from django.contrib.auth.decorators import permission_required
 from django.contrib.auth.mixins import PermissionRequiredMixin
 from django.core.exceptions import ValidationError
+from django.core.paginator import EmptyPage, PageNotAnInteger, Paginator
 from django.core.urlresolvers import reverse
+from django.db import IntegrityError, transaction
 from django.db.models import Count
-from django.http import HttpResponseRedirect
+from django.http import Http404, HttpResponseRedirect
 from django.shortcuts import get_object_or_404, redirect, render
 from django.utils.http import urlencode
 from django.views.generic import View
 
 from ipam.models import Prefix, IPAddress, Service, VLAN
-from circuits.models import Circuit
+from circuits.models import Circuit, CircuitTermination
+from extras.changelog import log_create
+from extras.customfields import get_custom_field_sources
 from extras.models import Graph, TopologyMap, GRAPH_TYPE_INTERFACE, GRAPH_TYPE_SITE
+from tenancy.models import Tenant
+from utilities.conditional import conditional_page
 from utilities.forms import ConfirmationForm
 from utilities.views import (
     BulkDeleteView, BulkEditView, BulkImportView, ObjectDeleteView, ObjectEditView, ObjectListView,
 )
 
 from . import filters, forms, tables
+from .tracing import connection_graph, NODE_INTERFACE, resolve_nodes
 from .models import (
     CONNECTION_STATUS_CONNECTED, ConsolePort, ConsolePortTemplate, ConsoleServerPort, ConsoleServerPortTemplate, Device,
-    DeviceBay, DeviceBayTemplate, DeviceRole, DeviceType, Interface, InterfaceConnection, InterfaceTemplate,
-    Manufacturer, Module, Platform, PowerOutlet, PowerOutletTemplate, PowerPort, PowerPortTemplate, Rack, RackGroup,
-    RackRole, Site,
+    DeviceBay, DeviceBayTemplate, DeviceRole, DeviceType, get_module_tree, Interface, InterfaceConnection,
+    InterfaceTemplate, Manufacturer, Module, Platform, PowerOutlet, PowerOutletTemplate, PowerPort, PowerPortTemplate,
+    prefetch_interface_connections, Rack, RackGroup, RackRole, Site, SUBDEVICE_ROLE_CHILD, update_rack_spans,
+    walk_module_tree,
 )
 
 
 EXPANSION_PATTERN = '\[(\d+-\d+)\]'
 
+DEVICE_COMPONENTS_PER_PAGE = 100
+BULK_CREATE_BATCH_SIZE = 1000
+
 
 def xstr(s):
     """
@@ -57,6 +68,16 @@ def expand_pattern(string):
             yield "{0}{1}".format(lead, i)
 
 
+def summarize_names(names, limit=5):
+    """
+    Abbreviate a long list of names for display. Example:
+      ['ge-0/0/0', 'ge-0/0/1', ... 'ge-0/0/47'] => 'ge-0/0/0, ge-0/0/1, ge-0/0/2, ge-0/0/3, ge-0/0/4 and 43 more'
+    """
+    if len(names) <= limit:
+        return u', '.join(names)
+    return u'{} and {} more'.format(u', '.join(names[:limit]), len(names) - limit)
+
+
 #
 # Sites
 #
@@ -70,6 +91,23 @@ class SiteListView(ObjectListView):
     template_name = 'dcim/site_list.html'
 
 
+def site_validator_sources(request, slug):
+    sites = Site.objects.filter(slug=slug)
+    return [
+        sites,
+        Tenant.objects.filter(sites__slug=slug),
+        Rack.objects.filter(site__slug=slug),
+        Device.objects.filter(rack__site__slug=slug),
+        Prefix.objects.filter(site__slug=slug),
+        VLAN.objects.filter(site__slug=slug),
+        CircuitTermination.objects.filter(site__slug=slug),
+        RackGroup.objects.filter(site__slug=slug),
+        TopologyMap.objects.filter(site__slug=slug),
+        Graph,
+    ] + get_custom_field_sources(sites)
+
+
+@conditional_page(site_validator_sources)
 def site(request, slug):
 
     site = get_object_or_404(Site, slug=slug)
@@ -189,6 +227,23 @@ class RackListView(ObjectListView):
     template_name = 'dcim/rack_list.html'
 
 
+def rack_validator_sources(request, pk):
+    racks = Rack.objects.filter(pk=pk)
+    return [
+        racks,
+        Site.objects.filter(racks__pk=pk),
+        RackGroup.objects.filter(racks__pk=pk),
+        RackRole.objects.filter(racks__pk=pk),
+        Tenant.objects.filter(racks__pk=pk),
+        Device.objects.filter(rack=pk),
+        DeviceType,
+        Manufacturer,
+        DeviceRole,
+        Rack.objects.filter(site__racks__pk=pk),
+    ] + get_custom_field_sources(racks)
+
+
+@conditional_page(rack_validator_sources)
 def rack(request, pk):
 
     rack = get_object_or_404(Rack, pk=pk)
@@ -348,6 +403,25 @@ class DeviceTypeBulkEditView(PermissionRequiredMixin, BulkEditView):
     template_name = 'dcim/devicetype_bulk_edit.html'
     default_redirect_url = 'dcim:devicetype_list'
 
+    def update_objects(self, pk_list, fields):
+        if 'u_height' in fields and DeviceType.objects.filter(
+            pk__in=pk_list, subdevice_role=SUBDEVICE_ROLE_CHILD
+        ).exists():
+            raise ValidationError(u"Child device types must be 0U.")
+        updated_count = super(DeviceTypeBulkEditView, self).update_objects(pk_list, fields)
+        # Changing the height of DeviceTypes changes the rack units occupied by all of their instances
+        if 'u_height' in fields:
+            try:
+                with transaction.atomic():
+                    update_rack_spans(Device.objects.filter(device_type__in=pk_list))
+            except IntegrityError:
+                raise ValidationError(
+                    u"Not all devices of the selected types have sufficient rack space for a height of {}U.".format(
+                        fields['u_height']
+                    )
+                )
+        return updated_count
+
 
 class DeviceTypeBulkDeleteView(PermissionRequiredMixin, BulkDeleteView):
     permission_required = 'dcim.delete_devicetype'
@@ -394,6 +468,7 @@ class ComponentTemplateCreateView(View):
 
             if not form.errors:
                 self.model.objects.bulk_create(component_templates)
+                log_create(component_templates)
                 messages.success(request, u"Added {} component(s) to {}.".format(len(component_templates), devicetype))
                 if '_addanother' in request.POST:
                     return redirect(request.path)
@@ -548,28 +623,28 @@ class DeviceListView(ObjectListView):
 
 def device(request, pk):
 
-    device = get_object_or_404(Device, pk=pk)
+    device = get_object_or_404(Device.objects.select_related(
+        'rack__site', 'tenant', 'device_type__manufacturer', 'device_role', 'platform', 'primary_ip4', 'primary_ip6',
+        'parent_bay__device',
+    ), pk=pk)
     console_ports = natsorted(
         ConsolePort.objects.filter(device=device).select_related('cs_port__device'), key=attrgetter('name')
     )
-    cs_ports = natsorted(
-        ConsoleServerPort.objects.filter(device=device).select_related('connected_console'), key=attrgetter('name')
-    )
     power_ports = natsorted(
         PowerPort.objects.filter(device=device).select_related('power_outlet__device'), key=attrgetter('name')
     )
-    power_outlets = natsorted(
-        PowerOutlet.objects.filter(device=device).select_related('connected_port'), key=attrgetter('name')
-    )
-    interfaces = Interface.objects.filter(device=device, mgmt_only=False)\
-        .select_related('connected_as_a', 'connected_as_b', 'circuit_termination__circuit')
-    mgmt_interfaces = Interface.objects.filter(device=device, mgmt_only=True)\
-        .select_related('connected_as_a', 'connected_as_b', 'circuit_termination__circuit')
+    mgmt_interfaces = prefetch_interface_connections(Interface.objects.filter(device=device, mgmt_only=True))
     device_bays = natsorted(
         DeviceBay.objects.filter(device=device).select_related('installed_device__device_type__manufacturer'),
         key=attrgetter('name')
     )
 
+    # Interfaces, console server ports, and power outlets may number in the hundreds; only their counts are rendered
+    # here. Their tables are populated on demand (see device_components()).
+    interface_count = Interface.objects.filter(device=device, mgmt_only=False).count()
+    cs_port_count = ConsoleServerPort.objects.filter(device=device).count()
+    power_outlet_count = PowerOutlet.objects.filter(device=device).count()
+
     # Gather relevant device objects
     ip_addresses = IPAddress.objects.filter(interface__device=device).select_related('interface', 'vrf')\
         .order_by('address')
@@ -597,11 +672,11 @@ def device(request, pk):
     return render(request, 'dcim/device.html', {
         'device': device,
         'console_ports': console_ports,
-        'cs_ports': cs_ports,
         'power_ports': power_ports,
-        'power_outlets': power_outlets,
-        'interfaces': interfaces,
         'mgmt_interfaces': mgmt_interfaces,
+        'interface_count': interface_count,
+        'cs_port_count': cs_port_count,
+        'power_outlet_count': power_outlet_count,
         'device_bays': device_bays,
         'ip_addresses': ip_addresses,
         'services': services,
@@ -611,6 +686,45 @@ def device(request, pk):
     })
 
 
+def device_components(request, pk, component):
+    """
+    Render a page of rows for one of a Device's component tables (interfaces, console server ports, or power outlets).
+    """
+    device = get_object_or_404(Device, pk=pk)
+
+    def get_page(paginator):
+        try:
+            return paginator.page(request.GET.get('page', 1))
+        except (EmptyPage, PageNotAnInteger):
+            raise Http404
+
+    if component == 'interfaces':
+        # Interfaces are ordered naturally by the database
+        paginator = Paginator(Interface.objects.filter(device=device, mgmt_only=False), DEVICE_COMPONENTS_PER_PAGE)
+        page = get_page(paginator)
+        objects = prefetch_interface_connections(page.object_list)
+    else:
+        # Sort only the names in Python, then retrieve the requested page of objects
+        if component == 'cs-ports':
+            queryset = ConsoleServerPort.objects.select_related('connected_console__device')
+        else:
+            queryset = PowerOutlet.objects.select_related('connected_port__device')
+        names = natsorted(queryset.filter(device=device).values_list('pk', 'name'), key=itemgetter(1))
+        paginator = Paginator([obj_pk for obj_pk, name in names], DEVICE_COMPONENTS_PER_PAGE)
+        page = get_page(paginator)
+        objects = queryset.in_bulk(page.object_list)
+        objects = [objects[obj_pk] for obj_pk in page.object_list if obj_pk in objects]
+
+    return render(request, 'dcim/inc/device_components.html', {
+        'device': device,
+        'component': component,
+        'objects': objects,
+        'page': page,
+        'remaining': paginator.count - page.end_index(),
+        'show_graphs': component == 'interfaces' and Graph.objects.filter(type=GRAPH_TYPE_INTERFACE).exists(),
+    })
+
+
 class DeviceEditView(PermissionRequiredMixin, ObjectEditView):
     permission_required = 'dcim.change_device'
     model = Device
@@ -658,6 +772,17 @@ class DeviceBulkEditView(PermissionRequiredMixin, BulkEditView):
     template_name = 'dcim/device_bulk_edit.html'
     default_redirect_url = 'dcim:device_list'
 
+    def update_objects(self, pk_list, fields):
+        updated_count = super(DeviceBulkEditView, self).update_objects(pk_list, fields)
+        # Changing the DeviceType of racked Devices changes the rack units they occupy
+        if 'device_type' in fields:
+            try:
+                with transaction.atomic():
+                    update_rack_spans(Device.objects.filter(pk__in=pk_list))
+            except IntegrityError:
+                raise ValidationError(u"The selected devices lack sufficient rack space for this device type.")
+        return updated_count
+
 
 class DeviceBulkDeleteView(PermissionRequiredMixin, BulkDeleteView):
     permission_required = 'dcim.delete_device'
@@ -668,8 +793,7 @@ class DeviceBulkDeleteView(PermissionRequiredMixin, BulkDeleteView):
 def device_inventory(request, pk):
 
     device = get_object_or_404(Device, pk=pk)
-    modules = Module.objects.filter(device=device, parent=None).select_related('manufacturer')\
-        .prefetch_related('submodules')
+    modules = list(walk_module_tree(get_module_tree(device)))
 
     return render(request, 'dcim/device_inventory.html', {
         'device': device,
@@ -680,7 +804,7 @@ def device_inventory(request, pk):
 def device_lldp_neighbors(request, pk):
 
     device = get_object_or_404(Device, pk=pk)
-    interfaces = Interface.objects.filter(device=device).select_related('connected_as_a', 'connected_as_b')
+    interfaces = prefetch_interface_connections(Interface.objects.filter(device=device))
 
     return render(request, 'dcim/device_lldp_neighbors.html', {
         'device': device,
@@ -703,6 +827,60 @@ class DeviceBulkAddComponentView(View):
     def get(self):
         return redirect('dcim:device_list')
 
+    def build_components(self, devices, names, data):
+        """
+        Build (but do not save) a component for each name on each Device. Each name and the shared attributes are
+        validated once, model validation is run once per DeviceType, and existing names are checked for all Devices with
+        a single query. Returns a list of components and a list of errors, one per Device with problems.
+        """
+        attrs = {f: data[f] for f in self.model_form._meta.fields if f not in ('device', 'name') and f in data}
+        errors = []
+
+        # Validate the shared attributes and each name once
+        name_field = self.model._meta.get_field('name')
+        for name in names:
+            try:
+                name_field.clean(name, None)
+            except ValidationError as e:
+                errors.append(u"{}: {}".format(name, ', '.join(e.messages)))
+        duplicates = natsorted(n for n, count in Counter(names).items() if count > 1)
+        if duplicates:
+            errors.append(u"Duplicate names: {}".format(', '.join(duplicates)))
+        try:
+            self.model(name=names[0], **attrs).clean_fields(exclude=['device', 'name'])
+        except ValidationError as e:
+            errors += [u"{}: {}".format(field, ', '.join(messages)) for field, messages in e.message_dict.items()]
+        if errors:
+            return [], errors
+
+        # Find names which are already in use on any of the Devices
+        existing = defaultdict(list)
+        for device_pk, name in self.model.objects.filter(device__in=devices, name__in=names)\
+                .values_list('device_id', 'name'):
+            existing[device_pk].append(name)
+
+        new_components = []
+        device_type_errors = {}
+        for device in devices:
+
+            # Model validation depends only on the DeviceType (e.g. whether it supports device bays)
+            if device.device_type_id not in device_type_errors:
+                try:
+                    self.model(device=device, name=names[0], **attrs).clean()
+                    device_type_errors[device.device_type_id] = None
+                except ValidationError as e:
+                    device_type_errors[device.device_type_id] = ', '.join(e.messages)
+            if device_type_errors[device.device_type_id]:
+                errors.append(u"{}: {}".format(device, device_type_errors[device.device_type_id]))
+            elif existing[device.pk]:
+                errors.append(u"{}: {} already exist{}".format(
+                    device, summarize_names(natsorted(existing[device.pk])), '' if len(existing[device.pk]) > 1 else 's'
+                ))
+            else:
+                new_components += [self.model(device=device, name=name, **attrs) for name in names]
+
+        return new_components, errors
+
     def post(self, request):
 
         # Are we editing *all* objects in the queryset or just a selected subset?
@@ -715,29 +893,19 @@ class DeviceBulkAddComponentView(View):
             form = self.form(request.POST)
             if form.is_valid():
 
-                new_components = []
-                data = deepcopy(form.cleaned_data)
-                for device in data['pk']:
-
-                    names = data['name_pattern']
-                    for name in names:
-                        component_data = {
-                            'device': device.pk,
-                            'name': name,
-                        }
-                        component_data.update(data)
-                        component_form = self.model_form(component_data)
-                        if component_form.is_valid():
-                            new_components.append(component_form.save(commit=False))
-                        else:
-                            for field, errors in component_form.errors.as_data().items():
-                                for e in errors:
-                                    form.add_error(field, u'{} {}: {}'.format(device, name, ', '.join(e)))
+                devices = form.cleaned_data['pk'].select_related('device_type')
+                names = form.cleaned_data['name_pattern']
+                new_components, errors = self.build_components(devices, names, form.cleaned_data)
+
+                for error in errors:
+                    form.add_error(None, error)
 
                 if not form.errors:
-                    self.model.objects.bulk_create(new_components)
+                    with transaction.atomic():
+                        self.model.objects.bulk_create(new_components, batch_size=BULK_CREATE_BATCH_SIZE)
+                        log_create(new_components)
                     messages.success(request, u"Added {} {} to {} devices.".format(
-                        len(new_components), self.model._meta.verbose_name_plural, len(form.cleaned_data['pk'])
+                        len(new_components), self.model._meta.verbose_name_plural, len(devices)
                     ))
                     return redirect('dcim:device_list')
 
@@ -814,6 +982,7 @@ def consoleport_add(request, pk):
 
             if not form.errors:
                 ConsolePort.objects.bulk_create(console_ports)
+                log_create(console_ports)
                 messages.success(request, u"Added {} console port(s) to {}.".format(len(console_ports), device))
                 if '_addanother' in request.POST:
                     return redirect('dcim:consoleport_add', pk=device.pk)
@@ -941,6 +1110,7 @@ def consoleserverport_add(request, pk):
 
             if not form.errors:
                 ConsoleServerPort.objects.bulk_create(cs_ports)
+                log_create(cs_ports)
                 messages.success(request, u"Added {} console server port(s) to {}.".format(len(cs_ports), device))
                 if '_addanother' in request.POST:
                     return redirect('dcim:consoleserverport_add', pk=device.pk)
@@ -1061,6 +1231,7 @@ def powerport_add(request, pk):
 
             if not form.errors:
                 PowerPort.objects.bulk_create(power_ports)
+                log_create(power_ports)
                 messages.success(request, u"Added {} power port(s) to {}.".format(len(power_ports), device))
                 if '_addanother' in request.POST:
                     return redirect('dcim:powerport_add', pk=device.pk)
@@ -1187,6 +1358,7 @@ def poweroutlet_add(request, pk):
 
             if not form.errors:
                 PowerOutlet.objects.bulk_create(power_outlets)
+                log_create(power_outlets)
                 messages.success(request, u"Added {} power outlet(s) to {}.".format(len(power_outlets), device))
                 if '_addanother' in request.POST:
                     return redirect('dcim:poweroutlet_add', pk=device.pk)
@@ -1310,6 +1482,7 @@ def interface_add(request, pk):
 
             if not form.errors:
                 Interface.objects.bulk_create(interfaces)
+                log_create(interfaces)
                 messages.success(request, u"Added {} interface(s) to {}.".format(len(interfaces), device))
                 if '_addanother' in request.POST:
                     return redirect('dcim:interface_add', pk=device.pk)
@@ -1352,6 +1525,18 @@ class InterfaceBulkDeleteView(PermissionRequiredMixin, BulkDeleteView):
     parent_cls = Device
 
 
+def interface_trace(request, pk):
+
+    interface = get_object_or_404(Interface.objects.select_related('device'), pk=pk)
+    nodes = connection_graph.trace((NODE_INTERFACE, interface.pk))
+    objects = resolve_nodes(nodes)
+
+    return render(request, 'dcim/interface_trace.html', {
+        'interface': interface,
+        'path': [(node[0], objects[node]) for node in nodes if node in objects],
+    })
+
+
 #
 # Device bays
 #
@@ -1379,6 +1564,7 @@ def devicebay_add(request, pk):
 
             if not form.errors:
                 DeviceBay.objects.bulk_create(device_bays)
+                log_create(device_bays)
                 messages.success(request, u"Added {} device bay(s) to {}.".format(len(device_bays), device))
                 if '_addanother' in request.POST:
                     return redirect('dcim:devicebay_add', pk=device.pk)
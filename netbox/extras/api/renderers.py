@@ -1,5 +1,12 @@
+from collections import OrderedDict
+import csv
 import json
-from rest_framework import renderers
+from StringIO import StringIO
+
+from rest_framework import renderers, serializers
+from rest_framework.utils.encoders import JSONEncoder
+
+from extras.models import CF_TYPE_SELECT
 
 
 # IP address family designations
@@ -9,6 +16,51 @@ AF = {
 }
 
 
+def get_records(data):
+    """
+    Return the list of records from a response, which may be paginated.
+    """
+    if isinstance(data, dict) and 'results' in data:
+        return data['results']
+    return data
+
+
+def flatten(entry, columns=None, prefix=''):
+    """
+    Flatten a nested record, joining the keys of nested dictionaries with underscores. Example:
+      {'rack': {'id': 1, 'name': 'R1'}} => [('rack_id', 1), ('rack_name', 'R1')]
+
+    Dictionaries whose flattened key is one of the given columns are left intact.
+    """
+    for key, val in entry.iteritems():
+        key = prefix + key
+        if isinstance(val, dict) and (columns is None or key not in columns):
+            for item in flatten(val, columns, key + '_'):
+                yield item
+        else:
+            yield key, val
+
+
+def get_columns(fields, custom_fields=None, prefix=''):
+    """
+    Return the flattened columns for a serializer's fields. A nested serializer has a column for each of its own
+    fields, whether or not the related object exists, and custom fields have a column for each of the given CustomFields
+    (two for selections: the choice's ID and value). Any other field has a single column.
+    """
+    columns = []
+    for name, field in fields.items():
+        name = prefix + name
+        if isinstance(field, serializers.Serializer):
+            columns += get_columns(field.fields, prefix=name + '_')
+        elif name == 'custom_fields' and custom_fields is not None:
+            for cf in custom_fields:
+                column = 'custom_fields_{}'.format(cf.name)
+                columns += [column + '_id', column + '_value'] if cf.type == CF_TYPE_SELECT else [column]
+        else:
+            columns.append(name)
+    return columns
+
+
 class FormlessBrowsableAPIRenderer(renderers.BrowsableAPIRenderer):
     """
     An instance of the browseable API with forms suppressed. Useful for POST endpoints that don't create objects.
@@ -17,7 +69,105 @@ class FormlessBrowsableAPIRenderer(renderers.BrowsableAPIRenderer):
         return False
 
 
-class BINDZoneRenderer(renderers.BaseRenderer):
+class StreamingRenderer(renderers.BaseRenderer):
+    """
+    A renderer which can emit a list of records incrementally. List views which support streaming (see
+    utilities.api.StreamingListMixin) pass records to render_stream() as they are serialized; all other responses are
+    rendered in full by render().
+    """
+    streaming = True
+    charset = 'utf-8'
+
+    def render(self, data, media_type=None, renderer_context=None):
+        if data is None:
+            return ''
+        if isinstance(data, dict) and 'results' not in data:
+            data = [data]
+        return ''.join(self.render_stream(get_records(data), renderer_context))
+
+    def render_stream(self, records, renderer_context=None):
+        """
+        Yield the rendered output for an iterable of records in pieces.
+        """
+        raise NotImplementedError
+
+
+class StreamingJSONRenderer(StreamingRenderer):
+    """
+    Render a JSON array incrementally. Non-list responses are rendered as ordinary JSON.
+    """
+    format = 'json-stream'
+    media_type = 'application/json'
+
+    def render(self, data, media_type=None, renderer_context=None):
+        if data is None:
+            return ''
+        return json.dumps(data, cls=JSONEncoder)
+
+    def render_stream(self, records, renderer_context=None):
+        yield '['
+        for i, record in enumerate(records):
+            yield (',' if i else '') + json.dumps(record, cls=JSONEncoder)
+        yield ']'
+
+
+class NDJSONRenderer(StreamingRenderer):
+    """
+    Render newline-delimited JSON: one record per line.
+    """
+    format = 'ndjson'
+    media_type = 'application/x-ndjson'
+
+    def render_stream(self, records, renderer_context=None):
+        for record in records:
+            yield json.dumps(record, cls=JSONEncoder) + '\n'
+
+
+class CSVRenderer(StreamingRenderer):
+    """
+    Render flattened records as CSV. The columns are taken from the view's serializer (see get_columns()), so that they
+    do not depend on which related objects the first record has; or from the first record, for views without one.
+    Values which are not flattened into columns of their own (lists, and dictionaries from method fields) are rendered
+    as JSON.
+    """
+    format = 'csv'
+    media_type = 'text/csv'
+
+    def get_columns(self, renderer_context, record):
+        view = renderer_context.get('view')
+        response = renderer_context.get('response')
+        if not hasattr(view, 'get_serializer') or (response is not None and response.exception):
+            return None
+        fields = view.get_serializer().fields
+        # Records which do not match the serializer (e.g. from views with custom responses) are left to the fallback
+        if not set(record).issubset(fields):
+            return None
+        return get_columns(fields, getattr(view, 'custom_fields', None))
+
+    def render_stream(self, records, renderer_context=None):
+        buffer = StringIO()
+        writer = None
+        columns = None
+        for record in records:
+            if writer is None:
+                columns = self.get_columns(renderer_context or {}, record)
+                row = OrderedDict(flatten(record, columns))
+                writer = csv.DictWriter(buffer, fieldnames=columns or row.keys(), extrasaction='ignore')
+                writer.writeheader()
+            else:
+                row = OrderedDict(flatten(record, columns))
+            for key, val in row.items():
+                if isinstance(val, (dict, list)):
+                    row[key] = json.dumps(val, cls=JSONEncoder)
+                elif isinstance(val, unicode):
+                    row[key] = val.encode('utf-8')
+            writer.writerow(row)
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+
+
+class BINDZoneRenderer(StreamingRenderer):
     """
     Generate a BIND zone file from a list of DNS records.
         Required fields: `name`, `primary_ip`
@@ -25,22 +175,20 @@ class BINDZoneRenderer(renderers.BaseRenderer):
     media_type = 'text/plain'
     format = 'bind-zone'
 
-    def render(self, data, media_type=None, renderer_context=None):
-        records = []
-        for record in data:
+    def render_stream(self, records, renderer_context=None):
+        for record in records:
             if record.get('name') and record.get('primary_ip'):
                 try:
-                    records.append("{} IN {} {}".format(
+                    yield u"{} IN {} {}\n".format(
                         record['name'],
                         AF[record['primary_ip']['family']],
                         record['primary_ip']['address'].split('/')[0],
-                    ))
+                    )
                 except KeyError:
                     pass
-        return '\n'.join(records)
 
 
-class FlatJSONRenderer(renderers.BaseRenderer):
+class FlatJSONRenderer(StreamingJSONRenderer):
     """
     Flattens a nested JSON response.
     """
@@ -48,16 +196,14 @@ class FlatJSONRenderer(renderers.BaseRenderer):
     media_type = 'application/json'
 
     def render(self, data, media_type=None, renderer_context=None):
+        if isinstance(data, dict) and 'results' in data:
+            data['results'] = [OrderedDict(flatten(i)) for i in data['results']]
+            return json.dumps(data, cls=JSONEncoder)
+        return json.dumps([OrderedDict(flatten(i)) for i in data], cls=JSONEncoder)
 
-        def flatten(entry):
-            for key, val in entry.iteritems():
-                if isinstance(val, dict):
-                    for child_key, child_val in flatten(val):
-                        yield "{}_{}".format(key, child_key), child_val
-                else:
-                    yield key, val
-
-        return json.dumps([dict(flatten(i)) for i in data])
+    def render_stream(self, records, renderer_context=None):
+        records = (OrderedDict(flatten(r)) for r in records)
+        return super(FlatJSONRenderer, self).render_stream(records, renderer_context)
 
 
 class FreeRADIUSClientsRenderer(renderers.BaseRenderer):
@@ -75,7 +221,7 @@ class FreeRADIUSClientsRenderer(renderers.BaseRenderer):
     def render(self, data, media_type=None, renderer_context=None):
         clients = []
         try:
-            for secret in data:
+            for secret in get_records(data):
                 if secret['device']['primary_ip'] and secret['plaintext']:
                     client = self.CLIENT_TEMPLATE.format(
                         name=secret['device']['name'],
@@ -1,6 +1,11 @@
+import json
+
 from rest_framework import serializers
 
-from extras.models import CF_TYPE_SELECT, CustomFieldChoice, Graph
+from django.contrib.contenttypes.models import ContentType
+
+from extras.customfields import custom_field_cache
+from extras.models import CF_TYPE_SELECT, CustomFieldChoice, Graph, ObjectChange
 
 
 class CustomFieldSerializer(serializers.Serializer):
@@ -12,24 +17,25 @@ class CustomFieldSerializer(serializers.Serializer):
     def get_custom_fields(self, obj):
 
         # Gather all CustomFields applicable to this object
-        fields = {cf.name: None for cf in self.context['view'].custom_fields}
-
-        # Attach any defined CustomFieldValues to their respective CustomFields
+        view = self.context.get('view')
+        if hasattr(view, 'custom_fields'):
+            custom_fields = view.custom_fields
+        else:
+            custom_fields = custom_field_cache.get_fields(ContentType.objects.get_for_model(obj))
+        fields = {cf.name: None for cf in custom_fields}
+        fields_by_pk = {cf.pk: cf for cf in custom_fields}
+
+        # Attach any defined CustomFieldValues to their respective CustomFields. Definitions (including selection
+        # choices) are retrieved from the custom field cache rather than the database.
         for cfv in obj.custom_field_values.all():
-
-            # Attempt to suppress database lookups for CustomFieldChoices by using the cached choice set from the view
-            # context.
-            if cfv.field.type == CF_TYPE_SELECT and hasattr(self, 'custom_field_choices'):
-                cfc = {
-                    'id': int(cfv.serialized_value),
-                    'value': self.context['view'].custom_field_choices[int(cfv.serialized_value)]
-                }
-                fields[cfv.field.name] = CustomFieldChoiceSerializer(instance=cfc).data
-            # Fall back to hitting the database in case we're in a view that doesn't inherit CustomFieldModelAPIView.
-            elif cfv.field.type == CF_TYPE_SELECT:
-                fields[cfv.field.name] = CustomFieldChoiceSerializer(instance=cfv.value).data
+            cf = fields_by_pk.get(cfv.field_id)
+            if cf is None:
+                continue
+            value = cf.deserialize_value(cfv.serialized_value)
+            if cf.type == CF_TYPE_SELECT:
+                fields[cf.name] = CustomFieldChoiceSerializer(instance=value).data
             else:
-                fields[cfv.field.name] = cfv.value
+                fields[cf.name] = value
 
         return fields
 
@@ -54,3 +60,20 @@ class GraphSerializer(serializers.ModelSerializer):
 
     def get_embed_link(self, obj):
         return obj.embed_link(self.context['graphed_object'])
+
+
+class ObjectChangeSerializer(serializers.ModelSerializer):
+    type = serializers.SerializerMethodField()
+    action = serializers.ReadOnlyField(source='get_action_display')
+    data = serializers.SerializerMethodField()
+
+    class Meta:
+        model = ObjectChange
+        fields = ['id', 'time', 'type', 'object_id', 'action', 'data']
+
+    def get_type(self, obj):
+        content_type = ContentType.objects.get_for_id(obj.content_type_id)
+        return '{}.{}'.format(content_type.app_label, content_type.model)
+
+    def get_data(self, obj):
+        return json.loads(obj.data) if obj.data else None
@@ -1,17 +1,24 @@
-import graphviz
 from rest_framework import generics
+from rest_framework.exceptions import ValidationError
 from rest_framework.views import APIView
 
 from django.contrib.contenttypes.models import ContentType
 from django.db.models import Q
+from django.utils.dateparse import parse_datetime
 from django.http import Http404, HttpResponse
 from django.shortcuts import get_object_or_404
 
 from circuits.models import Provider
-from dcim.models import Site, Device, Interface, InterfaceConnection
-from extras.models import Graph, TopologyMap, GRAPH_TYPE_INTERFACE, GRAPH_TYPE_PROVIDER, GRAPH_TYPE_SITE
+from dcim.models import Site, Interface
+from extras.customfields import custom_field_cache
+from extras.models import (
+    CustomField, CustomFieldChoice, Graph, ObjectChange, TopologyMap, GRAPH_TYPE_INTERFACE, GRAPH_TYPE_PROVIDER,
+    GRAPH_TYPE_SITE,
+)
+from extras.topology import get_topology_data, topology_map_renderer, TOPOLOGY_MAP_FORMATS
+from utilities.api import KeysetPagination, ListAPIView, ServiceUnavailable
 
-from .serializers import GraphSerializer
+from .serializers import GraphSerializer, ObjectChangeSerializer
 
 
 class CustomFieldModelAPIView(object):
@@ -22,17 +29,16 @@ class CustomFieldModelAPIView(object):
     def __init__(self):
         super(CustomFieldModelAPIView, self).__init__()
         self.content_type = ContentType.objects.get_for_model(self.queryset.model)
-        self.custom_fields = self.content_type.custom_fields.prefetch_related('choices')
+        self.custom_fields = custom_field_cache.get_fields(self.content_type)
 
-        # Cache all relevant CustomFieldChoices. This saves us from having to do a lookup per select field per object.
-        custom_field_choices = {}
-        for field in self.custom_fields:
-            for cfc in field.choices.all():
-                custom_field_choices[cfc.id] = cfc.value
-        self.custom_field_choices = custom_field_choices
+    def get_validator_sources(self):
+        # Custom field definitions determine the custom fields rendered for each object
+        return super(CustomFieldModelAPIView, self).get_validator_sources() + [
+            CustomField, CustomField.obj_type.through, CustomFieldChoice
+        ]
 
 
-class GraphListView(generics.ListAPIView):
+class GraphListView(ListAPIView):
     """
     Returns a list of relevant graphs
     """
@@ -64,52 +70,71 @@ class TopologyMapView(APIView):
     def get(self, request, slug):
 
         tmap = get_object_or_404(TopologyMap, slug=slug)
+        output = request.GET.get('output', 'png')
+        if output not in TOPOLOGY_MAP_FORMATS:
+            raise ValidationError("Invalid output format: {}".format(output))
 
-        # Construct the graph
-        graph = graphviz.Graph()
-        graph.graph_attr['ranksep'] = '1'
-        for i, device_set in enumerate(tmap.device_sets):
-
-            subgraph = graphviz.Graph(name='sg{}'.format(i))
-            subgraph.graph_attr['rank'] = 'same'
-
-            # Add a pseudonode for each device_set to enforce hierarchical layout
-            subgraph.node('set{}'.format(i), label='', shape='none', width='0')
-            if i:
-                graph.edge('set{}'.format(i - 1), 'set{}'.format(i), style='invis')
-
-            # Add each device to the graph
-            devices = []
-            for query in device_set.split(';'):  # Split regexes on semicolons
-                devices += Device.objects.filter(name__regex=query)
-            for d in devices:
-                subgraph.node(d.name)
-
-            # Add an invisible connection to each successive device in a set to enforce horizontal order
-            for j in range(0, len(devices) - 1):
-                subgraph.edge(devices[j].name, devices[j + 1].name, style='invis')
-
-            graph.subgraph(subgraph)
-
-        # Compile list of all devices
-        device_superset = Q()
-        for device_set in tmap.device_sets:
-            for query in device_set.split(';'):  # Split regexes on semicolons
-                device_superset = device_superset | Q(name__regex=query)
-
-        # Add all connections to the graph
-        devices = Device.objects.filter(*(device_superset,))
-        connections = InterfaceConnection.objects.filter(interface_a__device__in=devices,
-                                                         interface_b__device__in=devices)
-        for c in connections:
-            graph.edge(c.interface_a.device.name, c.interface_b.device.name)
-
-        # Get the image data and return
+        # Retrieve the map's devices and connections. The rendered image is cached by content, so Graphviz is only
+        # invoked (outside of the request thread) when something has changed.
+        device_sets, connections = get_topology_data(tmap)
         try:
-            topo_data = graph.pipe(format='png')
-        except:
+            topo_data = topology_map_renderer.render(device_sets, connections, output)
+        except RuntimeError:
             return HttpResponse("There was an error generating the requested graph. Ensure that the GraphViz "
                                 "executables have been installed correctly.")
-        response = HttpResponse(topo_data, content_type='image/png')
+        if topo_data is None:
+            raise ServiceUnavailable("The requested graph is still being generated. Please try again shortly.")
+        response = HttpResponse(topo_data, content_type=TOPOLOGY_MAP_FORMATS[output])
 
         return response
+
+
+class ObjectChangePagination(KeysetPagination):
+    """
+    Always paginate the change feed, in the order in which changes were committed.
+    """
+    ordering = ('txid', 'id')
+
+    def is_paginated(self, request):
+        return True
+
+
+class ObjectChangeListView(generics.ListAPIView):
+    """
+    List changes to objects, in the order in which they were committed. Pass ?since=<change ID> to list only changes
+    committed after the given change (or ?since=<ISO 8601 time> for changes made at or after the given time), and
+    ?type=<app label>.<model> to list only changes to one type of object.
+    """
+    queryset = ObjectChange.objects.all()
+    serializer_class = ObjectChangeSerializer
+    pagination_class = ObjectChangePagination
+    filter_backends = []
+
+    def get_queryset(self):
+
+        # Exclude changes from transactions which may not yet be visible, so that none can be skipped
+        queryset = super(ObjectChangeListView, self).get_queryset().committed()
+
+        since = self.request.query_params.get('since')
+        if since and since.isdigit():
+            txid = ObjectChange.objects.filter(pk=since).values_list('txid', flat=True).first()
+            if txid is None:
+                raise ValidationError({'since': "Unknown change ID: {}".format(since)})
+            queryset = queryset.filter(Q(txid__gt=txid) | Q(txid=txid, pk__gt=since))
+        elif since:
+            try:
+                time = parse_datetime(since)
+            except ValueError:
+                time = None
+            if time is None:
+                raise ValidationError({'since': "Must be a change ID or an ISO 8601 date and time."})
+            queryset = queryset.filter(time__gte=time)
+
+        object_type = self.request.query_params.get('type')
+        if object_type:
+            try:
+                queryset = queryset.filter(content_type=ContentType.objects.get_by_natural_key(*object_type.split('.')))
+            except (ContentType.DoesNotExist, TypeError):
+                raise ValidationError({'type': "Unknown object type: {}".format(object_type)})
+
+        return queryset
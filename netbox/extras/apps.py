@@ -0,0 +1,29 @@
+from django.apps import AppConfig, apps
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_save
+
+
+class ExtrasConfig(AppConfig):
+    name = "extras"
+    verbose_name = "Extras"
+
+    def ready(self):
+        from .changelog import CHANGELOG_APPS, record_delete, record_original, record_save
+        from .customfields import (
+            invalidate_custom_field_cache, record_custom_field_value_delete, record_custom_field_value_save,
+        )
+        from .models import CustomField, CustomFieldChoice, CustomFieldValue
+
+        # Keep the in-process custom field cache up to date
+        for model in (CustomField, CustomFieldChoice):
+            post_save.connect(invalidate_custom_field_cache, sender=model)
+            post_delete.connect(invalidate_custom_field_cache, sender=model)
+        m2m_changed.connect(invalidate_custom_field_cache, sender=CustomField.obj_type.through)
+
+        # Record changes to objects (and their custom field values) in the change log
+        for app_label in CHANGELOG_APPS:
+            for model in apps.get_app_config(app_label).get_models():
+                pre_save.connect(record_original, sender=model)
+                post_save.connect(record_save, sender=model)
+                post_delete.connect(record_delete, sender=model)
+        post_save.connect(record_custom_field_value_save, sender=CustomFieldValue)
+        post_delete.connect(record_custom_field_value_delete, sender=CustomFieldValue)
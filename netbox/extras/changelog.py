@@ -0,0 +1,162 @@
+from contextlib import contextmanager
+import json
+import threading
+
+from django.contrib.contenttypes.models import ContentType
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models.expressions import RawSQL
+
+from .models import OBJECTCHANGE_CREATE, OBJECTCHANGE_DELETE, OBJECTCHANGE_UPDATE, ObjectChange
+
+
+# Changes to the objects of these apps are recorded
+CHANGELOG_APPS = ('circuits', 'dcim', 'ipam', 'tenancy')
+
+_local = threading.local()
+
+
+def is_logged(model):
+    return model._meta.app_label in CHANGELOG_APPS
+
+
+def _get_fields(model, fields=None):
+    """
+    Return the concrete fields which are recorded for a model (or those among the given field names). Primary keys and
+    automatic timestamps are omitted, as they are recorded by the ObjectChange itself.
+    """
+    return [
+        f for f in model._meta.concrete_fields
+        if not f.primary_key and not getattr(f, 'auto_now', False) and not getattr(f, 'auto_now_add', False) and
+        (fields is None or f.name in fields or f.attname in fields)
+    ]
+
+
+def serialize_object(obj, fields=None):
+    """
+    Return the values of an object's fields (or only of the given fields) as a dictionary suitable for encoding as JSON.
+    Related objects are represented by their primary keys.
+    """
+    data = {}
+    for field in _get_fields(type(obj), fields):
+        value = field.value_from_object(obj)
+        if value is not None and not isinstance(value, (bool, int, long, float, basestring)):
+            value = field.value_to_string(obj)
+        data[field.attname] = value
+    return data
+
+
+def log_changes(model, action, changes):
+    """
+    Record changes to objects of the given model, given as a list of (primary key, data) tuples, with a single query.
+    Within batch_changes(), the changes are instead held until the end of the block.
+    """
+    if not is_logged(model) or not changes:
+        return
+    content_type = ContentType.objects.get_for_model(model)
+    object_changes = [
+        ObjectChange(
+            content_type=content_type, object_id=pk, action=action, txid=RawSQL('txid_current()', []),
+            data=json.dumps(data, cls=DjangoJSONEncoder, separators=(',', ':'), sort_keys=True) if data else ''
+        ) for pk, data in changes
+    ]
+    buffer = getattr(_local, 'buffer', None)
+    if buffer is not None:
+        buffer += object_changes
+    else:
+        ObjectChange.objects.bulk_create(object_changes)
+
+
+@contextmanager
+def batch_changes():
+    """
+    Hold all changes recorded within the block (including by the save and delete signal receivers) and write them with
+    a single query at its end. This should be used within the transaction which makes the changes; if the block raises
+    an exception, nothing is written. Blocks may be nested (e.g. along with a savepoint): if an inner block raises an
+    exception, the changes recorded within it are discarded.
+    """
+    buffer = getattr(_local, 'buffer', None)
+    if buffer is not None:
+        size = len(buffer)
+        try:
+            yield
+        except Exception:
+            del buffer[size:]
+            raise
+        return
+    _local.buffer = []
+    try:
+        yield
+        object_changes = _local.buffer
+    finally:
+        _local.buffer = None
+    ObjectChange.objects.bulk_create(object_changes)
+
+
+def log_create(objects):
+    """
+    Record the creation of objects saved without signals (e.g. by bulk_create()).
+    """
+    if objects:
+        log_changes(type(objects[0]), OBJECTCHANGE_CREATE, [(obj.pk, serialize_object(obj)) for obj in objects])
+
+
+def log_update(objects, fields):
+    """
+    Record the update of the given fields of objects saved without signals (e.g. by QuerySet.update()).
+    """
+    if objects:
+        log_changes(type(objects[0]), OBJECTCHANGE_UPDATE, [(obj.pk, serialize_object(obj, fields)) for obj in objects])
+
+
+def log_queryset_update(queryset, fields):
+    """
+    Record the update of the given fields of all objects in a QuerySet, following QuerySet.update(). The new values are
+    read back with a single query.
+    """
+    if is_logged(queryset.model) and fields:
+        log_update(list(queryset.only(*fields)), fields)
+
+
+def log_custom_field_values(model, values):
+    """
+    Record changes to custom field values, given as a list of (object primary key, {CustomField: serialized value})
+    tuples, as updates to the objects.
+    """
+    log_changes(model, OBJECTCHANGE_UPDATE, [
+        (pk, {'custom_fields': {cf.name: serialized_value or None for cf, serialized_value in cf_values.items()}})
+        for pk, cf_values in values
+    ])
+
+
+#
+# Signal receivers
+#
+
+def record_original(sender, instance, raw=False, update_fields=None, **kwargs):
+    """
+    Retrieve the stored values of an object which is about to be updated, so that only changed fields are recorded.
+    """
+    if raw or instance._state.adding or instance.pk is None:
+        return
+    fields = _get_fields(sender, update_fields)
+    instance._changelog_original = sender._base_manager.filter(pk=instance.pk)\
+        .values(*[f.attname for f in fields]).first()
+
+
+def record_save(sender, instance, created, raw=False, update_fields=None, **kwargs):
+    if raw:
+        return
+    original = instance.__dict__.pop('_changelog_original', None)
+    if created or original is None:
+        log_changes(sender, OBJECTCHANGE_CREATE if created else OBJECTCHANGE_UPDATE, [
+            (instance.pk, serialize_object(instance, update_fields))
+        ])
+        return
+    fields = _get_fields(sender, update_fields)
+    changed = [f.name for f in fields if f.value_from_object(instance) != original[f.attname]]
+    if changed:
+        log_changes(sender, OBJECTCHANGE_UPDATE, [(instance.pk, serialize_object(instance, changed))])
+
+
+def record_delete(sender, instance, **kwargs):
+    log_changes(sender, OBJECTCHANGE_DELETE, [(instance.pk, None)])
@@ -0,0 +1,176 @@
+from collections import defaultdict
+import threading
+import time
+
+from django.contrib.contenttypes.models import ContentType
+from django.core.cache import cache
+from django.db import transaction
+
+from .changelog import is_logged, log_custom_field_values
+from .models import CustomField, CustomFieldChoice, CustomFieldValue
+
+
+# The cache key under which the current version of the custom field definitions is stored. Any change to a CustomField
+# or CustomFieldChoice increments it, so that every process reloads its definitions on its next lookup.
+VERSION_CACHE_KEY = 'custom_fields_version'
+
+# The number of seconds after which definitions are reloaded regardless of their version. This bounds the staleness of
+# other processes' caches when the Django cache is not shared between processes (e.g. the default local memory cache).
+MAX_CACHE_AGE = 300
+
+
+class CustomFieldCache(object):
+    """
+    An in-process cache of all CustomFields and CustomFieldChoices. Definitions are loaded with three queries and
+    reloaded only when they change, so that looking up the custom fields applicable to a model, or deserializing a
+    selection value, does not touch the database.
+
+    Cached objects are shared between threads and must not be modified.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.version = None
+        self.loaded = None
+        self.fields = {}
+        self.fields_by_type = {}
+        self.choices = {}
+
+    def load(self, version):
+        fields = list(CustomField.objects.prefetch_related('obj_type', 'choices'))
+        fields_by_type = defaultdict(list)
+        choices = {}
+        for cf in fields:
+            for content_type in cf.obj_type.all():
+                fields_by_type[content_type.pk].append(cf)
+            for cfc in cf.choices.all():
+                choices[cfc.pk] = cfc
+
+        self.fields = {cf.pk: cf for cf in fields}
+        self.fields_by_type = dict(fields_by_type)
+        self.choices = choices
+        self.version = version
+        self.loaded = time.time()
+
+    def refresh(self):
+        """
+        Reload the definitions if they have changed or have reached MAX_CACHE_AGE.
+        """
+        version = cache.get(VERSION_CACHE_KEY)
+        if self.loaded is None or self.version != version or time.time() - self.loaded > MAX_CACHE_AGE:
+            with self.lock:
+                if self.loaded is None or self.version != version or time.time() - self.loaded > MAX_CACHE_AGE:
+                    self.load(version)
+
+    def invalidate(self):
+        """
+        Discard the definitions cached by this process, and increment the shared version so that all other processes
+        discard theirs.
+        """
+        self.loaded = None
+        try:
+            cache.incr(VERSION_CACHE_KEY)
+        except ValueError:
+            cache.set(VERSION_CACHE_KEY, 1, None)
+
+    def get_fields(self, content_type, filterable_only=False):
+        """
+        Return a list of the CustomFields applicable to the given ContentType, ordered by weight and name.
+        """
+        self.refresh()
+        fields = self.fields_by_type.get(content_type.pk, [])
+        if filterable_only:
+            return [cf for cf in fields if cf.is_filterable]
+        return fields
+
+    def get_field(self, pk):
+        """
+        Return the CustomField with the given primary key, or None if it does not exist.
+        """
+        self.refresh()
+        return self.fields.get(pk)
+
+    def get_choice(self, pk):
+        """
+        Return the CustomFieldChoice with the given primary key, or None if it does not exist.
+        """
+        self.refresh()
+        return self.choices.get(pk)
+
+
+# A single cache is shared by all requests in a process
+custom_field_cache = CustomFieldCache()
+
+
+def invalidate_custom_field_cache(sender, **kwargs):
+    """
+    Signal receiver for changes to CustomFields, their object types, and CustomFieldChoices. The cache is invalidated
+    immediately (so that the change is visible within the current transaction) and again once the transaction commits
+    (so that no other process can have reloaded the previous definitions in the meantime).
+    """
+    custom_field_cache.invalidate()
+    transaction.on_commit(custom_field_cache.invalidate)
+
+
+def get_custom_field_sources(queryset):
+    """
+    Return the sources (for utilities.conditional.get_validators) which determine the custom fields of the objects in a
+    QuerySet: all custom field definitions, and the objects' custom field values.
+    """
+    return [
+        CustomField,
+        CustomField.obj_type.through,
+        CustomFieldChoice,
+        CustomFieldValue.objects.filter(
+            obj_type=ContentType.objects.get_for_model(queryset.model), obj_id__in=queryset.values('pk')
+        ),
+    ]
+
+
+def save_custom_field_values(objects_values):
+    """
+    Save the custom field values of many objects of the same model, given as a list of (object, {CustomField: value})
+    tuples. The existing values of the given fields are deleted, and all non-empty values inserted, with one query each
+    per distinct set of fields.
+    """
+    groups = defaultdict(list)
+    for obj, values in objects_values:
+        if values:
+            groups[frozenset(values)].append((obj, values))
+
+    for fields, group in groups.items():
+        obj_type = ContentType.objects.get_for_model(group[0][0])
+        CustomFieldValue.objects.filter(
+            obj_type=obj_type, obj_id__in=[obj.pk for obj, values in group], field__in=list(fields)
+        ).delete()
+        new_values = []
+        for obj, values in group:
+            for cf, value in values.items():
+                serialized_value = cf.serialize_value(value)
+                if serialized_value != '':
+                    new_values.append(
+                        CustomFieldValue(field=cf, obj_type=obj_type, obj_id=obj.pk, serialized_value=serialized_value)
+                    )
+        CustomFieldValue.objects.bulk_create(new_values)
+        log_custom_field_values(type(group[0][0]), [
+            (obj.pk, {cf: cf.serialize_value(value) for cf, value in values.items()}) for obj, values in group
+        ])
+
+
+def _record_custom_field_value(instance, serialized_value):
+    model = ContentType.objects.get_for_id(instance.obj_type_id).model_class()
+    if model is not None and is_logged(model):
+        cf = custom_field_cache.get_field(instance.field_id) or instance.field
+        log_custom_field_values(model, [(instance.obj_id, {cf: serialized_value})])
+
+
+def record_custom_field_value_save(sender, instance, raw=False, **kwargs):
+    """
+    Signal receiver which records a change to a custom field value (see extras.changelog) as an update to its object.
+    """
+    if not raw:
+        _record_custom_field_value(instance, instance.serialized_value)
+
+
+def record_custom_field_value_delete(sender, instance, **kwargs):
+    _record_custom_field_value(instance, '')
@@ -2,7 +2,8 @@ import django_filters
 
 from django.contrib.contenttypes.models import ContentType
 
-from .models import CF_TYPE_SELECT, CustomField
+from .customfields import custom_field_cache
+from .models import CF_TYPE_SELECT
 
 
 class CustomFieldFilter(django_filters.Filter):
@@ -41,6 +42,6 @@ class CustomFieldFilterSet(django_filters.FilterSet):
         super(CustomFieldFilterSet, self).__init__(*args, **kwargs)
 
         obj_type = ContentType.objects.get_for_model(self._meta.model)
-        custom_fields = CustomField.objects.filter(obj_type=obj_type, is_filterable=True)
+        custom_fields = custom_field_cache.get_fields(obj_type, filterable_only=True)
         for cf in custom_fields:
             self.filters['cf_{}'.format(cf.name)] = CustomFieldFilter(name=cf.name, cf_type=cf.type)
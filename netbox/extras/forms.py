@@ -4,9 +4,8 @@ from django import forms
 from django.contrib.contenttypes.models import ContentType
 
 from utilities.forms import BulkEditForm, LaxURLField
-from .models import (
-    CF_TYPE_BOOLEAN, CF_TYPE_DATE, CF_TYPE_INTEGER, CF_TYPE_SELECT, CF_TYPE_URL, CustomField, CustomFieldValue
-)
+from .customfields import custom_field_cache
+from .models import CF_TYPE_BOOLEAN, CF_TYPE_DATE, CF_TYPE_INTEGER, CF_TYPE_SELECT, CF_TYPE_URL, CustomFieldValue
 
 
 def get_custom_fields_for_model(content_type, filterable_only=False, bulk_edit=False):
@@ -14,10 +13,7 @@ def get_custom_fields_for_model(content_type, filterable_only=False, bulk_edit=F
     Retrieve all CustomFields applicable to the given ContentType
     """
     field_dict = OrderedDict()
-    kwargs = {'obj_type': content_type}
-    if filterable_only:
-        kwargs['is_filterable'] = True
-    custom_fields = CustomField.objects.filter(**kwargs)
+    custom_fields = custom_field_cache.get_fields(content_type, filterable_only=filterable_only)
 
     for cf in custom_fields:
         field_name = 'cf_{}'.format(str(cf.name))
@@ -89,10 +85,11 @@ class CustomFieldForm(forms.ModelForm):
 
         # If editing an existing object, initialize values for all custom fields
         if self.instance.pk:
-            existing_values = CustomFieldValue.objects.filter(obj_type=self.obj_type, obj_id=self.instance.pk)\
-                .select_related('field')
+            existing_values = CustomFieldValue.objects.filter(obj_type=self.obj_type, obj_id=self.instance.pk)
+            custom_fields = {cf.pk: cf for cf in custom_field_cache.get_fields(self.obj_type)}
             for cfv in existing_values:
-                self.initial['cf_{}'.format(str(cfv.field.name))] = cfv.serialized_value
+                if cfv.field_id in custom_fields:
+                    self.initial['cf_{}'.format(str(custom_fields[cfv.field_id].name))] = cfv.serialized_value
 
     def _save_custom_fields(self):
 
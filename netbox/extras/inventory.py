@@ -0,0 +1,259 @@
+from collections import defaultdict, deque
+from Queue import Empty, Queue
+import threading
+import time
+
+from django.db import connection, transaction
+
+from dcim.models import Device, Module
+
+from .changelog import batch_changes, log_create, log_update
+
+
+DEFAULT_WORKERS = 32
+DEFAULT_DEVICE_TIMEOUT = 120  # seconds
+DEFAULT_BATCH_SIZE = 100  # devices per transaction
+
+
+class InventoryTimeout(Exception):
+    pass
+
+
+class InventoryResult(object):
+    """
+    The outcome of collecting inventory from a single device. Exactly one of inventory and error is set.
+    """
+
+    def __init__(self, device, inventory=None, error=None, duration=None):
+        self.device = device
+        self.inventory = inventory
+        self.error = error
+        self.duration = duration
+
+
+class InventoryCollector(object):
+    """
+    Collect inventory from many devices concurrently using a fixed pool of worker threads. Each device must complete
+    within `timeout` seconds; a device which overruns its deadline is reported as failed, and its RPC session is closed
+    so that the blocked call returns and the worker can move on to the next device.
+
+    Devices are expected to have their platform and primary IPs prefetched, so that workers make no database queries.
+    """
+
+    def __init__(self, username, password, workers=DEFAULT_WORKERS, timeout=DEFAULT_DEVICE_TIMEOUT):
+        self.username = username
+        self.password = password
+        self.workers = workers
+        self.timeout = timeout
+        self.lock = threading.Lock()
+        self.clients = {}  # device PK -> RPC client in use
+
+    def get_client(self, device):
+        return device.get_rpc_client()
+
+    def _collect(self, device, results):
+        start = time.time()
+        try:
+            RPC = self.get_client(device)
+            rpc_client = RPC(device, self.username, self.password)
+            with self.lock:
+                self.clients[device.pk] = rpc_client
+            with rpc_client:
+                inventory = rpc_client.get_inventory()
+            results.put(InventoryResult(device, inventory=inventory, duration=time.time() - start))
+        except Exception as e:
+            results.put(InventoryResult(device, error=e, duration=time.time() - start))
+        finally:
+            with self.lock:
+                self.clients.pop(device.pk, None)
+
+    def _work(self, tasks, results):
+        while True:
+            device = tasks.get()
+            if device is None:
+                return
+            self._collect(device, results)
+
+    def _abort(self, device):
+        # Close the session of a device which has overrun its deadline, interrupting the call in progress
+        with self.lock:
+            rpc_client = self.clients.get(device.pk)
+        if rpc_client is not None:
+            try:
+                rpc_client.abort()
+            except Exception:
+                pass
+
+    def collect(self, devices):
+        """
+        Yield an InventoryResult for each device as it completes (in order of completion).
+        """
+        pending = deque(devices)
+        active = {}  # device PK -> (device, deadline)
+        busy = 0  # workers which have not yet reported a result for their current device
+        tasks = Queue()
+        results = Queue()
+
+        workers = []
+        for i in range(min(self.workers, len(pending))):
+            worker = threading.Thread(target=self._work, args=(tasks, results), name='inventory-{}'.format(i))
+            worker.daemon = True
+            worker.start()
+            workers.append(worker)
+
+        try:
+            while pending or active:
+
+                # Hand out devices until every worker is busy
+                while pending and busy < len(workers):
+                    device = pending.popleft()
+                    active[device.pk] = (device, time.time() + self.timeout)
+                    busy += 1
+                    tasks.put(device)
+
+                # Wait for the next result or the earliest deadline. If every worker is still finishing a device which
+                # has already been reported as timed out, wait up to one more timeout for one of them to return.
+                if active:
+                    wait = max(min(deadline for device, deadline in active.values()) - time.time(), 0)
+                else:
+                    wait = self.timeout
+                try:
+                    result = results.get(timeout=wait)
+                    busy -= 1
+                    if active.pop(result.device.pk, None) is not None:
+                        yield result
+                except Empty:
+                    if not active:
+                        for device in pending:
+                            yield InventoryResult(device, error=InventoryTimeout("No worker became available"))
+                        return
+
+                # Expire any devices which have overrun their deadlines
+                now = time.time()
+                for pk, (device, deadline) in active.items():
+                    if deadline <= now:
+                        del active[pk]
+                        self._abort(device)
+                        yield InventoryResult(
+                            device, error=InventoryTimeout("No response within {} seconds".format(self.timeout)),
+                            duration=self.timeout
+                        )
+
+        finally:
+            # Stop the workers once they have finished their current devices
+            for worker in workers:
+                tasks.put(None)
+
+
+class ModuleReconciler(object):
+    """
+    Compute the changes needed to bring a set of devices' discovered Modules in line with freshly collected inventory.
+    Collected modules are matched to existing modules under the same parent, first by name, part ID and serial (no
+    change needed), then by name (updated in place), then by serial (renamed). Unmatched existing modules are deleted and
+    unmatched collected modules (along with their submodules) are inserted.
+    """
+
+    def __init__(self, existing):
+        # Index existing modules by (device PK, parent PK)
+        self.children = defaultdict(list)
+        for module in existing:
+            self.children[(module.device_id, module.parent_id)].append(module)
+        self.inserts = []  # (Module, submodules)
+        self.updates = []
+        self.deletes = []
+
+    def reconcile(self, device, modules, parent=None):
+        parent_pk = parent.pk if parent else None
+        unmatched = list(self.children.get((device.pk, parent_pk), []))
+
+        def pop_match(test):
+            for module in unmatched:
+                if test(module):
+                    unmatched.remove(module)
+                    return module
+
+        for m in modules:
+            match = (
+                pop_match(lambda e: (e.name, e.part_id, e.serial) == (m['name'], m['part_id'], m['serial'])) or
+                pop_match(lambda e: e.name == m['name']) or
+                (pop_match(lambda e: e.serial == m['serial']) if m['serial'] else None)
+            )
+            if match is None:
+                module = Module(device=device, parent=parent, name=m['name'], part_id=m['part_id'],
+                                serial=m['serial'], discovered=True)
+                self.inserts.append((module, m.get('modules', [])))
+                continue
+            if (match.name, match.part_id, match.serial) != (m['name'], m['part_id'], m['serial']):
+                match.name, match.part_id, match.serial = m['name'], m['part_id'], m['serial']
+                self.updates.append(match)
+            self.reconcile(device, m.get('modules', []), parent=match)
+
+        self.deletes += unmatched
+
+
+def _bulk_update_modules(modules):
+    """
+    Update the name, part ID and serial of many Modules with a single query.
+    """
+    if not modules:
+        return
+    values = ', '.join(['(%s, %s, %s, %s)'] * len(modules))
+    params = []
+    for m in modules:
+        params += [m.pk, m.name, m.part_id, m.serial]
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "UPDATE {table} AS m SET name = v.name, part_id = v.part_id, serial = v.serial "
+            "FROM (VALUES {values}) AS v(id, name, part_id, serial) WHERE m.id = v.id".format(
+                table=Module._meta.db_table, values=values
+            ), params
+        )
+
+
+def apply_inventory(results):
+    """
+    Save the inventory of a batch of InventoryResults in a single transaction. Serial numbers are updated only where
+    they have changed. Discovered modules are reconciled against the existing rows, so that only modules which have
+    changed are written: one delete, one update and one bulk insert per level of nesting, and one insert into the change
+    log. Returns a tuple of the number of modules inserted, updated and deleted.
+    """
+    results = [r for r in results if r.inventory is not None]
+    if not results:
+        return 0, 0, 0
+
+    with transaction.atomic(), batch_changes():
+
+        # Update device serials
+        for r in results:
+            serial = r.inventory['chassis']['serial']
+            if r.device.serial != serial:
+                Device.objects.filter(pk=r.device.pk).update(serial=serial)
+                r.device.serial = serial
+                log_update([r.device], ['serial'])
+
+        # Compute changes to discovered modules
+        reconciler = ModuleReconciler(
+            Module.objects.filter(device__in=[r.device.pk for r in results], discovered=True).order_by('pk')
+        )
+        for r in results:
+            reconciler.reconcile(r.device, r.inventory.get('modules', []))
+
+        # Apply changes
+        if reconciler.deletes:
+            Module.objects.filter(pk__in=[m.pk for m in reconciler.deletes]).delete()
+        _bulk_update_modules(reconciler.updates)
+        log_update(reconciler.updates, ['name', 'part_id', 'serial'])
+        level = reconciler.inserts
+        inserted = 0
+        while level:
+            log_create(Module.objects.bulk_create([module for module, children in level]))
+            inserted += len(level)
+            next_level = []
+            for parent, children in level:
+                for m in children:
+                    module = Module(device=parent.device, parent=parent, name=m['name'], part_id=m['part_id'],
+                                    serial=m['serial'], discovered=True)
+                    next_level.append((module, m.get('modules', [])))
+            level = next_level
+
+    return inserted, len(reconciler.updates), len(reconciler.deletes)
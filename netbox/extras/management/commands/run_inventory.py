@@ -1,12 +1,16 @@
 from getpass import getpass
 from ncclient.transport.errors import AuthenticationError
 from paramiko import AuthenticationException
+import time
 
 from django.conf import settings
 from django.core.management.base import BaseCommand, CommandError
-from django.db import transaction
 
-from dcim.models import Device, Module, Site
+from dcim.models import Device, Site
+from extras.inventory import (
+    apply_inventory, DEFAULT_BATCH_SIZE, DEFAULT_DEVICE_TIMEOUT, DEFAULT_WORKERS, InventoryCollector,
+)
+from extras.rpc import session_pool
 
 
 class Command(BaseCommand):
@@ -22,16 +26,16 @@ class Command(BaseCommand):
         parser.add_argument('-n', '--name', dest='name', help="Filter devices by name (regular expression)")
         parser.add_argument('--full', action='store_true', default=False, help="For inventory update for all devices")
         parser.add_argument('--fake', action='store_true', default=False, help="Do not actually update database")
+        parser.add_argument('-w', '--workers', dest='workers', type=int, default=DEFAULT_WORKERS,
+                            help="Number of devices to inventory concurrently (default: {})".format(DEFAULT_WORKERS))
+        parser.add_argument('-t', '--timeout', dest='timeout', type=int, default=DEFAULT_DEVICE_TIMEOUT,
+                            help="Maximum number of seconds to spend on each device (default: {})".format(
+                                DEFAULT_DEVICE_TIMEOUT))
+        parser.add_argument('--batch-size', dest='batch_size', type=int, default=DEFAULT_BATCH_SIZE,
+                            help="Number of devices to save per transaction (default: {})".format(DEFAULT_BATCH_SIZE))
 
     def handle(self, *args, **options):
 
-        def create_modules(modules, parent=None):
-            for module in modules:
-                m = Module(device=device, parent=parent, name=module['name'], part_id=module['part_id'],
-                           serial=module['serial'], discovered=True)
-                m.save()
-                create_modules(module.get('modules', []), parent=m)
-
         # Credentials
         if options['username']:
             self.username = options['username']
@@ -39,7 +43,7 @@ class Command(BaseCommand):
             self.password = getpass("Password: ")
 
         # Attempt to inventory only active devices
-        device_list = Device.objects.filter(status=True)
+        device_list = Device.objects.filter(status=True).select_related('platform', 'primary_ip4', 'primary_ip6')
 
         # --site: Include only devices belonging to specified site(s)
         if options['site']:
@@ -63,46 +67,56 @@ class Command(BaseCommand):
         if options['fake']:
             self.stdout.write("WARNING: Inventory data will not be saved! (--fake)")
 
+        # Determine which devices to inventory
         device_count = device_list.count()
         self.stdout.write("** Found {} devices...".format(device_count))
-
-        for i, device in enumerate(device_list, start=1):
-
-            self.stdout.write("[{}/{}] {}: ".format(i, device_count, device.name), ending='')
-
-            # Skip inactive devices
-            if not device.status:
-                self.stdout.write("Skipped (inactive)")
-                continue
+        devices = []
+        for device in device_list:
 
             # Skip devices without primary_ip set
             if not device.primary_ip:
-                self.stdout.write("Skipped (no primary IP set)")
+                self.stdout.write("{}: Skipped (no primary IP set)".format(device.name))
                 continue
 
             # Skip devices which have already been inventoried if not doing a full update
             if device.serial and not options['full']:
-                self.stdout.write("Skipped (Serial: {})".format(device.serial))
+                self.stdout.write("{}: Skipped (Serial: {})".format(device.name, device.serial))
                 continue
 
-            RPC = device.get_rpc_client()
-            if not RPC:
-                self.stdout.write("Skipped (no RPC client available for platform {})".format(device.platform))
+            if not device.get_rpc_client():
+                self.stdout.write("{}: Skipped (no RPC client available for platform {})".format(
+                    device.name, device.platform
+                ))
                 continue
 
-            # Connect to device and retrieve inventory info
-            try:
-                with RPC(device, self.username, self.password) as rpc_client:
-                    inventory = rpc_client.get_inventory()
-            except KeyboardInterrupt:
-                raise
-            except (AuthenticationError, AuthenticationException):
+            devices.append(device)
+
+        # Connect to devices concurrently and retrieve inventory info
+        self.stdout.write("** Collecting inventory from {} devices using {} workers...".format(
+            len(devices), options['workers']
+        ))
+        collector = InventoryCollector(self.username, self.password, workers=options['workers'],
+                                       timeout=options['timeout'])
+        start = time.time()
+        batch = []
+        failed = 0
+        changes = [0, 0, 0]
+        for i, result in enumerate(collector.collect(devices), start=1):
+
+            device = result.device
+            self.stdout.write("[{}/{} {:.0f}s] {}: ".format(i, len(devices), time.time() - start, device.name),
+                              ending='')
+
+            if isinstance(result.error, (AuthenticationError, AuthenticationException)):
                 self.stdout.write("Authentication error!")
+                failed += 1
                 continue
-            except Exception as e:
-                self.stdout.write("Error: {}".format(e))
+            elif result.error is not None:
+                self.stdout.write("Error: {}".format(result.error))
+                failed += 1
                 continue
 
+            inventory = result.inventory
             if options['verbosity'] > 1:
                 self.stdout.write("")
                 self.stdout.write("\tSerial: {}".format(inventory['chassis']['serial']))
@@ -113,13 +127,16 @@ class Command(BaseCommand):
             else:
                 self.stdout.write("{} ({})".format(inventory['chassis']['description'], inventory['chassis']['serial']))
 
+            # Save results in batches
             if not options['fake']:
-                with transaction.atomic():
-                    # Update device serial
-                    if device.serial != inventory['chassis']['serial']:
-                        device.serial = inventory['chassis']['serial']
-                        device.save()
-                    Module.objects.filter(device=device, discovered=True).delete()
-                    create_modules(inventory.get('modules', []))
-
-        self.stdout.write("Finished!")
+                batch.append(result)
+                if len(batch) >= options['batch_size']:
+                    changes = [a + b for a, b in zip(changes, apply_inventory(batch))]
+                    batch = []
+
+        if batch:
+            changes = [a + b for a, b in zip(changes, apply_inventory(batch))]
+        session_pool.clear()
+
+        self.stdout.write("Modules: {} added, {} updated, {} removed".format(*changes))
+        self.stdout.write("Finished in {:.0f} seconds ({} failed).".format(time.time() - start, failed))
@@ -0,0 +1,35 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('contenttypes', '0002_remove_content_type_name'),
+        ('extras', '0004_topologymap_change_comma_to_semicolon'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ObjectChange',
+            fields=[
+                ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('time', models.DateTimeField(auto_now_add=True, db_index=True)),
+                ('txid', models.BigIntegerField(editable=False)),
+                ('object_id', models.PositiveIntegerField()),
+                ('action', models.PositiveSmallIntegerField(choices=[(1, b'create'), (2, b'update'), (3, b'delete')])),
+                ('data', models.TextField(blank=True)),
+                ('content_type', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='contenttypes.ContentType')),
+            ],
+            options={
+                'ordering': ['txid', 'id'],
+            },
+        ),
+        migrations.AlterIndexTogether(
+            name='objectchange',
+            index_together=set([('txid', 'id')]),
+        ),
+    ]
@@ -64,6 +64,15 @@ ACTION_CHOICES = (
     (ACTION_BULK_DELETE, 'bulk deleted')
 )
 
+OBJECTCHANGE_CREATE = 1
+OBJECTCHANGE_UPDATE = 2
+OBJECTCHANGE_DELETE = 3
+OBJECTCHANGE_ACTION_CHOICES = (
+    (OBJECTCHANGE_CREATE, 'create'),
+    (OBJECTCHANGE_UPDATE, 'update'),
+    (OBJECTCHANGE_DELETE, 'delete'),
+)
+
 
 class CustomFieldModel(object):
 
@@ -80,13 +89,15 @@ class CustomFieldModel(object):
         Return a dictionary of custom fields for a single object in the form {<field>: value}.
         """
 
+        from .customfields import custom_field_cache
+
         # Find all custom fields applicable to this type of object
         content_type = ContentType.objects.get_for_model(self)
-        fields = CustomField.objects.filter(obj_type=content_type)
+        fields = custom_field_cache.get_fields(content_type)
 
         # If the object exists, populate its custom fields with values
         if hasattr(self, 'pk'):
-            values = CustomFieldValue.objects.filter(obj_type=content_type, obj_id=self.pk).select_related('field')
+            values = CustomFieldValue.objects.filter(obj_type=content_type, obj_id=self.pk)
             values_dict = {cfv.field_id: cfv.value for cfv in values}
             return OrderedDict([(field, values_dict.get(field.pk)) for field in fields])
         else:
@@ -146,6 +157,11 @@ class CustomField(models.Model):
             # Read date as YYYY-MM-DD
             return date(*[int(n) for n in serialized_value.split('-')])
         if self.type == CF_TYPE_SELECT:
+            from .customfields import custom_field_cache
+            cfc = custom_field_cache.get_choice(int(serialized_value))
+            if cfc is not None and cfc.field_id == self.pk:
+                return cfc
+            # Fall back to the database in case the choice was created since the cache was loaded
             try:
                 return self.choices.get(pk=int(serialized_value))
             except CustomFieldChoice.DoesNotExist:
@@ -169,7 +185,9 @@ class CustomFieldValue(models.Model):
 
     @property
     def value(self):
-        return self.field.deserialize_value(self.serialized_value)
+        from .customfields import custom_field_cache
+        field = custom_field_cache.get_field(self.field_id) or self.field
+        return field.deserialize_value(self.serialized_value)
 
     @value.setter
     def value(self, value):
@@ -358,3 +376,40 @@ class UserAction(models.Model):
             return mark_safe('<i class="glyphicon glyphicon-remove text-danger"></i>')
         else:
             return ''
+
+
+class ObjectChangeQuerySet(models.QuerySet):
+
+    def committed(self):
+        """
+        Exclude changes written by any transaction which is still in progress, or which began after the oldest such
+        transaction. The changes returned therefore form a stable prefix of the change feed (ordered by txid): no
+        change can later appear before the last one returned.
+        """
+        return self.extra(where=[
+            '{}.txid < txid_snapshot_xmin(txid_current_snapshot())'.format(self.model._meta.db_table)
+        ])
+
+
+class ObjectChange(models.Model):
+    """
+    A record of the creation, update, or deletion of an object, for consumers which synchronize incrementally. Updates
+    record the new values of only the fields which changed. Changes are ordered by the ID of the transaction which
+    wrote them (txid), and then by ID.
+    """
+    id = models.BigAutoField(primary_key=True)
+    time = models.DateTimeField(auto_now_add=True, editable=False, db_index=True)
+    txid = models.BigIntegerField(editable=False)
+    content_type = models.ForeignKey(ContentType, on_delete=models.CASCADE)
+    object_id = models.PositiveIntegerField()
+    action = models.PositiveSmallIntegerField(choices=OBJECTCHANGE_ACTION_CHOICES)
+    data = models.TextField(blank=True)
+
+    objects = ObjectChangeQuerySet.as_manager()
+
+    class Meta:
+        ordering = ['txid', 'id']
+        index_together = [['txid', 'id']]
+
+    def __unicode__(self):
+        return u'{} {} {}'.format(self.get_action_display(), self.content_type, self.object_id)
@@ -1,23 +1,209 @@
+import codecs
+from collections import defaultdict
 from ncclient import manager
 import paramiko
 import re
+import socket
+import threading
 import xmltodict
 import time
 
 
 CONNECT_TIMEOUT = 5  # seconds
+COMMAND_TIMEOUT = 30  # seconds
+
+# Matches a typical CLI prompt (e.g. "router#", "router>", "user@host$") at the very end of the output
+PROMPT_REGEX = re.compile(r'([^\r\n]*[>#$%]) ?\Z')
+
+# The number of trailing characters of the output searched for the prompt after each read
+PROMPT_SEARCH_WINDOW = 256
+
+# The number of seconds without further output after which a prompt-like line is taken to be a prompt while learning it
+PROMPT_SETTLE_TIME = 0.25
+
+
+# Session pooling
+SESSION_IDLE_TIMEOUT = 300  # seconds
+SESSION_MAX_PER_HOST = 2
+SESSION_WAIT_TIMEOUT = 30  # seconds
+
+
+class RPCTimeout(Exception):
+    pass
+
+
+class SessionPool(object):
+    """
+    A pool of open RPC sessions, keyed by client class, host and credentials. Sessions are health-checked before reuse
+    and closed once they have been idle for idle_timeout seconds. No more than max_per_host sessions (idle or in use)
+    are held open to any one host; when the limit is reached, an idle session for that host is closed to make room,
+    or else the caller waits for a session to be released.
+    """
+
+    def __init__(self, idle_timeout=SESSION_IDLE_TIMEOUT, max_per_host=SESSION_MAX_PER_HOST,
+                 wait_timeout=SESSION_WAIT_TIMEOUT):
+        self.idle_timeout = idle_timeout
+        self.max_per_host = max_per_host
+        self.wait_timeout = wait_timeout
+        self.condition = threading.Condition()
+        self.idle = defaultdict(list)  # key -> [(client class, connection, time released)]
+        self.count = defaultdict(int)  # host -> number of open sessions
+
+    def _remove(self, client_class, host, connection, closing):
+        # Must be called while holding the lock. The connection is added to closing, to be disconnected by the caller
+        # once the lock has been released (disconnecting may wait on the network).
+        self.count[host] -= 1
+        closing.append((client_class, connection))
+        self.condition.notify()
+
+    @staticmethod
+    def _disconnect(closing):
+        for client_class, connection in closing:
+            try:
+                client_class.disconnect(connection)
+            except Exception:
+                pass
+
+    def _expire(self, closing):
+        now = time.time()
+        for key, sessions in self.idle.items():
+            for session in [s for s in sessions if now - s[2] > self.idle_timeout]:
+                sessions.remove(session)
+                self._remove(session[0], key[1], session[1], closing)
+
+    def _evict(self, host, closing):
+        for key, sessions in self.idle.items():
+            if key[1] == host and sessions:
+                client_class, connection, released = sessions.pop(0)
+                self._remove(client_class, host, connection, closing)
+                return True
+        return False
+
+    def acquire(self, client):
+        """
+        Return an open connection for the given client, reusing an idle session if a healthy one exists.
+        """
+        key = client.get_session_key()
+        deadline = time.time() + self.wait_timeout
+        closing = []
+        try:
+            with self.condition:
+                self._expire(closing)
+                while True:
+                    sessions = self.idle[key]
+                    while sessions:
+                        client_class, connection, released = sessions.pop()
+                        if client_class.is_alive(connection):
+                            return connection
+                        self._remove(client_class, client.host, connection, closing)
+                    if self.count[client.host] < self.max_per_host or self._evict(client.host, closing):
+                        self.count[client.host] += 1
+                        break
+                    remaining = deadline - time.time()
+                    if remaining <= 0:
+                        raise RPCTimeout("Timed out waiting for a session to {}".format(client.host))
+                    self.condition.wait(remaining)
+        finally:
+            self._disconnect(closing)
+
+        # Open a new session (outside of the lock)
+        try:
+            return client.connect()
+        except:
+            with self.condition:
+                self.count[client.host] -= 1
+                self.condition.notify()
+            raise
+
+    def release(self, client, connection, reuse=True):
+        """
+        Return a connection to the pool. If reuse is False, the connection is closed.
+        """
+        closing = []
+        with self.condition:
+            if reuse:
+                self.idle[client.get_session_key()].append((client.__class__, connection, time.time()))
+                self.condition.notify()
+            else:
+                self._remove(client.__class__, client.host, connection, closing)
+        self._disconnect(closing)
+
+    def clear(self):
+        """
+        Close all idle sessions.
+        """
+        closing = []
+        with self.condition:
+            for key, sessions in self.idle.items():
+                while sessions:
+                    client_class, connection, released = sessions.pop()
+                    self._remove(client_class, key[1], connection, closing)
+        self._disconnect(closing)
+
+
+# A single pool is shared by all clients in a process
+session_pool = SessionPool()
 
 
 class RPCClient(object):
+    """
+    Base class for RPC clients. Used as a context manager, a client borrows a session from the process-wide pool on
+    entry and returns it on exit. Sessions in which an exception was raised are closed rather than reused.
+
+    Subclasses implement connect() to open a new session, and disconnect() and is_alive() to close and check one.
+    """
 
     def __init__(self, device, username='', password=''):
         self.username = username
         self.password = password
+        self.connection = None
         try:
             self.host = str(device.primary_ip.address.ip)
         except AttributeError:
             raise Exception("Specified device ({}) does not have a primary IP defined.".format(device))
 
+    def __enter__(self):
+        self.connection = session_pool.acquire(self)
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        session_pool.release(self, self.connection, reuse=exc_type is None)
+        self.connection = None
+
+    def get_session_key(self):
+        return (self.__class__, self.host, self.username, self.password)
+
+    def connect(self):
+        """
+        Open and return a new connection to the device.
+        """
+        raise NotImplementedError
+
+    @staticmethod
+    def disconnect(connection):
+        raise NotImplementedError
+
+    @staticmethod
+    def is_alive(connection):
+        raise NotImplementedError
+
+    @classmethod
+    def close_transport(cls, connection):
+        """
+        Close a connection's transport immediately, without waiting for the device to respond. By default, this is
+        done by disconnect().
+        """
+        cls.disconnect(connection)
+
+    def abort(self):
+        """
+        Close the client's session from another thread (e.g. when it has overrun a deadline), so that any call in
+        progress fails. The session is then closed rather than returned to the pool.
+        """
+        connection = self.connection
+        if connection is not None:
+            self.close_transport(connection)
+
     def get_lldp_neighbors(self):
         """
         Returns a list of dictionaries, each representing an LLDP neighbor adjacency.
@@ -53,14 +239,42 @@ class RPCClient(object):
         raise NotImplementedError("Feature not implemented for this platform.")
 
 
+class SSHConnection(object):
+
+    def __init__(self, ssh):
+        self.ssh = ssh
+        self.channel = ssh.invoke_shell()
+        self.prompt = None
+        self.prompt_regex = None
+
+
 class SSHClient(RPCClient):
-    def __enter__(self):
+    """
+    Interactive SSH client. Each command's output is read until the device's CLI prompt reappears, rather than for a
+    fixed amount of time.
+    """
+    port = 22
+
+    @property
+    def ssh(self):
+        return self.connection.ssh
+
+    @property
+    def session(self):
+        return self.connection.channel
+
+    @property
+    def prompt(self):
+        return self.connection.prompt
 
-        self.ssh = paramiko.SSHClient()
-        self.ssh.set_missing_host_key_policy(paramiko.AutoAddPolicy())
+    def connect(self):
+
+        ssh = paramiko.SSHClient()
+        ssh.set_missing_host_key_policy(paramiko.AutoAddPolicy())
         try:
-            self.ssh.connect(
+            ssh.connect(
                 self.host,
+                port=self.port,
                 username=self.username,
                 password=self.password,
                 timeout=CONNECT_TIMEOUT,
@@ -72,8 +286,9 @@ class SSHClient(RPCClient):
             try:
                 default_creds = self.default_credentials
                 if default_creds.get('username') and default_creds.get('password'):
-                    self.ssh.connect(
+                    ssh.connect(
                         self.host,
+                        port=self.port,
                         username=default_creds['username'],
                         password=default_creds['password'],
                         timeout=CONNECT_TIMEOUT,
@@ -85,21 +300,92 @@ class SSHClient(RPCClient):
             except AttributeError:
                 raise paramiko.AuthenticationException
 
-        self.session = self.ssh.invoke_shell()
-        self.session.recv(1000)
-        return self
+        try:
+            self.connection = SSHConnection(ssh)
 
-    def __exit__(self, exc_type, exc_val, exc_tb):
-        self.ssh.close()
+            self.connection.prompt = self._learn_prompt()
+            self.connection.prompt_regex = re.compile(r'{}\s*\Z'.format(re.escape(self.connection.prompt)))
+        except:
+            ssh.close()
+            raise
 
-    def _send(self, cmd, pause=1):
+        return self.connection
+
+    def get_session_key(self):
+        return super(SSHClient, self).get_session_key() + (self.port,)
+
+    @staticmethod
+    def disconnect(connection):
+        connection.ssh.close()
+
+    @staticmethod
+    def is_alive(connection):
+        transport = connection.ssh.get_transport()
+        return transport is not None and transport.is_active() and not connection.channel.closed
+
+    def _learn_prompt(self):
+        """
+        Consume the login banner and return the device's prompt. A banner line may itself look like a prompt (e.g. a
+        row of #), so empty lines are sent until two consecutive responses end with the same line.
+        """
+        deadline = time.time() + CONNECT_TIMEOUT
+        prompt = self._read_prompt(deadline)
+        while True:
+            self.session.send('\n')
+            candidate = self._read_prompt(deadline)
+            if candidate == prompt:
+                return prompt
+            prompt = candidate
+
+    def _read_prompt(self, deadline):
+        """
+        Read until the output ends with a prompt-like line and no more output arrives within PROMPT_SETTLE_TIME, and
+        return that line.
+        """
+        while True:
+            data = self._read_until(PROMPT_REGEX, deadline - time.time())
+            time.sleep(PROMPT_SETTLE_TIME)
+            if not self.session.recv_ready():
+                return PROMPT_REGEX.search(data).group(1)
+
+    def _read_until(self, regex, timeout):
+        """
+        Read from the session until the end of the output matches the given regex, or raise RPCTimeout if that doesn't
+        happen within timeout seconds. Output is decoded incrementally, so multi-byte characters split across reads
+        are handled.
+        """
+        decoder = codecs.getincrementaldecoder('utf-8')(errors='replace')
+        data = u''
+        deadline = time.time() + timeout
+
+        while True:
+            remaining = deadline - time.time()
+            if remaining <= 0:
+                raise RPCTimeout("Timed out waiting for prompt from {}".format(self.host))
+            self.session.settimeout(remaining)
+            try:
+                chunk = self.session.recv(4096)
+            except socket.timeout:
+                raise RPCTimeout("Timed out waiting for prompt from {}".format(self.host))
+            if not chunk:
+                raise EOFError("Session to {} closed unexpectedly".format(self.host))
+            data += decoder.decode(chunk)
+            if regex.search(data, max(len(data) - PROMPT_SEARCH_WINDOW, 0)):
+                return data
+
+    def _send(self, cmd, timeout=COMMAND_TIMEOUT):
+        """
+        Send a command and return its output, excluding the echoed command and the trailing prompt.
+        """
+        prompt_regex = self.connection.prompt_regex
         self.session.send('{}\n'.format(cmd))
-        data = ''
-        time.sleep(pause)
-        while self.session.recv_ready():
-            data += self.session.recv(4096).decode()
-            if not data:
-                break
+        data = self._read_until(prompt_regex, timeout)
+
+        # Strip the echoed command and trailing prompt
+        data = prompt_regex.sub('', data)
+        if data.lstrip().startswith(cmd):
+            data = data.lstrip()[len(cmd):].lstrip('\r\n')
+
         return data
 
 
@@ -108,18 +394,26 @@ class JunosNC(RPCClient):
     NETCONF client for Juniper Junos devices
     """
 
-    def __enter__(self):
+    @property
+    def manager(self):
+        return self.connection
 
-        # Initiate a connection to the device
-        self.manager = manager.connect(host=self.host, username=self.username, password=self.password,
-                                       hostkey_verify=False, timeout=CONNECT_TIMEOUT)
+    def connect(self):
+        return manager.connect(host=self.host, username=self.username, password=self.password,
+                               hostkey_verify=False, timeout=CONNECT_TIMEOUT)
 
-        return self
+    @staticmethod
+    def disconnect(connection):
+        connection.close_session()
 
-    def __exit__(self, exc_type, exc_val, exc_tb):
+    @staticmethod
+    def is_alive(connection):
+        return connection.connected
 
-        # Close the connection to the device
-        self.manager.close_session()
+    @classmethod
+    def close_transport(cls, connection):
+        # close_session() waits for the device to reply; close the SSH transport instead
+        connection.session.close()
 
     def get_lldp_neighbors(self):
 
@@ -0,0 +1,105 @@
+import json
+from rest_framework import status
+from rest_framework.test import APITransactionTestCase
+
+from django.conf import settings
+from django.contrib.contenttypes.models import ContentType
+from django.db import IntegrityError, transaction
+from django.test import TestCase
+
+from dcim.models import Site
+
+from extras.changelog import batch_changes, log_queryset_update
+from extras.models import (
+    CF_TYPE_TEXT, CustomField, CustomFieldValue, ObjectChange, OBJECTCHANGE_CREATE, OBJECTCHANGE_DELETE,
+    OBJECTCHANGE_UPDATE,
+)
+
+
+class ChangeLogTestCase(TestCase):
+
+    def get_changes(self, obj):
+        return [
+            (c.action, json.loads(c.data) if c.data else None) for c in
+            ObjectChange.objects.filter(content_type=ContentType.objects.get_for_model(obj), object_id=obj.pk)
+        ]
+
+    def test_save_and_delete(self):
+
+        site = Site.objects.create(name='Test Site 1', slug='test-site-1')
+        site.facility = 'DC1'
+        site.save()
+        site.save()  # Unchanged, so not recorded
+        pk = site.pk
+        site.delete()
+        site.pk = pk
+
+        changes = self.get_changes(site)
+        self.assertEqual([action for action, data in changes], [OBJECTCHANGE_CREATE, OBJECTCHANGE_UPDATE,
+                                                                OBJECTCHANGE_DELETE])
+        self.assertEqual(changes[0][1]['name'], 'Test Site 1')
+        self.assertEqual(changes[1][1], {'facility': 'DC1'})
+        self.assertIsNone(changes[2][1])
+
+    def test_bulk_update_and_custom_fields(self):
+
+        site = Site.objects.create(name='Test Site 1', slug='test-site-1')
+        cf = CustomField.objects.create(type=CF_TYPE_TEXT, name='my_field')
+        cf.obj_type = [ContentType.objects.get_for_model(Site)]
+        cf.save()
+
+        with batch_changes():
+            Site.objects.filter(pk=site.pk).update(asn=65000)
+            log_queryset_update(Site.objects.filter(pk=site.pk), ['asn'])
+            CustomFieldValue.objects.create(field=cf, obj=site, serialized_value='Foo')
+            self.assertEqual(len(self.get_changes(site)), 1)
+
+        self.assertEqual(self.get_changes(site)[1:], [
+            (OBJECTCHANGE_UPDATE, {'asn': 65000}),
+            (OBJECTCHANGE_UPDATE, {'custom_fields': {'my_field': 'Foo'}}),
+        ])
+
+    def test_nested_batch_rollback(self):
+
+        site = Site.objects.create(name='Test Site 1', slug='test-site-1')
+
+        with transaction.atomic(), batch_changes():
+            Site.objects.filter(pk=site.pk).update(asn=65000)
+            log_queryset_update(Site.objects.filter(pk=site.pk), ['asn'])
+            try:
+                with transaction.atomic(), batch_changes():
+                    Site.objects.filter(pk=site.pk).update(facility='DC1')
+                    log_queryset_update(Site.objects.filter(pk=site.pk), ['facility'])
+                    raise IntegrityError
+            except IntegrityError:
+                pass
+
+        # Changes recorded within the inner block were rolled back along with its savepoint
+        self.assertEqual(self.get_changes(site)[1:], [(OBJECTCHANGE_UPDATE, {'asn': 65000})])
+
+
+class ChangeFeedTest(APITransactionTestCase):
+
+    def test_since(self, endpoint='/{}api/changes/'.format(settings.BASE_PATH)):
+
+        site = Site.objects.create(name='Test Site 1', slug='test-site-1')
+        response = self.client.get(endpoint, {'type': 'dcim.site'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([c['action'] for c in response.data['results']], ['create'])
+        last_id = response.data['results'][-1]['id']
+
+        site.facility = 'DC1'
+        site.save()
+        site.delete()
+
+        response = self.client.get(endpoint, {'since': last_id, 'limit': 1})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        results = response.data['results']
+        self.assertEqual([(c['action'], c['data']) for c in results], [('update', {'facility': 'DC1'})])
+        response = self.client.get(response.data['next'])
+        results = response.data['results']
+        self.assertEqual([(c['action'], c['data']) for c in results], [('delete', None)])
+
+    def test_since_invalid(self, endpoint='/{}api/changes/'.format(settings.BASE_PATH)):
+        response = self.client.get(endpoint, {'since': 'yesterday'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
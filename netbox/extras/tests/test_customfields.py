@@ -5,6 +5,7 @@ from django.test import TestCase
 
 from dcim.models import Site
 
+from extras.customfields import custom_field_cache
 from extras.models import (
     CustomField, CustomFieldValue, CustomFieldChoice, CF_TYPE_TEXT, CF_TYPE_INTEGER, CF_TYPE_BOOLEAN, CF_TYPE_DATE,
     CF_TYPE_SELECT, CF_TYPE_URL,
@@ -95,3 +96,32 @@ class CustomFieldTestCase(TestCase):
 
         # Delete the custom field
         cf.delete()
+
+
+class CustomFieldCacheTestCase(TestCase):
+
+    def setUp(self):
+
+        self.obj_type = ContentType.objects.get_for_model(Site)
+        self.cf = CustomField.objects.create(type=CF_TYPE_SELECT, name='my_field', required=False)
+        self.cf.obj_type = [self.obj_type]
+        self.cfc = CustomFieldChoice.objects.create(field=self.cf, value='Option A')
+
+    def test_cached_lookups(self):
+
+        custom_field_cache.get_fields(self.obj_type)
+
+        with self.assertNumQueries(0):
+            self.assertEqual([cf.name for cf in custom_field_cache.get_fields(self.obj_type)], ['my_field'])
+            self.assertEqual(self.cf.deserialize_value(str(self.cfc.pk)).value, 'Option A')
+
+    def test_invalidation(self):
+
+        custom_field_cache.get_fields(self.obj_type)
+
+        cf = CustomField.objects.create(type=CF_TYPE_TEXT, name='other_field', required=False)
+        cf.obj_type = [self.obj_type]
+        self.assertEqual([cf.name for cf in custom_field_cache.get_fields(self.obj_type)], ['my_field', 'other_field'])
+
+        self.cf.delete()
+        self.assertEqual([cf.name for cf in custom_field_cache.get_fields(self.obj_type)], ['other_field'])
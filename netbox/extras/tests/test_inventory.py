@@ -0,0 +1,220 @@
+import paramiko
+import threading
+import time
+
+from django.test import SimpleTestCase, TestCase
+
+from dcim.models import Device, DeviceRole, DeviceType, Manufacturer, Module, Rack, Site
+from extras.inventory import apply_inventory, InventoryCollector, InventoryResult, InventoryTimeout
+from extras.rpc import IOSSSH, session_pool
+from extras.tests.test_rpc import FakeDevice as FakeSSHDevice, RESPONSES
+
+
+INVENTORY = {
+    'chassis': {
+        'serial': 'ABC123',
+        'description': 'Fake chassis',
+    },
+    'modules': [
+        {
+            'name': 'FPC 0',
+            'part_id': 'FPC-1',
+            'serial': 'F0',
+            'modules': [
+                {'name': 'PIC 0', 'part_id': 'PIC-1', 'serial': 'P0'},
+                {'name': 'PIC 1', 'part_id': 'PIC-1', 'serial': 'P1'},
+            ],
+        },
+        {'name': 'PEM 0', 'part_id': 'PEM-1', 'serial': 'E0'},
+    ],
+}
+
+
+class FakeDevice(object):
+
+    def __init__(self, pk, name, delay=0, error=None):
+        self.pk = pk
+        self.name = name
+        self.delay = delay
+        self.error = error
+
+
+class FakeRPCClient(object):
+    """
+    Responds to inventory requests after the device's configured delay, unless aborted.
+    """
+
+    def __init__(self, device, username='', password=''):
+        self.device = device
+        self.aborted = threading.Event()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        pass
+
+    def abort(self):
+        self.aborted.set()
+
+    def get_inventory(self):
+        if self.aborted.wait(self.device.delay):
+            raise EOFError("Session closed")
+        if self.device.error:
+            raise self.device.error
+        return INVENTORY
+
+
+class FakeInventoryCollector(InventoryCollector):
+
+    def __init__(self, *args, **kwargs):
+        super(FakeInventoryCollector, self).__init__(*args, **kwargs)
+        self.threads = set()
+
+    def get_client(self, device):
+        self.threads.add(threading.current_thread().ident)
+        return FakeRPCClient
+
+
+class InventoryCollectorTestCase(SimpleTestCase):
+
+    def test_concurrency(self):
+
+        devices = [FakeDevice(i, 'device{}'.format(i), delay=0.2) for i in range(20)]
+        collector = FakeInventoryCollector('user', 'pass', workers=20, timeout=5)
+
+        start = time.time()
+        results = list(collector.collect(devices))
+
+        self.assertLess(time.time() - start, 2)
+        self.assertEqual(sorted(r.device.pk for r in results), range(20))
+        self.assertTrue(all(r.inventory == INVENTORY for r in results))
+
+    def test_errors_and_timeouts(self):
+
+        devices = [
+            FakeDevice(1, 'ok'),
+            FakeDevice(2, 'broken', error=ValueError("Bad reply")),
+            FakeDevice(3, 'slow', delay=5),
+        ]
+        collector = FakeInventoryCollector('user', 'pass', workers=2, timeout=0.5)
+
+        results = {r.device.name: r for r in collector.collect(devices)}
+
+        self.assertEqual(results['ok'].inventory, INVENTORY)
+        self.assertIsInstance(results['broken'].error, ValueError)
+        self.assertIsInstance(results['slow'].error, InventoryTimeout)
+
+    def test_worker_reuse(self):
+
+        # Workers whose devices time out are freed by aborting their sessions, and reused for the remaining devices
+        devices = [FakeDevice(i, 'slow{}'.format(i), delay=10) for i in range(6)]
+        collector = FakeInventoryCollector('user', 'pass', workers=2, timeout=0.2)
+
+        start = time.time()
+        results = list(collector.collect(devices))
+
+        self.assertLess(time.time() - start, 3)
+        self.assertEqual(len(results), 6)
+        self.assertTrue(all(isinstance(r.error, InventoryTimeout) for r in results))
+        self.assertEqual(len(collector.threads), 2)
+
+
+class SSHInventoryCollector(InventoryCollector):
+
+    def get_client(self, device):
+        def client(device, username, password):
+            rpc_client = IOSSSH(device, username, password)
+            rpc_client.port = device.port
+            return rpc_client
+        return client
+
+
+class HangingSSHDevice(FakeSSHDevice):
+    responses = dict(RESPONSES, **{'show inventory': None})
+
+
+class SSHInventoryCollectorTestCase(SimpleTestCase):
+    """
+    Collect inventory over SSH from fake devices listening on localhost.
+    """
+
+    def tearDown(self):
+
+        session_pool.clear()
+
+    def test_collect(self):
+
+        host_key = paramiko.RSAKey.generate(1024)
+        ok, hanging = FakeSSHDevice(host_key), HangingSSHDevice(host_key)
+        ok.pk, ok.name = 1, 'ok'
+        hanging.pk, hanging.name = 2, 'hanging'
+        collector = SSHInventoryCollector('admin', 'secret', workers=2, timeout=2)
+
+        results = {r.device.name: r for r in collector.collect([ok, hanging])}
+
+        self.assertEqual(results['ok'].inventory['chassis']['serial'], 'FDO1234X5YZ')
+        self.assertIsInstance(results['hanging'].error, InventoryTimeout)
+
+        # The session to the unresponsive device is closed on timeout
+        self.assertTrue(hanging.closed.wait(5))
+
+
+class ApplyInventoryTestCase(TestCase):
+
+    def setUp(self):
+
+        site = Site.objects.create(name='Test Site 1', slug='test-site-1')
+        rack = Rack.objects.create(name='Test Rack 1', site=site)
+        manufacturer = Manufacturer.objects.create(name='Test Manufacturer 1', slug='test-manufacturer-1')
+        device_type = DeviceType.objects.create(manufacturer=manufacturer, model='Test Device Type 1',
+                                                slug='test-device-type-1')
+        device_role = DeviceRole.objects.create(name='Test Device Role 1', slug='test-device-role-1', color='ff0000')
+        self.device = Device.objects.create(device_type=device_type, device_role=device_role, name='Test Device 1',
+                                            rack=rack)
+        Module.objects.create(device=self.device, name='Old module', discovered=True)
+        Module.objects.create(device=self.device, name='Manual module', discovered=False)
+
+    def test_apply_inventory(self):
+
+        apply_inventory([InventoryResult(self.device, inventory=INVENTORY)])
+
+        self.assertEqual(Device.objects.get(pk=self.device.pk).serial, 'ABC123')
+        self.assertEqual(
+            sorted(Module.objects.filter(device=self.device).values_list('name', flat=True)),
+            ['FPC 0', 'Manual module', 'PEM 0', 'PIC 0', 'PIC 1']
+        )
+        self.assertEqual(Module.objects.get(name='PIC 0').parent, Module.objects.get(name='FPC 0'))
+
+    def test_reconcile_inventory(self):
+
+        apply_inventory([InventoryResult(self.device, inventory=INVENTORY)])
+        pks = dict(Module.objects.filter(device=self.device).values_list('name', 'pk'))
+
+        # Re-applying unchanged inventory writes nothing
+        self.assertEqual(apply_inventory([InventoryResult(self.device, inventory=INVENTORY)]), (0, 0, 0))
+
+        # A replaced PIC is updated in place, a removed PEM deleted, and a new PEM inserted
+        inventory = {
+            'chassis': INVENTORY['chassis'],
+            'modules': [
+                {
+                    'name': 'FPC 0',
+                    'part_id': 'FPC-1',
+                    'serial': 'F0',
+                    'modules': [
+                        {'name': 'PIC 0', 'part_id': 'PIC-1', 'serial': 'P0'},
+                        {'name': 'PIC 1', 'part_id': 'PIC-2', 'serial': 'P2'},
+                    ],
+                },
+                {'name': 'PEM 1', 'part_id': 'PEM-1', 'serial': 'E1'},
+            ],
+        }
+        self.assertEqual(apply_inventory([InventoryResult(self.device, inventory=inventory)]), (1, 1, 1))
+
+        modules = {m.name: m for m in Module.objects.filter(device=self.device)}
+        self.assertEqual(modules['PIC 1'].pk, pks['PIC 1'])
+        self.assertEqual(modules['PIC 1'].serial, 'P2')
+        self.assertEqual(modules['FPC 0'].pk, pks['FPC 0'])
+        self.assertNotIn('PEM 0', modules)
+        self.assertIn('PEM 1', modules)
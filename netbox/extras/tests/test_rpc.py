@@ -0,0 +1,305 @@
+import netaddr
+import paramiko
+import socket
+import threading
+import time
+
+from django.test import SimpleTestCase
+
+from extras.rpc import IOSSSH, RPCClient, RPCTimeout, session_pool, SessionPool
+
+
+SHOW_VERSION = (
+    "Cisco IOS Software, C3750E Software (C3750E-UNIVERSALK9-M), Version 15.0(2)SE5\r\n"
+    "cisco WS-C3750X-48P (PowerPC405) processor (revision A0) with 262144K bytes of memory.\r\n"
+    "Processor board ID FDO1234X5YZ\r\n"
+)
+
+SHOW_INVENTORY = (
+    "NAME: \"1\", DESCR: \"WS-C3750X-48P\"\r\n"
+    "PID: WS-C3750X-48P-S  , VID: V02  , SN: FDO1234X5YZ\r\n"
+    "\r\n"
+    "NAME: \"Switch 1 - Power Supply 0\", DESCR: \"FRU Power Supply\"\r\n"
+    "PID: C3KX-PWR-715WAC  , VID: V01  , SN: LIT12345678\r\n"
+    "\r\n"
+)
+
+RESPONSES = {
+    '': '',
+    'term length 0': '',
+    'show version': SHOW_VERSION,
+    'show inventory': SHOW_INVENTORY,
+    'hang': None,  # Never returns to the prompt
+}
+
+
+class FakeSSHServer(paramiko.ServerInterface):
+
+    def check_auth_password(self, username, password):
+        if password == 'secret':
+            return paramiko.AUTH_SUCCESSFUL
+        return paramiko.AUTH_FAILED
+
+    def get_allowed_auths(self, username):
+        return 'password'
+
+    def check_channel_request(self, kind, chanid):
+        if kind == 'session':
+            return paramiko.OPEN_SUCCEEDED
+        return paramiko.OPEN_FAILED_ADMINISTRATIVELY_PROHIBITED
+
+    def check_channel_pty_request(self, channel, term, width, height, pixelwidth, pixelheight, modes):
+        return True
+
+    def check_channel_shell_request(self, channel):
+        return True
+
+
+class FakeDevice(object):
+    """
+    A minimal CLI device listening on localhost. Output is sent in small fragments to exercise incremental reads.
+    """
+    prompt = 'switch1#'
+    banner = 'Welcome to the fake switch\r\n\r\n'
+    responses = RESPONSES
+
+    def __init__(self, host_key):
+        self.host_key = host_key
+        self.closed = threading.Event()
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self.sock.bind(('127.0.0.1', 0))
+        self.sock.listen(1)
+        self.port = self.sock.getsockname()[1]
+        self.primary_ip = type('FakeIPAddress', (object,), {'address': netaddr.IPNetwork('127.0.0.1/32')})
+        thread = threading.Thread(target=self.serve)
+        thread.daemon = True
+        thread.start()
+
+    def write(self, channel, data):
+        for i in range(0, len(data), 16):
+            channel.send(data[i:i + 16])
+            time.sleep(0.001)
+
+    def serve(self):
+        client, addr = self.sock.accept()
+        transport = paramiko.Transport(client)
+        transport.add_server_key(self.host_key)
+        transport.start_server(server=FakeSSHServer())
+        channel = transport.accept(5)
+        if channel is None:
+            return
+
+        self.write(channel, '{}{}'.format(self.banner, self.prompt))
+        buffer = ''
+        while True:
+            data = channel.recv(1024)
+            if not data:
+                break
+            buffer += data
+            while '\n' in buffer:
+                cmd, buffer = buffer.split('\n', 1)
+                cmd = cmd.strip()
+                response = self.responses.get(cmd, "% Invalid input detected\r\n")
+                self.write(channel, '{}\r\n'.format(cmd))
+                if response is not None:
+                    self.write(channel, '{}{}'.format(response, self.prompt))
+
+        transport.close()
+        self.sock.close()
+        self.closed.set()
+
+
+class BannerDevice(FakeDevice):
+    banner = '{0}\r\n# Authorized access only #\r\n{0}\r\n\r\n'.format('#' * 40)
+
+
+class SSHClientTestCase(SimpleTestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super(SSHClientTestCase, cls).setUpClass()
+        cls.host_key = paramiko.RSAKey.generate(1024)
+
+    def setUp(self):
+
+        self.device = FakeDevice(self.host_key)
+        self.client = IOSSSH(self.device, 'admin', 'secret')
+        self.client.port = self.device.port
+
+    def tearDown(self):
+
+        session_pool.clear()
+
+    def test_prompt(self):
+
+        with self.client as rpc_client:
+            self.assertEqual(rpc_client.prompt, 'switch1#')
+
+    def test_prompt_after_banner(self):
+
+        # Banner lines ending in # are not mistaken for the prompt, and no output is left over for the first command
+        device = BannerDevice(self.host_key)
+        client = IOSSSH(device, 'admin', 'secret')
+        client.port = device.port
+        with client as rpc_client:
+            self.assertEqual(rpc_client.prompt, 'switch1#')
+            self.assertEqual(rpc_client._send('show version'), SHOW_VERSION)
+
+    def test_send(self):
+
+        with self.client as rpc_client:
+            self.assertEqual(rpc_client._send('show version'), SHOW_VERSION)
+
+    def test_get_inventory(self):
+
+        start = time.time()
+        with self.client as rpc_client:
+            inventory = rpc_client.get_inventory()
+
+        # Commands should complete as soon as the device responds
+        self.assertLess(time.time() - start, 3)
+        self.assertEqual(inventory['chassis'], {'serial': 'FDO1234X5YZ', 'description': 'WS-C3750X-48P'})
+        self.assertEqual(inventory['modules'], [{
+            'name': 'Switch 1 - Power Supply 0',
+            'part_id': 'C3KX-PWR-715WAC',
+            'serial': 'LIT12345678',
+        }])
+
+    def test_timeout(self):
+
+        with self.client as rpc_client:
+            with self.assertRaises(RPCTimeout):
+                rpc_client._send('hang', timeout=0.5)
+
+    def test_session_reuse(self):
+
+        # The fake device accepts only a single connection
+        with self.client as rpc_client:
+            connection = rpc_client.connection
+        with self.client as rpc_client:
+            self.assertIs(rpc_client.connection, connection)
+            self.assertEqual(rpc_client._send('show version'), SHOW_VERSION)
+
+
+class FakeConnection(object):
+
+    def __init__(self):
+        self.alive = True
+        self.closed = False
+
+
+class FakeClient(RPCClient):
+
+    def __init__(self, host, username='admin'):
+        self.host = host
+        self.username = username
+        self.password = 'secret'
+
+    def connect(self):
+        return FakeConnection()
+
+    @staticmethod
+    def disconnect(connection):
+        connection.closed = True
+
+    @staticmethod
+    def is_alive(connection):
+        return connection.alive
+
+
+class SessionPoolTestCase(SimpleTestCase):
+
+    def setUp(self):
+
+        self.pool = SessionPool(idle_timeout=60, max_per_host=2, wait_timeout=0.1)
+
+    def test_reuse(self):
+
+        client = FakeClient('192.0.2.1')
+        connection = self.pool.acquire(client)
+        self.pool.release(client, connection)
+
+        self.assertIs(self.pool.acquire(client), connection)
+
+    def test_health_check(self):
+
+        client = FakeClient('192.0.2.1')
+        connection = self.pool.acquire(client)
+        self.pool.release(client, connection)
+        connection.alive = False
+
+        self.assertIsNot(self.pool.acquire(client), connection)
+        self.assertTrue(connection.closed)
+
+    def test_discard(self):
+
+        client = FakeClient('192.0.2.1')
+        connection = self.pool.acquire(client)
+        self.pool.release(client, connection, reuse=False)
+
+        self.assertTrue(connection.closed)
+        self.assertIsNot(self.pool.acquire(client), connection)
+
+    def test_idle_timeout(self):
+
+        client = FakeClient('192.0.2.1')
+        connection = self.pool.acquire(client)
+        self.pool.release(client, connection)
+        self.pool.idle_timeout = 0
+
+        self.assertIsNot(self.pool.acquire(client), connection)
+        self.assertTrue(connection.closed)
+
+    def test_max_per_host(self):
+
+        client = FakeClient('192.0.2.1')
+        self.pool.acquire(client)
+        self.pool.acquire(client)
+
+        with self.assertRaises(RPCTimeout):
+            self.pool.acquire(client)
+
+        # A session to another host is unaffected
+        self.pool.acquire(FakeClient('192.0.2.2'))
+
+    def test_evict_idle(self):
+
+        client_a = FakeClient('192.0.2.1', username='a')
+        client_b = FakeClient('192.0.2.1', username='b')
+        connection = self.pool.acquire(client_a)
+        self.pool.acquire(client_a)
+        self.pool.release(client_a, connection)
+
+        # An idle session for different credentials is closed to make room
+        self.pool.acquire(client_b)
+        self.assertTrue(connection.closed)
+
+    def test_disconnect_outside_lock(self):
+
+        # Sessions are disconnected once the pool's lock has been released, so that a slow device cannot stall other
+        # threads using the pool
+        pool = self.pool
+        lock_free = []
+
+        def check_lock():
+            if pool.condition.acquire(False):
+                pool.condition.release()
+                lock_free.append(True)
+            else:
+                lock_free.append(False)
+
+        class SlowClient(FakeClient):
+
+            @staticmethod
+            def disconnect(connection):
+                thread = threading.Thread(target=check_lock)
+                thread.start()
+                thread.join()
+
+        client = SlowClient('192.0.2.1')
+        connection = pool.acquire(client)
+        pool.release(client, connection)
+        pool.idle_timeout = 0
+        pool.acquire(client)
+
+        self.assertEqual(lock_free, [True])
@@ -0,0 +1,29 @@
+from django.test import TestCase
+
+from extras.models import TopologyMap
+from extras.topology import get_topology_data
+
+
+class TopologyDataTestCase(TestCase):
+
+    fixtures = ['dcim']
+
+    def test_device_sets(self):
+
+        # Patterns are POSIX regular expressions, evaluated by PostgreSQL
+        tmap = TopologyMap(name='Test Map', slug='test-map',
+                           device_patterns='test1-spine[[:digit:]]\ntest1-leaf1;test1-edge\\M')
+
+        with self.assertNumQueries(2):
+            device_sets, connections = get_topology_data(tmap)
+
+        self.assertEqual(len(device_sets), 2)
+        self.assertEqual(sorted(device_sets[0]), ['test1-spine1', 'test1-spine2'])
+        self.assertEqual(device_sets[1], ['test1-leaf1'])  # \M matches only at the end of a word
+
+        # Only connections between the matching devices are included
+        names = set(device_sets[0] + device_sets[1])
+        self.assertTrue(connections)
+        for device_a, device_b in connections:
+            self.assertIn(device_a, names)
+            self.assertIn(device_b, names)
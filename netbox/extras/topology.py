@@ -0,0 +1,167 @@
+from collections import OrderedDict
+from Queue import Queue
+import hashlib
+import json
+import threading
+
+import graphviz
+
+from django.core.cache import cache
+from django.db.models import Q
+
+from dcim.models import Device, InterfaceConnection
+
+
+TOPOLOGY_MAP_FORMATS = {
+    'png': 'image/png',
+    'svg': 'image/svg+xml',
+}
+
+# Rendered maps are cached for one day. Because the cache key is derived from the content of the map, a change to any
+# of its devices or connections results in a new key; stale renderings are simply never requested again.
+TOPOLOGY_MAP_CACHE_TIMEOUT = 86400
+
+# The number of seconds a request will wait for a map to be rendered
+TOPOLOGY_MAP_RENDER_TIMEOUT = 10
+
+
+def get_topology_data(tmap):
+    """
+    Return the device sets (a list of device names for each tier) and connections (a list of device name pairs)
+    comprising a TopologyMap. Exactly two queries are made: one for all devices matching any pattern and one for all
+    connections between those devices.
+    """
+    patterns = [[query for query in device_set.split(';')] for device_set in tmap.device_sets or []]
+    queries = [query for device_set in patterns for query in device_set]
+
+    # Retrieve all devices matching any pattern, along with whether each pattern matches. Patterns are evaluated only
+    # by PostgreSQL, so that they are interpreted as POSIX regular expressions.
+    device_superset = Q()
+    for query in queries:
+        device_superset |= Q(name__regex=query)
+    select = OrderedDict(('pattern{}'.format(i), '"dcim_device"."name" ~ %s') for i in range(len(queries)))
+    devices = list(
+        Device.objects.filter(device_superset).extra(select=select, select_params=queries)
+        .values_list('pk', 'name', *select.keys())
+    ) if queries else []
+
+    # Assign devices to each set in the order in which their patterns are defined
+    device_sets = []
+    i = 0
+    for device_set in patterns:
+        names = []
+        for query in device_set:
+            names += [row[1] for row in devices if row[1] and row[2 + i]]
+            i += 1
+        device_sets.append(names)
+
+    # Retrieve all connections between matching devices
+    pks = [row[0] for row in devices]
+    connections = list(InterfaceConnection.objects.filter(
+        interface_a__device__in=pks, interface_b__device__in=pks
+    ).order_by('pk').values_list('interface_a__device__name', 'interface_b__device__name'))
+
+    return device_sets, connections
+
+
+def build_graph(device_sets, connections):
+    """
+    Construct a graphviz.Graph from the output of get_topology_data().
+    """
+    graph = graphviz.Graph()
+    graph.graph_attr['ranksep'] = '1'
+    for i, devices in enumerate(device_sets):
+
+        subgraph = graphviz.Graph(name='sg{}'.format(i))
+        subgraph.graph_attr['rank'] = 'same'
+
+        # Add a pseudonode for each device_set to enforce hierarchical layout
+        subgraph.node('set{}'.format(i), label='', shape='none', width='0')
+        if i:
+            graph.edge('set{}'.format(i - 1), 'set{}'.format(i), style='invis')
+
+        # Add each device to the graph
+        for name in devices:
+            subgraph.node(name)
+
+        # Add an invisible connection to each successive device in a set to enforce horizontal order
+        for j in range(0, len(devices) - 1):
+            subgraph.edge(devices[j], devices[j + 1], style='invis')
+
+        graph.subgraph(subgraph)
+
+    # Add all connections to the graph
+    for device_a, device_b in connections:
+        graph.edge(device_a, device_b)
+
+    return graph
+
+
+def get_cache_key(device_sets, connections, output):
+    content = json.dumps([device_sets, connections, output])
+    return 'topologymap_{}'.format(hashlib.sha1(content.encode('utf-8')).hexdigest())
+
+
+class RenderJob(object):
+
+    def __init__(self, key, graph, output):
+        self.key = key
+        self.graph = graph
+        self.output = output
+        self.data = None
+        self.error = None
+        self.done = threading.Event()
+
+
+class TopologyMapRenderer(object):
+    """
+    Render topology maps using Graphviz in a background thread. Concurrent requests for the same map share a single
+    rendering job.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.jobs = {}
+        self.queue = Queue()
+        self.worker = None
+
+    def render(self, device_sets, connections, output='png', timeout=TOPOLOGY_MAP_RENDER_TIMEOUT):
+        """
+        Return the rendered map from cache, or render it and wait up to timeout seconds. Returns None if rendering did
+        not complete in time. Raises RuntimeError if rendering failed.
+        """
+        key = get_cache_key(device_sets, connections, output)
+        data = cache.get(key)
+        if data is not None:
+            return data
+
+        with self.lock:
+            job = self.jobs.get(key)
+            if job is None:
+                job = self.jobs[key] = RenderJob(key, build_graph(device_sets, connections), output)
+                self.queue.put(job)
+                if self.worker is None or not self.worker.is_alive():
+                    self.worker = threading.Thread(target=self._run, name='topologymap-renderer')
+                    self.worker.daemon = True
+                    self.worker.start()
+
+        job.done.wait(timeout)
+        if job.error is not None:
+            raise RuntimeError(job.error)
+        return job.data
+
+    def _run(self):
+        while True:
+            job = self.queue.get()
+            try:
+                job.data = job.graph.pipe(format=job.output)
+                cache.set(job.key, job.data, TOPOLOGY_MAP_CACHE_TIMEOUT)
+            except Exception as e:
+                job.error = e
+            finally:
+                with self.lock:
+                    del self.jobs[job.key]
+                job.done.set()
+
+
+topology_map_renderer = TopologyMapRenderer()
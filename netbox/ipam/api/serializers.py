@@ -4,6 +4,7 @@ from dcim.api.serializers import DeviceNestedSerializer, InterfaceNestedSerializ
 from extras.api.serializers import CustomFieldSerializer
 from ipam.models import Aggregate, IPAddress, Prefix, RIR, Role, Service, VLAN, VLANGroup, VRF
 from tenancy.api.serializers import TenantNestedSerializer
+from utilities.api import BulkWriteSerializer, MemoizedNestedSerializerMixin
 
 
 #
@@ -18,13 +19,13 @@ class VRFSerializer(CustomFieldSerializer, serializers.ModelSerializer):
         fields = ['id', 'name', 'rd', 'tenant', 'enforce_unique', 'description', 'custom_fields']
 
 
-class VRFNestedSerializer(VRFSerializer):
+class VRFNestedSerializer(MemoizedNestedSerializerMixin, VRFSerializer):
 
     class Meta(VRFSerializer.Meta):
         fields = ['id', 'name', 'rd']
 
 
-class VRFTenantSerializer(VRFSerializer):
+class VRFTenantSerializer(MemoizedNestedSerializerMixin, VRFSerializer):
     """
     Include tenant serializer. Useful for determining tenant inheritance for Prefixes and IPAddresses.
     """
@@ -44,7 +45,7 @@ class RoleSerializer(serializers.ModelSerializer):
         fields = ['id', 'name', 'slug', 'weight']
 
 
-class RoleNestedSerializer(RoleSerializer):
+class RoleNestedSerializer(MemoizedNestedSerializerMixin, RoleSerializer):
 
     class Meta(RoleSerializer.Meta):
         fields = ['id', 'name', 'slug']
@@ -61,7 +62,7 @@ class RIRSerializer(serializers.ModelSerializer):
         fields = ['id', 'name', 'slug', 'is_private']
 
 
-class RIRNestedSerializer(RIRSerializer):
+class RIRNestedSerializer(MemoizedNestedSerializerMixin, RIRSerializer):
 
     class Meta(RIRSerializer.Meta):
         fields = ['id', 'name', 'slug']
@@ -97,7 +98,7 @@ class VLANGroupSerializer(serializers.ModelSerializer):
         fields = ['id', 'name', 'slug', 'site']
 
 
-class VLANGroupNestedSerializer(VLANGroupSerializer):
+class VLANGroupNestedSerializer(MemoizedNestedSerializerMixin, VLANGroupSerializer):
 
     class Meta(VLANGroupSerializer.Meta):
         fields = ['id', 'name', 'slug']
@@ -119,7 +120,7 @@ class VLANSerializer(CustomFieldSerializer, serializers.ModelSerializer):
                   'custom_fields']
 
 
-class VLANNestedSerializer(VLANSerializer):
+class VLANNestedSerializer(MemoizedNestedSerializerMixin, VLANSerializer):
 
     class Meta(VLANSerializer.Meta):
         fields = ['id', 'vid', 'name', 'display_name']
@@ -172,6 +173,13 @@ IPAddressSerializer._declared_fields['nat_inside'] = IPAddressNestedSerializer()
 IPAddressSerializer._declared_fields['nat_outside'] = IPAddressNestedSerializer()
 
 
+class WritableIPAddressSerializer(CustomFieldSerializer, BulkWriteSerializer):
+
+    class Meta:
+        model = IPAddress
+        fields = ['id', 'address', 'vrf', 'tenant', 'status', 'interface', 'description', 'nat_inside', 'custom_fields']
+
+
 #
 # Services
 #
@@ -28,6 +28,7 @@ urlpatterns = [
     # IP addresses
     url(r'^ip-addresses/$', IPAddressListView.as_view(), name='ipaddress_list'),
     url(r'^ip-addresses/(?P<pk>\d+)/$', IPAddressDetailView.as_view(), name='ipaddress_detail'),
+    url(r'^ip-addresses/bulk/$', IPAddressBulkView.as_view(), name='ipaddress_bulk'),
 
     # VLAN groups
     url(r'^vlan-groups/$', VLANGroupListView.as_view(), name='vlangroup_list'),
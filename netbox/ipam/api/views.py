@@ -1,9 +1,12 @@
-from rest_framework import generics
+from collections import defaultdict
+
+from django.conf import settings
 
 from ipam.models import Aggregate, IPAddress, Prefix, RIR, Role, Service, VLAN, VLANGroup, VRF
 from ipam import filters
 
 from extras.api.views import CustomFieldModelAPIView
+from utilities.api import BulkWriteView, ListAPIView, RetrieveAPIView
 from . import serializers
 
 
@@ -11,20 +14,20 @@ from . import serializers
 # VRFs
 #
 
-class VRFListView(CustomFieldModelAPIView, generics.ListAPIView):
+class VRFListView(CustomFieldModelAPIView, ListAPIView):
     """
     List all VRFs
     """
-    queryset = VRF.objects.select_related('tenant').prefetch_related('custom_field_values__field')
+    queryset = VRF.objects.select_related('tenant').prefetch_related('custom_field_values')
     serializer_class = serializers.VRFSerializer
     filter_class = filters.VRFFilter
 
 
-class VRFDetailView(CustomFieldModelAPIView, generics.RetrieveAPIView):
+class VRFDetailView(CustomFieldModelAPIView, RetrieveAPIView):
     """
     Retrieve a single VRF
     """
-    queryset = VRF.objects.select_related('tenant').prefetch_related('custom_field_values__field')
+    queryset = VRF.objects.select_related('tenant').prefetch_related('custom_field_values')
     serializer_class = serializers.VRFSerializer
 
 
@@ -32,7 +35,7 @@ class VRFDetailView(CustomFieldModelAPIView, generics.RetrieveAPIView):
 # Roles
 #
 
-class RoleListView(generics.ListAPIView):
+class RoleListView(ListAPIView):
     """
     List all roles
     """
@@ -40,7 +43,7 @@ class RoleListView(generics.ListAPIView):
     serializer_class = serializers.RoleSerializer
 
 
-class RoleDetailView(generics.RetrieveAPIView):
+class RoleDetailView(RetrieveAPIView):
     """
     Retrieve a single role
     """
@@ -52,7 +55,7 @@ class RoleDetailView(generics.RetrieveAPIView):
 # RIRs
 #
 
-class RIRListView(generics.ListAPIView):
+class RIRListView(ListAPIView):
     """
     List all RIRs
     """
@@ -60,7 +63,7 @@ class RIRListView(generics.ListAPIView):
     serializer_class = serializers.RIRSerializer
 
 
-class RIRDetailView(generics.RetrieveAPIView):
+class RIRDetailView(RetrieveAPIView):
     """
     Retrieve a single RIR
     """
@@ -72,20 +75,20 @@ class RIRDetailView(generics.RetrieveAPIView):
 # Aggregates
 #
 
-class AggregateListView(CustomFieldModelAPIView, generics.ListAPIView):
+class AggregateListView(CustomFieldModelAPIView, ListAPIView):
     """
     List aggregates (filterable)
     """
-    queryset = Aggregate.objects.select_related('rir').prefetch_related('custom_field_values__field')
+    queryset = Aggregate.objects.select_related('rir').prefetch_related('custom_field_values')
     serializer_class = serializers.AggregateSerializer
     filter_class = filters.AggregateFilter
 
 
-class AggregateDetailView(CustomFieldModelAPIView, generics.RetrieveAPIView):
+class AggregateDetailView(CustomFieldModelAPIView, RetrieveAPIView):
     """
     Retrieve a single aggregate
     """
-    queryset = Aggregate.objects.select_related('rir').prefetch_related('custom_field_values__field')
+    queryset = Aggregate.objects.select_related('rir').prefetch_related('custom_field_values')
     serializer_class = serializers.AggregateSerializer
 
 
@@ -93,22 +96,22 @@ class AggregateDetailView(CustomFieldModelAPIView, generics.RetrieveAPIView):
 # Prefixes
 #
 
-class PrefixListView(CustomFieldModelAPIView, generics.ListAPIView):
+class PrefixListView(CustomFieldModelAPIView, ListAPIView):
     """
     List prefixes (filterable)
     """
     queryset = Prefix.objects.select_related('site', 'vrf__tenant', 'tenant', 'vlan', 'role')\
-        .prefetch_related('custom_field_values__field')
+        .prefetch_related('custom_field_values')
     serializer_class = serializers.PrefixSerializer
     filter_class = filters.PrefixFilter
 
 
-class PrefixDetailView(CustomFieldModelAPIView, generics.RetrieveAPIView):
+class PrefixDetailView(CustomFieldModelAPIView, RetrieveAPIView):
     """
     Retrieve a single prefix
     """
     queryset = Prefix.objects.select_related('site', 'vrf__tenant', 'tenant', 'vlan', 'role')\
-        .prefetch_related('custom_field_values__field')
+        .prefetch_related('custom_field_values')
     serializer_class = serializers.PrefixSerializer
 
 
@@ -116,30 +119,69 @@ class PrefixDetailView(CustomFieldModelAPIView, generics.RetrieveAPIView):
 # IP addresses
 #
 
-class IPAddressListView(CustomFieldModelAPIView, generics.ListAPIView):
+class IPAddressListView(CustomFieldModelAPIView, ListAPIView):
     """
     List IP addresses (filterable)
     """
     queryset = IPAddress.objects.select_related('vrf__tenant', 'tenant', 'interface__device', 'nat_inside')\
-        .prefetch_related('nat_outside', 'custom_field_values__field')
+        .prefetch_related('nat_outside', 'custom_field_values')
     serializer_class = serializers.IPAddressSerializer
     filter_class = filters.IPAddressFilter
 
 
-class IPAddressDetailView(CustomFieldModelAPIView, generics.RetrieveAPIView):
+class IPAddressDetailView(CustomFieldModelAPIView, RetrieveAPIView):
     """
     Retrieve a single IP address
     """
     queryset = IPAddress.objects.select_related('vrf__tenant', 'tenant', 'interface__device', 'nat_inside')\
-        .prefetch_related('nat_outside', 'custom_field_values__field')
+        .prefetch_related('nat_outside', 'custom_field_values')
     serializer_class = serializers.IPAddressSerializer
 
 
+class IPAddressBulkView(CustomFieldModelAPIView, BulkWriteView):
+    """
+    Create, update, or delete many IP addresses
+    """
+    queryset = IPAddress.objects.select_related('vrf')
+    serializer_class = serializers.WritableIPAddressSerializer
+
+    def get_update_fields(self, fields):
+        # The family is inferred from the address (see clean_objects())
+        return fields + ['family'] if 'address' in fields else fields
+
+    def clean_objects(self, objs):
+
+        # Infer address family (see IPAddress.save())
+        for i, obj in objs:
+            obj.family = obj.address.version
+
+        # Enforce unique IP space if applicable (see IPAddress.clean()), checking all addresses with a single query
+        unique = [
+            (i, obj) for i, obj in objs if (obj.vrf.enforce_unique if obj.vrf else settings.ENFORCE_GLOBAL_UNIQUE)
+        ]
+        if not unique:
+            return
+        existing = defaultdict(set)
+        for pk, vrf, address in IPAddress.objects.extra(
+            where=['HOST({}.address) = ANY(%s)'.format(IPAddress._meta.db_table)],
+            params=[list(set(str(obj.address.ip) for i, obj in unique))]
+        ).values_list('pk', 'vrf', 'address'):
+            existing[(vrf, str(address.ip))].add(pk)
+        seen = set()
+        for i, obj in unique:
+            key = (obj.vrf_id, str(obj.address.ip))
+            if existing[key] - {obj.pk} or key in seen:
+                self.add_error(i, 'address', u"Duplicate IP address found in {}: {}".format(
+                    u"VRF {}".format(obj.vrf) if obj.vrf else "global table", obj.address.ip
+                ))
+            seen.add(key)
+
+
 #
 # VLAN groups
 #
 
-class VLANGroupListView(generics.ListAPIView):
+class VLANGroupListView(ListAPIView):
     """
     List all VLAN groups
     """
@@ -148,7 +190,7 @@ class VLANGroupListView(generics.ListAPIView):
     filter_class = filters.VLANGroupFilter
 
 
-class VLANGroupDetailView(generics.RetrieveAPIView):
+class VLANGroupDetailView(RetrieveAPIView):
     """
     Retrieve a single VLAN group
     """
@@ -160,22 +202,22 @@ class VLANGroupDetailView(generics.RetrieveAPIView):
 # VLANs
 #
 
-class VLANListView(CustomFieldModelAPIView, generics.ListAPIView):
+class VLANListView(CustomFieldModelAPIView, ListAPIView):
     """
     List VLANs (filterable)
     """
     queryset = VLAN.objects.select_related('site', 'group', 'tenant', 'role')\
-        .prefetch_related('custom_field_values__field')
+        .prefetch_related('custom_field_values')
     serializer_class = serializers.VLANSerializer
     filter_class = filters.VLANFilter
 
 
-class VLANDetailView(CustomFieldModelAPIView, generics.RetrieveAPIView):
+class VLANDetailView(CustomFieldModelAPIView, RetrieveAPIView):
     """
     Retrieve a single VLAN
     """
     queryset = VLAN.objects.select_related('site', 'group', 'tenant', 'role')\
-        .prefetch_related('custom_field_values__field')
+        .prefetch_related('custom_field_values')
     serializer_class = serializers.VLANSerializer
 
 
@@ -183,7 +225,7 @@ class VLANDetailView(CustomFieldModelAPIView, generics.RetrieveAPIView):
 # Services
 #
 
-class ServiceListView(generics.ListAPIView):
+class ServiceListView(ListAPIView):
     """
     List services (filterable)
     """
@@ -192,7 +234,7 @@ class ServiceListView(generics.ListAPIView):
     filter_class = filters.ServiceFilter
 
 
-class ServiceDetailView(generics.RetrieveAPIView):
+class ServiceDetailView(RetrieveAPIView):
     """
     Retrieve a single service
     """
@@ -0,0 +1,26 @@
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from django.conf import settings
+from django.contrib.auth.models import User
+
+from ipam.models import IPAddress
+
+
+class IPAddressBulkTest(APITestCase):
+
+    fixtures = ['dcim', 'ipam']
+
+    def setUp(self):
+        self.client.force_authenticate(User.objects.create_superuser('admin', 'admin@example.com', 'admin'))
+
+    def test_update_family(self, endpoint='/{}api/ipam/ip-addresses/bulk/'.format(settings.BASE_PATH)):
+        data = [
+            {'id': 1, 'address': '2001:db8::1/128'},
+            {'id': 2, 'description': 'Unchanged address'},
+        ]
+        response = self.client.patch(endpoint, data, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(IPAddress.objects.get(pk=1).family, 6)
+        self.assertEqual(IPAddress.objects.get(pk=2).family, 4)
+        self.assertEqual(IPAddress.objects.get(pk=2).description, 'Unchanged address')
@@ -59,6 +59,10 @@ BASE_PATH = ''
 # Setting this to True will display a "maintenance mode" banner at the top of every page.
 MAINTENANCE_MODE = False
 
+# The maximum number of objects which may be returned per page by the API, regardless of the requested limit.
+# (Default: 1000)
+MAX_PAGE_SIZE = 1000
+
 # Credentials that NetBox will use to access live devices.
 NETBOX_USERNAME = ''
 NETBOX_PASSWORD = ''
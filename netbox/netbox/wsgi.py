@@ -14,3 +14,7 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "netbox.settings")
 
 application = get_wsgi_application()
+
+# Build the connection graph in the background, rather than within the first request which traces a connection
+from dcim.tracing import connection_graph  # noqa: E402
+connection_graph.rebuild_async()
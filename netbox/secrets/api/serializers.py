@@ -3,6 +3,7 @@ from rest_framework import serializers
 from dcim.models import Device
 from ipam.api.serializers import IPAddressNestedSerializer
 from secrets.models import Secret, SecretRole
+from utilities.api import MemoizedNestedSerializerMixin
 
 
 #
@@ -16,7 +17,7 @@ class SecretRoleSerializer(serializers.ModelSerializer):
         fields = ['id', 'name', 'slug']
 
 
-class SecretRoleNestedSerializer(SecretRoleSerializer):
+class SecretRoleNestedSerializer(MemoizedNestedSerializerMixin, SecretRoleSerializer):
 
     class Meta(SecretRoleSerializer.Meta):
         pass
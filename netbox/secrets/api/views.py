@@ -13,6 +13,7 @@ from rest_framework.views import APIView
 from extras.api.renderers import FormlessBrowsableAPIRenderer, FreeRADIUSClientsRenderer
 from secrets.filters import SecretFilter
 from secrets.models import Secret, SecretRole, UserKey
+from utilities.api import ListAPIView, RetrieveAPIView
 
 from . import serializers
 
@@ -22,7 +23,7 @@ ERR_USERKEY_INACTIVE = "UserKey has not been activated for decryption."
 ERR_PRIVKEY_INVALID = "Invalid private key."
 
 
-class SecretRoleListView(generics.ListAPIView):
+class SecretRoleListView(ListAPIView):
     """
     List all secret roles
     """
@@ -31,7 +32,7 @@ class SecretRoleListView(generics.ListAPIView):
     permission_classes = [IsAuthenticated]
 
 
-class SecretRoleDetailView(generics.RetrieveAPIView):
+class SecretRoleDetailView(RetrieveAPIView):
     """
     Retrieve a single secret role
     """
@@ -53,6 +54,9 @@ class SecretListView(generics.GenericAPIView):
 
     def get(self, request, private_key=None):
         queryset = self.filter_queryset(self.get_queryset())
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            queryset = page
 
         # Attempt to decrypt each Secret if a private key was provided.
         if private_key:
@@ -80,6 +84,8 @@ class SecretListView(generics.GenericAPIView):
                 )
 
         serializer = self.get_serializer(queryset, many=True)
+        if page is not None:
+            return self.get_paginated_response(serializer.data)
         return Response(serializer.data)
 
     def post(self, request):
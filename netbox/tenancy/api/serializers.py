@@ -2,6 +2,7 @@ from rest_framework import serializers
 
 from extras.api.serializers import CustomFieldSerializer
 from tenancy.models import Tenant, TenantGroup
+from utilities.api import MemoizedNestedSerializerMixin
 
 
 #
@@ -15,7 +16,7 @@ class TenantGroupSerializer(serializers.ModelSerializer):
         fields = ['id', 'name', 'slug']
 
 
-class TenantGroupNestedSerializer(TenantGroupSerializer):
+class TenantGroupNestedSerializer(MemoizedNestedSerializerMixin, TenantGroupSerializer):
 
     class Meta(TenantGroupSerializer.Meta):
         pass
@@ -33,7 +34,7 @@ class TenantSerializer(CustomFieldSerializer, serializers.ModelSerializer):
         fields = ['id', 'name', 'slug', 'group', 'comments', 'custom_fields']
 
 
-class TenantNestedSerializer(TenantSerializer):
+class TenantNestedSerializer(MemoizedNestedSerializerMixin, TenantSerializer):
 
     class Meta(TenantSerializer.Meta):
         fields = ['id', 'name', 'slug']
@@ -1,13 +1,12 @@
-from rest_framework import generics
-
 from tenancy.models import Tenant, TenantGroup
 from tenancy.filters import TenantFilter
 
 from extras.api.views import CustomFieldModelAPIView
+from utilities.api import ListAPIView, RetrieveAPIView
 from . import serializers
 
 
-class TenantGroupListView(generics.ListAPIView):
+class TenantGroupListView(ListAPIView):
     """
     List all tenant groups
     """
@@ -15,7 +14,7 @@ class TenantGroupListView(generics.ListAPIView):
     serializer_class = serializers.TenantGroupSerializer
 
 
-class TenantGroupDetailView(generics.RetrieveAPIView):
+class TenantGroupDetailView(RetrieveAPIView):
     """
     Retrieve a single circuit type
     """
@@ -23,18 +22,18 @@ class TenantGroupDetailView(generics.RetrieveAPIView):
     serializer_class = serializers.TenantGroupSerializer
 
 
-class TenantListView(CustomFieldModelAPIView, generics.ListAPIView):
+class TenantListView(CustomFieldModelAPIView, ListAPIView):
     """
     List tenants (filterable)
     """
-    queryset = Tenant.objects.select_related('group').prefetch_related('custom_field_values__field')
+    queryset = Tenant.objects.select_related('group').prefetch_related('custom_field_values')
     serializer_class = serializers.TenantSerializer
     filter_class = TenantFilter
 
 
-class TenantDetailView(CustomFieldModelAPIView, generics.RetrieveAPIView):
+class TenantDetailView(CustomFieldModelAPIView, RetrieveAPIView):
     """
     Retrieve a single tenant
     """
-    queryset = Tenant.objects.select_related('group').prefetch_related('custom_field_values__field')
+    queryset = Tenant.objects.select_related('group').prefetch_related('custom_field_values')
     serializer_class = serializers.TenantSerializer
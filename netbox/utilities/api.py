@@ -1,6 +1,724 @@
-from rest_framework.exceptions import APIException
+from collections import OrderedDict
+import sys
+
+from rest_framework import generics, serializers, status
+from rest_framework.exceptions import APIException, ValidationError
+from rest_framework.pagination import CursorPagination
+from rest_framework.permissions import DjangoModelPermissions
+from rest_framework.response import Response
+
+from django.conf import settings
+from django.core.exceptions import FieldDoesNotExist, ValidationError as DjangoValidationError
+from django.db import IntegrityError, transaction
+from django.db.models import prefetch_related_objects, ProtectedError
+from django.http import HttpResponseNotModified, StreamingHttpResponse
+
+from extras.changelog import batch_changes, log_create, log_update
+from extras.customfields import save_custom_field_values
+from extras.forms import get_custom_fields_for_model
+
+from .conditional import get_validators, is_not_modified, set_validators
+from .models import bulk_update
+
+
+BULK_WRITE_MAX_OBJECTS = 10000
 
 
 class ServiceUnavailable(APIException):
     status_code = 503
     default_detail = "Service temporarily unavailable, please try again later."
+
+
+class KeysetPagination(CursorPagination):
+    """
+    Paginate list endpoints by primary key using opaque cursors. Each page is retrieved with an indexed range scan
+    (WHERE id > <last id> ORDER BY id LIMIT n) rather than an OFFSET, so pages remain fast deep into large tables and
+    objects are neither skipped nor repeated when new objects are created during iteration.
+
+    Pagination is enabled by passing `limit` (or following a `next` or `previous` cursor, which preserves the limit).
+    Requests without either return the complete list, as before.
+    """
+    ordering = 'pk'
+    limit_query_param = 'limit'
+
+    def get_limit(self, request):
+        try:
+            limit = int(request.query_params.get(self.limit_query_param, settings.PAGINATE_COUNT))
+        except ValueError:
+            raise ValidationError({self.limit_query_param: "Must be an integer."})
+        if limit < 1:
+            raise ValidationError({self.limit_query_param: "Must be a positive integer."})
+        return min(limit, settings.MAX_PAGE_SIZE)
+
+    def is_paginated(self, request):
+        params = request.query_params
+        return self.limit_query_param in params or self.cursor_query_param in params
+
+    def paginate_queryset(self, queryset, request, view=None):
+
+        if not self.is_paginated(request):
+            return None
+        self.page_size = self.get_limit(request)
+
+        return super(KeysetPagination, self).paginate_queryset(queryset, request, view)
+
+
+def iterate_in_chunks(queryset, chunk_size):
+    """
+    Yield the objects of a QuerySet in lists of up to chunk_size, ordered by primary key. Each chunk is retrieved with
+    its own keyset query (WHERE id > <last id>), so that only one chunk is held in memory at a time and any
+    prefetch_related() lookups are applied per chunk.
+    """
+    queryset = queryset.order_by('pk')
+    last_pk = None
+    while True:
+        chunk = list((queryset.filter(pk__gt=last_pk) if last_pk is not None else queryset)[:chunk_size])
+        if not chunk:
+            return
+        yield chunk
+        last_pk = chunk[-1].pk
+
+
+class StreamingListMixin(object):
+    """
+    Stream unpaginated list responses when a streaming renderer (see extras.api.renderers.StreamingRenderer) is
+    requested. Objects are retrieved in chunks and serialized one chunk at a time, so memory use does not grow with the
+    size of the result. Streamed lists are ordered by primary key.
+    """
+    stream_chunk_size = 1000
+
+    def list(self, request, *args, **kwargs):
+
+        renderer = request.accepted_renderer
+        if not getattr(renderer, 'streaming', False) or (
+            self.paginator is not None and self.paginator.is_paginated(request)
+        ):
+            return super(StreamingListMixin, self).list(request, *args, **kwargs)
+
+        # Resolve the queryset and serializer context up front, so that any errors are raised before streaming begins
+        queryset = self.filter_queryset(self.get_queryset())
+        serializer_class = self.get_serializer_class()
+        context = self.get_serializer_context()
+
+        def records():
+            for chunk in iterate_in_chunks(queryset, self.stream_chunk_size):
+                for record in serializer_class(chunk, many=True, context=context).data:
+                    yield record
+
+        return StreamingHttpResponse(
+            renderer.render_stream(records(), self.get_renderer_context()),
+            content_type='{}; charset={}'.format(renderer.media_type, renderer.charset)
+        )
+
+
+def get_nested_serializer(serializer_class):
+    """
+    Return the nested serializer which accompanies serializer_class (e.g. DeviceNestedSerializer for DeviceSerializer),
+    or None if there is none.
+    """
+    name = serializer_class.__name__
+    if not name.endswith('Serializer'):
+        return None
+    return getattr(sys.modules[serializer_class.__module__], name[:-10] + 'NestedSerializer', None)
+
+
+def _select_related_paths(select_related, prefix=''):
+    """
+    Flatten the nested dictionary of a query's select_related() lookups into a list of paths.
+    """
+    paths = []
+    for name, children in select_related.items():
+        if children:
+            paths += _select_related_paths(children, prefix + name + '__')
+        else:
+            paths.append(prefix + name)
+    return paths
+
+
+def prune_queryset(queryset, dependencies):
+    """
+    Return a copy of queryset which retrieves only what is needed to access the given model fields and relations.
+    select_related() and prefetch_related() lookups which do not begin with one of the dependencies are dropped, and
+    only the concrete fields among them (and the primary key) are loaded.
+    """
+    meta = queryset.model._meta
+    if queryset.query.select_related is True:
+        return queryset
+
+    selected = [
+        path for path in _select_related_paths(queryset.query.select_related or {})
+        if path.split('__')[0] in dependencies
+    ]
+    prefetched = [
+        lookup for lookup in queryset._prefetch_related_lookups
+        if getattr(lookup, 'prefetch_through', lookup).split('__')[0] in dependencies
+    ]
+    queryset = queryset.select_related(None).prefetch_related(None)
+    if selected:
+        queryset = queryset.select_related(*selected)
+    if prefetched:
+        queryset = queryset.prefetch_related(*prefetched)
+
+    # Deferring fields prevents select_related() from following reverse one-to-one relations, so load all fields if we
+    # need to follow one.
+    if all(meta.get_field(path.split('__')[0]).concrete for path in selected):
+        columns = [f.name for f in meta.concrete_fields if f.name in dependencies]
+        queryset = queryset.only(meta.pk.name, *columns)
+
+    return queryset
+
+
+class SparseFieldsMixin(object):
+    """
+    Allow clients to limit the fields returned for each object, either to a list of fields (?fields=id,name,serial) or
+    to those of the brief representation provided by the object's nested serializer (?brief=1). The queryset is pruned
+    to match: related objects which no requested field needs are neither joined nor prefetched, and only the columns
+    needed are loaded.
+
+    The model fields needed to render a serializer field are inferred from its source. Fields computed from other
+    attributes (such as properties and method fields) must declare theirs in `field_dependencies`; if any requested
+    field's dependencies are unknown, the queryset is left unchanged.
+    """
+    field_dependencies = {}
+    requested_fields = None
+
+    def initial(self, request, *args, **kwargs):
+        super(SparseFieldsMixin, self).initial(request, *args, **kwargs)
+
+        serializer_class = super(SparseFieldsMixin, self).get_serializer_class()
+        self.available_fields = serializer_class().fields
+
+        if request.query_params.get('brief', '').lower() in ('1', 'true'):
+            nested_serializer = get_nested_serializer(serializer_class)
+            if nested_serializer is not None:
+                self.requested_fields = [name for name in nested_serializer().fields if name in self.available_fields]
+        elif request.query_params.get('fields'):
+            names = [name.strip() for name in request.query_params['fields'].split(',') if name.strip()]
+            unknown = [name for name in names if name not in self.available_fields]
+            if unknown:
+                raise ValidationError({'fields': u"Unknown field(s): {}".format(', '.join(unknown))})
+            self.requested_fields = names
+
+    def get_field_dependencies(self, name, model):
+        """
+        Return the fields and relations of the given model needed to render the named serializer field, or None if they
+        are unknown.
+        """
+        if name in self.field_dependencies:
+            return self.field_dependencies[name]
+        source = self.available_fields[name].source.split('.')[0]
+        try:
+            model._meta.get_field(source)
+        except FieldDoesNotExist:
+            return None
+        return [source]
+
+    def get_queryset(self):
+        queryset = super(SparseFieldsMixin, self).get_queryset()
+        if self.requested_fields is None:
+            return queryset
+
+        dependencies = set()
+        for name in self.requested_fields:
+            field_dependencies = self.get_field_dependencies(name, queryset.model)
+            if field_dependencies is None:
+                return queryset
+            dependencies.update(field_dependencies)
+
+        return prune_queryset(queryset, dependencies)
+
+    def get_serializer_class(self):
+        serializer_class = super(SparseFieldsMixin, self).get_serializer_class()
+        if self.requested_fields is None:
+            return serializer_class
+        requested_fields = self.requested_fields
+
+        class SparseSerializer(serializer_class):
+
+            def get_fields(self):
+                fields = super(SparseSerializer, self).get_fields()
+                return OrderedDict((name, field) for name, field in fields.items() if name in requested_fields)
+
+        return SparseSerializer
+
+
+def get_related_sources(queryset):
+    """
+    Return a QuerySet for each model reached by a QuerySet's select_related() and prefetch_related() lookups, limited to
+    the rows which are reachable from the QuerySet's own (e.g. the racks of the devices listed, rather than all racks).
+    """
+    lookups = _select_related_paths(queryset.query.select_related) if isinstance(queryset.query.select_related, dict) \
+        else []
+    lookups += [getattr(lookup, 'prefetch_through', lookup) for lookup in queryset._prefetch_related_lookups]
+
+    # Each step along a lookup reaches a model (e.g. device__rack__site reaches Device, Rack, and Site)
+    paths = {}
+    for lookup in lookups:
+        model = queryset.model
+        names = lookup.split('__')
+        for i, name in enumerate(names):
+            model = model._meta.get_field(name).related_model
+            paths['__'.join(names[:i + 1])] = model
+
+    return [
+        model._base_manager.filter(pk__in=queryset.order_by().values(path))
+        for path, model in sorted(paths.items())
+    ]
+
+
+class ConditionalGetMixin(object):
+    """
+    Support conditional GET requests using ETag validators. The validators are computed with a single query which
+    summarizes the rows of the queryset (see utilities.conditional.get_validators) along with the rows of related tables
+    which it joins or prefetches. If the client's cached copy is current, a 304 response is returned without retrieving
+    or serializing any objects. Paginated lists are not validated.
+    """
+
+    def get_validator_queryset(self):
+        """
+        Return the QuerySet of the objects in the response.
+        """
+        return self.filter_queryset(self.get_queryset())
+
+    def get_validator_sources(self):
+        """
+        Return the QuerySets and models from which the response is built.
+        """
+        queryset = self.get_validator_queryset()
+        return [queryset] + get_related_sources(queryset)
+
+    def is_conditional(self, request):
+        """
+        Return False for paginated lists: fingerprinting the whole queryset for each page would scan every object,
+        which keyset pagination (see KeysetPagination) exists to avoid.
+        """
+        if isinstance(self, generics.ListAPIView) and self.paginator is not None:
+            return not self.paginator.is_paginated(request)
+        return True
+
+    def get(self, request, *args, **kwargs):
+        if not self.is_conditional(request):
+            return super(ConditionalGetMixin, self).get(request, *args, **kwargs)
+        etag, last_modified = get_validators(
+            self.get_validator_sources(), request.get_full_path(), request.accepted_renderer.format
+        )
+        if is_not_modified(request, etag):
+            response = HttpResponseNotModified()
+        else:
+            response = super(ConditionalGetMixin, self).get(request, *args, **kwargs)
+        if response.status_code in (200, 304):
+            set_validators(response, etag, last_modified)
+        return response
+
+
+class ListAPIView(ConditionalGetMixin, SparseFieldsMixin, StreamingListMixin, generics.ListAPIView):
+    """
+    Base view for API list endpoints.
+    """
+    pass
+
+
+class RetrieveAPIView(ConditionalGetMixin, generics.RetrieveAPIView):
+    """
+    Base view for API detail endpoints.
+    """
+
+    def get_validator_queryset(self):
+        queryset = super(RetrieveAPIView, self).get_validator_queryset()
+        lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+        return queryset.filter(**{self.lookup_field: self.kwargs[lookup_url_kwarg]})
+
+
+class Include(object):
+    """
+    A set of related objects which an IncludeMixin view can embed in the representation of each object.
+
+    :param serializer_class: The serializer used to represent each related object
+    :param prefetch: A prefetch_related() lookup (or Prefetch) which retrieves the related objects, or a function which
+        retrieves them for a list of objects
+    :param source: The attribute of each object which holds its related objects (by default, the include's name)
+    :param sources: A function which, given a QuerySet of objects, returns QuerySets of the rows from which their
+        related objects' representations are built (for conditional requests)
+    """
+
+    def __init__(self, serializer_class, prefetch, source=None, sources=None):
+        self.serializer_class = serializer_class
+        self.prefetch = prefetch
+        self.source = source
+        self.sources = sources
+
+    def get_sources(self, queryset):
+        return self.sources(queryset) if self.sources is not None else []
+
+    def load(self, objects):
+        if callable(self.prefetch):
+            self.prefetch(objects)
+        else:
+            prefetch_related_objects(objects, self.prefetch)
+
+
+class IncludeMixin(object):
+    """
+    Allow clients to embed sets of related objects in each object's representation (?include=<name>,<name>,...), as
+    declared in `includes` (a dictionary mapping names to Includes). The related objects are retrieved in bulk for all
+    of the objects being serialized (e.g. one page, or one chunk of a streamed list), so the number of queries made for
+    each include does not depend on the number of objects.
+    """
+    includes = {}
+    requested_includes = []
+
+    def initial(self, request, *args, **kwargs):
+        super(IncludeMixin, self).initial(request, *args, **kwargs)
+
+        names = [name.strip() for name in request.query_params.get('include', '').split(',') if name.strip()]
+        unknown = [name for name in names if name not in self.includes]
+        if unknown:
+            raise ValidationError({'include': u"Unknown include(s): {}".format(', '.join(unknown))})
+        self.requested_includes = names
+
+    def get_validator_sources(self):
+        sources = super(IncludeMixin, self).get_validator_sources()
+        queryset = self.get_validator_queryset()
+        for name in self.requested_includes:
+            sources += self.includes[name].get_sources(queryset)
+        return sources
+
+    def get_serializer_class(self):
+        serializer_class = super(IncludeMixin, self).get_serializer_class()
+        if not self.requested_includes:
+            return serializer_class
+        includes = [(name, self.includes[name]) for name in self.requested_includes]
+
+        def load_includes(objects):
+            for name, include in includes:
+                include.load(objects)
+
+        class IncludeListSerializer(serializers.ListSerializer):
+
+            def to_representation(self, data):
+                objects = list(data)
+                load_includes(objects)
+                return super(IncludeListSerializer, self).to_representation(objects)
+
+        class IncludeSerializer(serializer_class):
+
+            class Meta(serializer_class.Meta):
+                list_serializer_class = IncludeListSerializer
+
+            def get_fields(self):
+                fields = super(IncludeSerializer, self).get_fields()
+                for name, include in includes:
+                    fields[name] = include.serializer_class(many=True, read_only=True, source=include.source or name)
+                return fields
+
+            def to_representation(self, instance):
+                # Objects serialized as part of a list have their related objects loaded by the list serializer
+                if not isinstance(self.parent, IncludeListSerializer):
+                    load_includes([instance])
+                return super(IncludeSerializer, self).to_representation(instance)
+
+        return IncludeSerializer
+
+
+#
+# Nested serializers
+#
+
+# The maximum number of nested representations memoized per response
+NESTED_MEMO_MAX_SIZE = 10000
+
+
+class MemoizedNestedSerializerMixin(object):
+    """
+    Serialize each distinct object once per response when nested within other objects (e.g. the site of each of
+    thousands of racks). Representations are memoized by serializer class and primary key in the serializer context,
+    which is shared by every serializer in a response, including each chunk of a streamed list. Memoized
+    representations are shared between records and must not be modified.
+
+    Only nested fields are memoized; lists of the objects themselves (e.g. with ?brief=1) are not.
+    """
+
+    def to_representation(self, instance):
+        if not self.field_name or instance.pk is None:
+            return super(MemoizedNestedSerializerMixin, self).to_representation(instance)
+
+        memo = self.context.setdefault('nested_representations', {})
+        key = (type(self), instance.pk)
+        try:
+            return memo[key]
+        except KeyError:
+            pass
+        data = super(MemoizedNestedSerializerMixin, self).to_representation(instance)
+        if len(memo) < NESTED_MEMO_MAX_SIZE:
+            memo[key] = data
+        return data
+
+
+#
+# Bulk writes
+#
+
+class PrefetchedPrimaryKeyRelatedField(serializers.PrimaryKeyRelatedField):
+    """
+    A PrimaryKeyRelatedField which resolves primary keys using related objects retrieved in advance (passed in the
+    serializer context as related_objects: {<field name>: {<pk>: <object>}}), rather than with a query per value.
+    """
+
+    def to_internal_value(self, data):
+        related_objects = self.context.get('related_objects', {}).get(self.field_name)
+        if related_objects is None:
+            return super(PrefetchedPrimaryKeyRelatedField, self).to_internal_value(data)
+        try:
+            return related_objects[int(data)]
+        except KeyError:
+            self.fail('does_not_exist', pk_value=data)
+        except (TypeError, ValueError):
+            self.fail('incorrect_type', data_type=type(data).__name__)
+
+
+class BulkWriteSerializer(serializers.ModelSerializer):
+    """
+    A flat ModelSerializer for use with BulkWriteView. Related objects are referenced by primary key, and unique
+    together constraints are validated by the view for all objects at once.
+    """
+    serializer_related_field = PrefetchedPrimaryKeyRelatedField
+
+    def get_validators(self):
+        return []
+
+
+class BulkWriteView(generics.GenericAPIView):
+    """
+    Create, update, or delete many objects in a single request:
+
+        POST [{<field>: <value>, ...}, ...]: Create objects
+        PATCH [{"id": <pk>, <field>: <value>, ...}, ...]: Update the given fields of existing objects
+        DELETE [<pk>, ...]: Delete objects
+
+    Custom field values may be given as "custom_fields": {<name>: <value>, ...}. All objects are validated before any
+    are written: related objects are retrieved with one query per field, and unique together constraints checked with
+    one query each. If any object is invalid, nothing is written and the response lists the errors for each object
+    in the order given (empty for valid objects). Otherwise, all objects are written in a single transaction, in batches
+    of bulk_batch_size, and the response lists each object as written.
+
+    The view's serializer_class must be a BulkWriteSerializer. As with QuerySet.update(), model save() and clean()
+    methods are not called; clean_objects() may be overridden to apply model validation to the set of objects.
+    """
+    permission_classes = [DjangoModelPermissions]
+    bulk_batch_size = 1000
+
+    def get_data(self, request):
+        if not isinstance(request.data, list):
+            raise ValidationError({'detail': "Expected a list of objects."})
+        if len(request.data) > BULK_WRITE_MAX_OBJECTS:
+            raise ValidationError({
+                'detail': "Cannot write more than {} objects per request.".format(BULK_WRITE_MAX_OBJECTS)
+            })
+        return request.data
+
+    def get_instances(self, pks):
+        """
+        Retrieve the existing objects with the given primary keys. Returns a list aligned with pks, with None for each
+        primary key which is invalid, missing, or repeated.
+        """
+        valid_pks = []
+        for pk in pks:
+            try:
+                valid_pks.append(int(pk))
+            except (TypeError, ValueError):
+                valid_pks.append(None)
+        existing = self.get_queryset().in_bulk([pk for pk in valid_pks if pk is not None])
+
+        instances = []
+        seen = set()
+        for pk in valid_pks:
+            instances.append(existing.get(pk) if pk not in seen else None)
+            seen.add(pk)
+        return instances
+
+    def get_related_objects(self, data):
+        """
+        Retrieve all objects referenced by the given data, with one query per related field.
+        """
+        related_objects = {}
+        for name, field in self.get_serializer().fields.items():
+            if isinstance(field, PrefetchedPrimaryKeyRelatedField) and not field.read_only:
+                pks = set()
+                for item in data:
+                    try:
+                        pks.add(int(item[name]))
+                    except (KeyError, TypeError, ValueError):
+                        pass
+                related_objects[name] = field.get_queryset().in_bulk(list(pks))
+        return related_objects
+
+    def add_error(self, i, field, message):
+        self.errors[i].setdefault(field, []).append(message)
+
+    def clean_custom_fields(self, i, data, partial):
+        """
+        Validate the custom field values given for an object. Returns a dictionary mapping CustomFields to values.
+        """
+        if getattr(self, 'custom_fields', None) is None:
+            return {}
+        if not isinstance(data, dict):
+            self.add_error(i, 'custom_fields', "Expected an object.")
+            return {}
+        form_fields = {name[3:]: field for name, field in get_custom_fields_for_model(self.content_type).items()}
+        for name in data:
+            if name not in form_fields:
+                self.add_error(i, 'custom_fields', u"Unknown custom field: {}".format(name))
+
+        values = {}
+        for name, field in form_fields.items():
+            if partial and name not in data:
+                continue
+            try:
+                values[field.model] = field.clean(data.get(name))
+            except DjangoValidationError as e:
+                for message in e.messages:
+                    self.add_error(i, 'custom_fields', u"{}: {}".format(name, message))
+        return values
+
+    def clean_unique_together(self, objs):
+        """
+        Check unique together constraints among the given objects and against existing objects, with one query per
+        constraint.
+        """
+        meta = self.get_queryset().model._meta
+        for field_names in meta.unique_together:
+            attnames = [meta.get_field(name).attname for name in field_names]
+
+            def get_key(obj):
+                return tuple(getattr(obj, attname) for attname in attnames)
+
+            keys = [(i, obj, get_key(obj)) for i, obj in objs if None not in get_key(obj)]
+            lookups = {
+                '{}__in'.format(attname): set(key[n] for i, obj, key in keys) for n, attname in enumerate(attnames)
+            }
+            existing = {
+                tuple(row[1:]): row[0]
+                for row in meta.model.objects.filter(**lookups).values_list('pk', *attnames)
+            } if keys else {}
+
+            seen = {}
+            for i, obj, key in keys:
+                if key in seen or existing.get(key, obj.pk) != obj.pk:
+                    self.add_error(i, 'non_field_errors', u"An object with this {} already exists.".format(
+                        ' and '.join(field_names)
+                    ))
+                seen[key] = i
+
+    def clean_objects(self, objs):
+        """
+        Validate the valid objects as a set. Receives a list of (index, object) tuples; errors should be reported with
+        add_error().
+        """
+        pass
+
+    def get_update_fields(self, fields):
+        """
+        Return the model fields to write for objects whose given fields are being updated. Views whose clean_objects()
+        sets fields derived from others should add them here.
+        """
+        return fields
+
+    def validate(self, data, instances):
+        """
+        Validate the given data (and, for updates, the corresponding instances). Returns a list of (object, custom
+        field values) tuples; any errors are recorded in self.errors.
+        """
+        model = self.get_queryset().model
+        partial = instances is not None
+        serializer_class = self.get_serializer_class()
+        context = dict(self.get_serializer_context(), related_objects=self.get_related_objects(data))
+
+        results = []
+        for i, item in enumerate(data):
+            if not isinstance(item, dict):
+                self.add_error(i, 'non_field_errors', "Expected an object.")
+                results.append((None, {}))
+                continue
+            if partial and instances[i] is None:
+                self.add_error(i, 'id', "Object not found (or listed more than once).")
+                results.append((None, {}))
+                continue
+
+            obj = instances[i] if partial else model()
+            serializer = serializer_class(obj if partial else None, data=item, partial=partial, context=context)
+            if serializer.is_valid():
+                for attr, value in serializer.validated_data.items():
+                    setattr(obj, attr, value)
+            else:
+                self.errors[i].update(serializer.errors)
+            results.append((obj, self.clean_custom_fields(i, item.get('custom_fields', {}), partial)))
+
+        valid_objs = [(i, obj) for i, (obj, values) in enumerate(results) if obj is not None and not self.errors[i]]
+        self.clean_unique_together(valid_objs)
+        self.clean_objects(valid_objs)
+
+        return results
+
+    def write(self, request, data, instances=None):
+        self.errors = [{} for item in data]
+        results = self.validate(data, instances)
+        if any(self.errors):
+            return Response(self.errors, status=status.HTTP_400_BAD_REQUEST)
+
+        objs = [obj for obj, values in results]
+        try:
+            with transaction.atomic(), batch_changes():
+                if instances is None:
+                    self.get_queryset().model.objects.bulk_create(objs, batch_size=self.bulk_batch_size)
+                    log_create(objs)
+                else:
+                    # Group objects by the fields being updated
+                    updates = {}
+                    for obj, item in zip(objs, data):
+                        fields = tuple(sorted(name for name in item if name not in ('id', 'custom_fields')))
+                        updates.setdefault(fields, []).append(obj)
+                    serializer_fields = self.get_serializer().fields
+                    for fields, group in updates.items():
+                        fields = self.get_update_fields([
+                            serializer_fields[name].source for name in fields
+                            if name in serializer_fields and not serializer_fields[name].read_only
+                        ])
+                        if not fields:
+                            # Nothing writable was given (e.g. only an ID or read-only fields)
+                            continue
+                        bulk_update(group, fields, batch_size=self.bulk_batch_size)
+                        log_update(group, fields)
+                save_custom_field_values(results)
+        except IntegrityError as e:
+            raise ValidationError({'detail': str(e).strip()})
+
+        if getattr(self, 'custom_fields', None) is not None:
+            prefetch_related_objects(objs, 'custom_field_values')
+        serializer = self.get_serializer(objs, many=True)
+        return Response(serializer.data, status=status.HTTP_201_CREATED if instances is None else status.HTTP_200_OK)
+
+    def post(self, request):
+        return self.write(request, self.get_data(request))
+
+    def patch(self, request):
+        data = self.get_data(request)
+        instances = self.get_instances([item.get('id') if isinstance(item, dict) else None for item in data])
+        return self.write(request, data, instances)
+
+    def delete(self, request):
+        data = self.get_data(request)
+        instances = self.get_instances(data)
+        errors = [{} if obj is not None else {'id': ["Object not found (or listed more than once)."]}
+                  for obj in instances]
+        if any(errors):
+            return Response(errors, status=status.HTTP_400_BAD_REQUEST)
+
+        pks = [obj.pk for obj in instances]
+        try:
+            with transaction.atomic(), batch_changes():
+                for i in range(0, len(pks), self.bulk_batch_size):
+                    self.get_queryset().model.objects.filter(pk__in=pks[i:i + self.bulk_batch_size]).delete()
+        except ProtectedError as e:
+            raise ValidationError({'detail': e.args[0]})
+
+        return Response([{'id': pk} for pk in pks])
@@ -0,0 +1,127 @@
+from calendar import timegm
+from datetime import datetime
+from functools import wraps
+import hashlib
+
+from django.conf import settings
+from django.contrib.messages import get_messages
+from django.db import connection
+from django.db.models.query import QuerySet
+from django.http import HttpResponseNotModified
+from django.utils.cache import patch_cache_control
+from django.utils.http import http_date
+from django.utils.timezone import utc
+
+
+def _has_last_updated(model):
+    return any(f.name == 'last_updated' for f in model._meta.concrete_fields)
+
+
+def _fingerprint_sql(source):
+    """
+    Return SQL (and parameters) for a scalar subquery which summarizes the rows of a QuerySet, or of an entire table if
+    given a model, as "<count>:<sum of row versions>:<latest last_updated>". PostgreSQL assigns each version of a row a
+    new transaction ID (xmin), so the sum changes whenever a row is written, including by QuerySet.update().
+    """
+    model = source.model if isinstance(source, QuerySet) else source
+    table = connection.ops.quote_name(model._meta.db_table)
+    columns = ['row_version']
+    if _has_last_updated(model):
+        columns.append('last_updated')
+        last_updated = "EXTRACT(EPOCH FROM MAX(last_updated))"
+    else:
+        last_updated = "0"
+
+    if isinstance(source, QuerySet):
+        queryset = source.order_by().extra(select={'row_version': '{}.xmin::text::bigint'.format(table)})
+        sql, params = queryset.values(*columns).query.sql_with_params()
+    else:
+        sql = "SELECT xmin::text::bigint AS row_version{} FROM {}".format(
+            ', last_updated' if len(columns) > 1 else '', table
+        )
+        params = ()
+
+    return (
+        "(SELECT COUNT(*) || ':' || COALESCE(SUM(row_version), 0) || ':' || COALESCE({}, 0) FROM ({}) AS q)".format(
+            last_updated, sql
+        ),
+        params
+    )
+
+
+def get_validators(sources, *extra):
+    """
+    Compute an ETag and a Last-Modified time for a response built from the given sources (QuerySets and models) using a
+    single query, without retrieving any objects. The ETag also reflects any extra values given (such as request
+    parameters). Last-Modified is the latest last_updated time among the sources, or None if they have none.
+    """
+    subqueries = []
+    params = []
+    for source in sources:
+        sql, source_params = _fingerprint_sql(source)
+        subqueries.append(sql)
+        params += source_params
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT {}".format(', '.join(subqueries)), params)
+        fingerprints = cursor.fetchone()
+
+    etag = hashlib.md5(repr((settings.VERSION,) + tuple(fingerprints) + extra)).hexdigest()
+    latest = max(float(f.rsplit(':', 1)[1]) for f in fingerprints)
+    last_modified = datetime.fromtimestamp(latest, utc) if latest else None
+
+    return '"{}"'.format(etag), last_modified
+
+
+def is_not_modified(request, etag):
+    """
+    Return True if the client's cached copy (as identified by If-None-Match) is current. If-Modified-Since is not
+    honored: Last-Modified reflects only the latest last_updated time, which does not change when objects are deleted or
+    when related objects without timestamps change.
+    """
+    if_none_match = request.META.get('HTTP_IF_NONE_MATCH')
+    if if_none_match is None:
+        return False
+    client_etags = [e.strip() for e in if_none_match.split(',')]
+    return '*' in client_etags or etag in client_etags or 'W/' + etag in client_etags
+
+
+def set_validators(response, etag, last_modified):
+    """
+    Attach the given validators to a response, and require clients to revalidate their cached copy before reusing it.
+    """
+    response['ETag'] = etag
+    if last_modified is not None:
+        response['Last-Modified'] = http_date(timegm(last_modified.utctimetuple()))
+    patch_cache_control(response, private=True, no_cache=True)
+    return response
+
+
+def conditional_page(get_sources):
+    """
+    Decorator which enables conditional GET for a view. get_sources(request, *args, **kwargs) must return the QuerySets
+    and models from which the page is built; if none of their rows have changed since the client's last request (for the
+    same user), a 304 response is returned without calling the view. Responses which include messages are never
+    treated as unmodified.
+    """
+    def decorator(view):
+
+        @wraps(view)
+        def wrapped_view(request, *args, **kwargs):
+            if request.method not in ('GET', 'HEAD') or len(get_messages(request)):
+                return view(request, *args, **kwargs)
+
+            etag, last_modified = get_validators(
+                get_sources(request, *args, **kwargs),
+                request.get_full_path(), request.user.pk, request.META.get('CSRF_COOKIE')
+            )
+            if is_not_modified(request, etag):
+                response = HttpResponseNotModified()
+            else:
+                response = view(request, *args, **kwargs)
+            if response.status_code in (200, 304):
+                set_validators(response, etag, last_modified)
+            return response
+
+        return wrapped_view
+
+    return decorator
@@ -1,3 +1,5 @@
+import re
+
 from django.core.validators import RegexValidator
 from django.db import models
 
@@ -6,6 +8,30 @@ from .forms import ColorSelect
 
 validate_color = RegexValidator('^[0-9a-f]{6}$', 'Enter a valid hexadecimal RGB color code.', 'invalid')
 
+NATURAL_ORDERING_PATTERN = re.compile(r'^(\d*)(.*?)(\d*)$', re.DOTALL)
+NATURAL_ORDERING_INTEGER_WIDTH = 8
+
+
+def naturalize(value):
+    """
+    Return a string representation of the given value which sorts naturally. The value is segmented into three parts:
+
+    1. Leading integer (if any)
+    2. Middle portion
+    3. Trailing integer (if any)
+
+    Both integers are zero-padded to a fixed width so that, for example, 'switch9' ('switch00000009') is ordered before
+    'switch10' ('switch00000010'). Empty values are returned as None so that they continue to be ordered last.
+    """
+    if not value:
+        return None
+    lead, middle, trail = NATURAL_ORDERING_PATTERN.match(value).groups()
+    return u'{}{}{}'.format(
+        lead.zfill(NATURAL_ORDERING_INTEGER_WIDTH) if lead else '',
+        middle,
+        trail.zfill(NATURAL_ORDERING_INTEGER_WIDTH) if trail else '',
+    )
+
 
 class NullableCharField(models.CharField):
     description = "Stores empty values as NULL rather than ''"
@@ -30,3 +56,29 @@ class ColorField(models.CharField):
     def formfield(self, **kwargs):
         kwargs['widget'] = ColorSelect
         return super(ColorField, self).formfield(**kwargs)
+
+
+class NaturalOrderingField(models.CharField):
+    """
+    Stores a naturalized copy of another field on the same model (see naturalize()). The value is computed each time
+    the object is saved, which allows natural ordering to be performed against an indexed column.
+    """
+    description = "Stores a naturalized copy of another field for ordering"
+
+    def __init__(self, target_field, *args, **kwargs):
+        self.target_field = target_field
+        kwargs.setdefault('max_length', 100)
+        kwargs.setdefault('blank', True)
+        kwargs.setdefault('null', True)
+        kwargs.setdefault('editable', False)
+        super(NaturalOrderingField, self).__init__(*args, **kwargs)
+
+    def deconstruct(self):
+        name, path, args, kwargs = super(NaturalOrderingField, self).deconstruct()
+        kwargs['target_field'] = self.target_field
+        return name, path, args, kwargs
+
+    def pre_save(self, model_instance, add):
+        value = naturalize(getattr(model_instance, self.target_field))
+        setattr(model_instance, self.attname, value)
+        return value
@@ -409,12 +409,14 @@ class BulkImportForm(forms.Form):
             return
 
         obj_list = []
+        numbered_objs = []
 
         for i, record in enumerate(records, start=1):
             obj_form = self.fields['csv'].csv_form(data=record)
             if obj_form.is_valid():
                 obj = obj_form.save(commit=False)
                 obj_list.append(obj)
+                numbered_objs.append((i, obj))
             else:
                 for field, errors in obj_form.errors.items():
                     for e in errors:
@@ -423,4 +425,12 @@ class BulkImportForm(forms.Form):
                         else:
                             self.add_error('csv', "Record {} ({}): {}".format(i, field, e))
 
+        self.clean_objects(numbered_objs)
         self.cleaned_data['csv'] = obj_list
+
+    def clean_objects(self, objs):
+        """
+        Validate the valid records as a set (e.g. to detect conflicts between them). Receives a list of (record number,
+        object) tuples; errors should be added to the csv field.
+        """
+        pass
@@ -1,4 +1,4 @@
-from django.db import models
+from django.db import connection, models
 
 
 class CreatedUpdatedModel(models.Model):
@@ -7,3 +7,35 @@ class CreatedUpdatedModel(models.Model):
 
     class Meta:
         abstract = True
+
+
+def bulk_update(objects, fields, batch_size=None):
+    """
+    Save the given fields of many objects of the same model with one query per batch (UPDATE ... FROM VALUES ...).
+    Fields which are set automatically on save (such as last_updated) are updated as well. As with QuerySet.update(),
+    save() is not called and no signals are sent. Nothing is done if no fields are given.
+    """
+    if not objects or not fields:
+        return
+    meta = objects[0]._meta
+    fields = [meta.get_field(name) for name in fields]
+    fields += [f for f in meta.concrete_fields if getattr(f, 'auto_now', False) and f not in fields]
+    batch_size = batch_size or len(objects)
+    qn = connection.ops.quote_name
+
+    sql = "UPDATE {table} AS t SET {assignments} FROM (VALUES {{values}}) AS v({columns}) WHERE t.{pk} = v.{pk}".format(
+        table=qn(meta.db_table),
+        assignments=', '.join('{0} = v.{0}::{1}'.format(qn(f.column), f.db_type(connection)) for f in fields),
+        columns=', '.join(qn(f.column) for f in [meta.pk] + fields),
+        pk=qn(meta.pk.column),
+    )
+    row = '({})'.format(', '.join(['%s'] * (len(fields) + 1)))
+
+    with connection.cursor() as cursor:
+        for i in range(0, len(objects), batch_size):
+            batch = objects[i:i + batch_size]
+            params = []
+            for obj in batch:
+                params.append(obj.pk)
+                params += [f.get_db_prep_save(f.pre_save(obj, False), connection) for f in fields]
+            cursor.execute(sql.format(values=', '.join([row] * len(batch))), params)
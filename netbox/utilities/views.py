@@ -3,7 +3,7 @@ from django_tables2 import RequestConfig
 
 from django.contrib import messages
 from django.contrib.contenttypes.models import ContentType
-from django.core.exceptions import ImproperlyConfigured
+from django.core.exceptions import ImproperlyConfigured, ValidationError
 from django.core.urlresolvers import reverse
 from django.db import transaction, IntegrityError
 from django.db.models import ProtectedError
@@ -14,8 +14,10 @@ from django.template import TemplateSyntaxError
 from django.utils.http import is_safe_url
 from django.views.generic import View
 
+from extras.changelog import batch_changes, log_custom_field_values, log_queryset_update
 from extras.forms import CustomFieldForm
-from extras.models import CustomField, CustomFieldValue, ExportTemplate, UserAction
+from extras.customfields import custom_field_cache
+from extras.models import CustomFieldValue, ExportTemplate, UserAction
 
 from .error_handlers import handle_protectederror
 from .forms import ConfirmationForm
@@ -53,8 +55,7 @@ class ObjectListView(View):
             self.queryset = self.filter(request.GET, self.queryset).qs
 
         # If this type of object has one or more custom fields, prefetch any relevant custom field values
-        custom_fields = CustomField.objects.filter(obj_type=ContentType.objects.get_for_model(model))\
-            .prefetch_related('choices')
+        custom_fields = custom_field_cache.get_fields(object_ct)
         if custom_fields:
             self.queryset = self.queryset.prefetch_related('custom_field_values')
 
@@ -273,7 +274,7 @@ class BulkImportView(View):
         if form.is_valid():
             new_objs = []
             try:
-                with transaction.atomic():
+                with transaction.atomic(), batch_changes():
                     for obj in form.cleaned_data['csv']:
                         self.save_obj(obj)
                         new_objs.append(obj)
@@ -350,19 +351,28 @@ class BulkEditView(View):
                         fields_to_update[field] = ''
                     elif form.cleaned_data[field]:
                         fields_to_update[field] = form.cleaned_data[field]
-                updated_count = self.cls.objects.filter(pk__in=pk_list).update(**fields_to_update)
-
-                # Update custom fields for objects
-                if custom_fields:
-                    objs_updated = self.update_custom_fields(pk_list, form, custom_fields, nullified_fields)
-                    if objs_updated and not updated_count:
-                        updated_count = objs_updated
-
-                if updated_count:
-                    msg = u'Updated {} {}'.format(updated_count, self.cls._meta.verbose_name_plural)
-                    messages.success(self.request, msg)
-                    UserAction.objects.log_bulk_edit(request.user, ContentType.objects.get_for_model(self.cls), msg)
-                return redirect(redirect_url)
+
+                # Record all changes (including deleted custom field values) with a single query. If the update is
+                # rejected, nothing is changed and the form is displayed again.
+                try:
+                    with transaction.atomic(), batch_changes():
+                        updated_count = self.update_objects(pk_list, fields_to_update)
+
+                        # Update custom fields for objects
+                        if custom_fields:
+                            objs_updated = self.update_custom_fields(pk_list, form, custom_fields, nullified_fields)
+                            if objs_updated and not updated_count:
+                                updated_count = objs_updated
+                except ValidationError as e:
+                    for message in e.messages:
+                        messages.error(request, message)
+                else:
+                    if updated_count:
+                        msg = u'Updated {} {}'.format(updated_count, self.cls._meta.verbose_name_plural)
+                        messages.success(self.request, msg)
+                        UserAction.objects.log_bulk_edit(request.user, ContentType.objects.get_for_model(self.cls),
+                                                         msg)
+                    return redirect(redirect_url)
 
         else:
             form = self.form(self.cls, initial={'pk': pk_list})
@@ -378,6 +388,16 @@ class BulkEditView(View):
             'cancel_url': redirect_url,
         })
 
+    def update_objects(self, pk_list, fields):
+        """
+        Update the given fields of the selected objects, returning the number updated. Raise ValidationError to reject
+        the edit; all changes are then rolled back.
+        """
+        queryset = self.cls.objects.filter(pk__in=pk_list)
+        updated_count = queryset.update(**fields)
+        log_queryset_update(queryset, fields)
+        return updated_count
+
     def update_custom_fields(self, pk_list, form, fields, nullified_fields):
         obj_type = ContentType.objects.get_for_model(self.cls)
         objs_updated = False
@@ -416,6 +436,7 @@ class BulkEditView(View):
                         CustomFieldValue(field=field, obj_type=obj_type, obj_id=pk, serialized_value=serialized_value)
                         for pk in create_list
                     ])
+                    log_custom_field_values(self.cls, [(pk, {field: serialized_value}) for pk in pk_list])
 
                 # Deleting CFVs
                 else:
@@ -467,7 +488,8 @@ class BulkDeleteView(View):
                 # Delete objects
                 queryset = self.cls.objects.filter(pk__in=pk_list)
                 try:
-                    deleted_count = queryset.delete()[1][self.cls._meta.label]
+                    with transaction.atomic(), batch_changes():
+                        deleted_count = queryset.delete()[1][self.cls._meta.label]
                 except ProtectedError, e:
                     handle_protectederror(list(queryset), request, e)
                     return redirect(redirect_url)